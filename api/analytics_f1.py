@@ -6,25 +6,79 @@ This module provides endpoints for complex telemetry analysis,
 driver comparisons, and performance metrics using FastF1.
 
 Note: FastF1 requires significant processing time on first load.
-Results are cached aggressively (24h TTL).
+Analytics run in a dedicated worker process pool (analytics_pool.py),
+loaded sessions are shared between analytics on each worker
+(f1_sessions.py) and results are cached aggressively (24h TTL), in
+memory and in a durable store on disk (result_store.py). FastF1's own
+disk cache is kept within a byte budget (fastf1_cache.py).
+
+Cache misses run as shared jobs (analytics_jobs.py). Pass `mode=async` to
+get a 202 with a job id instead of waiting, then poll /analysis/jobs/{id}.
 """
 
 import os
 import json
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
+import math
+import warnings
+from fastapi import APIRouter, HTTPException, Query, BackgroundTasks, Request
+from fastapi.responses import JSONResponse
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import asyncio
+from concurrent.futures.process import BrokenProcessPool
 from functools import lru_cache
 
+from ttl_cache import get_cache, cache_stats
+from f1_sessions import get_loaded_session, session_cache, session_key
+from analytics_pool import AnalyticsTimeout, create_pool
+from result_store import ResultStore, result_key
+from analytics_jobs import ANALYTICS_MAX_PENDING_JOBS, JobQueue, QueueFull
+from stint_analysis import field_relative_degradation, fit_stints, segment_stints
+from track_dominance import (
+    DOMINANCE_MINISECTORS, driver_view, fastest_by_sector, integrate_distance, minisector_times
+)
+from session_store import delete_race as delete_stored_race, has_parts, read_driver_data, read_laps, store_stats
+from fastf1_cache import disk_cache
+from season_aggregates import CLEAN_LAP_FACTOR, MIN_CONSISTENCY_LAPS, SeasonStore
+from trace_downsample import downsample_channels
+from race_resolver import resolve_race
+
 # Create router
 router = APIRouter(prefix="/analysis", tags=["Deep Analytics"])
 
 # Cache directory for FastF1
 CACHE_DIR = os.environ.get("FASTF1_CACHE_DIR", "/tmp/fastf1_cache")
 
-# In-memory results cache (for processed analytics)
-_analytics_cache: Dict[str, tuple[Any, datetime]] = {}
+# In-memory results cache (for processed analytics), bounded by ttl_cache
+ANALYTICS_CACHE_MAX_BYTES = int(os.environ.get("ANALYTICS_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+_analytics_cache = get_cache("analytics", max_bytes=ANALYTICS_CACHE_MAX_BYTES, max_age_seconds=168 * 3600)
+
+# Field tyre degradation baselines per session (filled in the worker that computes radar)
+_tyre_baselines = get_cache("tyre_baselines", max_bytes=4 * 1024 * 1024, max_age_seconds=24 * 3600)
+
+# Durable results behind the memory cache (survives restarts; share the file to share results)
+ANALYTICS_STORE_PATH = os.environ.get("ANALYTICS_STORE_PATH", os.path.join(CACHE_DIR, "analytics_results.sqlite3"))
+ANALYTICS_STORE_MAX_BYTES = int(os.environ.get("ANALYTICS_STORE_MAX_BYTES", 256 * 1024 * 1024))
+_result_store = ResultStore(ANALYTICS_STORE_PATH, ANALYTICS_STORE_MAX_BYTES, max_age_seconds=30 * 24 * 3600)
+
+# Running per-driver season statistics, folded in race by race
+SEASON_STORE_PATH = os.environ.get("SEASON_STORE_PATH", os.path.join(CACHE_DIR, "season_aggregates.sqlite3"))
+season_store = SeasonStore(SEASON_STORE_PATH)
+
+# Bump an analysis' version when its output changes so stored results aren't reused
+ANALYTICS_VERSIONS = {
+    "radar": 2,
+    "stint": 2,
+    "stint_grid": 1,
+    "comparison": 1,
+    "dominance": 2,
+    "trace": 1
+}
+
+# Lap trace point budget per channel (200 points is about 7 KB per driver)
+TRACE_DEFAULT_POINTS = 200
+TRACE_MAX_POINTS = 1000
+TRACE_MAX_DRIVERS = 5
 
 # Flag to track if FastF1 is available
 FASTF1_AVAILABLE = False
@@ -36,19 +90,60 @@ try:
 except ImportError:
     print("WARNING: FastF1 not installed. Analytics endpoints will return mock data.")
 
+# Worker processes for FastF1 jobs (started lazily on first use)
+analytics_pool = create_pool(CACHE_DIR)
+
+# Retry-After for a job lost to a worker restart (the replacement takes a few seconds to warm up)
+WORKER_RESTART_RETRY_SECONDS = 5
+
+# Cache misses in flight, shared by identical requests
+analytics_jobs = JobQueue(ANALYTICS_MAX_PENDING_JOBS, concurrency=analytics_pool.workers)
+
+MODE_QUERY = Query("sync", pattern="^(sync|async)$",
+                   description="sync waits for the result; async answers a cache miss with 202 and a job id")
+
+
+def analytics_key(analysis: str, year: int, race: str, driver: str = "", session_type: str = "") -> str:
+    """Result cache key for an analysis at its current code version."""
+    return result_key(analysis, ANALYTICS_VERSIONS[analysis], year, race, driver, session_type)
+
+
+async def canonical_race(year: int, race: str) -> str:
+    """
+    The race's canonical event name (race_resolver.py).
+    
+    Routes resolve the URL's race first, so every spelling of a race
+    shares one set of cache keys, one worker and one session load.
+    """
+    if not FASTF1_AVAILABLE:
+        return race.strip()
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, resolve_race, year, race)
 
 def analytics_cache_get(key: str, ttl_hours: int = 24) -> Optional[Any]:
-    """Get from analytics cache if not expired."""
-    if key in _analytics_cache:
-        data, timestamp = _analytics_cache[key]
-        from datetime import timedelta
-        if datetime.now() - timestamp < timedelta(hours=ttl_hours):
-            return data
-    return None
+    """Get from analytics cache (memory, then disk) if not expired."""
+    cached = _analytics_cache.get(key, ttl_hours * 3600)
+    if cached is not None:
+        return cached
+
+    stored = _result_store.get(key, ttl_hours * 3600)
+    if stored is None:
+        return None
+    value, age = stored
+    _analytics_cache.set(key, value, age=age)
+    return value
 
 def analytics_cache_set(key: str, data: Any):
-    """Set analytics cache with timestamp."""
-    _analytics_cache[key] = (data, datetime.now())
+    """Set analytics cache; real (non-mock) results are also persisted."""
+    _analytics_cache.set(key, data)
+    if not data.get("is_mock"):
+        _result_store.set(key, data)
+
+def invalidate_race(year: int, race: str) -> int:
+    """Drop every cached result for a race (memory and disk) before it is recomputed."""
+    prefix = [str(int(year)), race.strip().lower()]
+    _analytics_cache.delete_where(lambda key: key.split(":")[2:4] == prefix)
+    return _result_store.delete_race(year, race)
 
 
 # =============================================================================
@@ -70,6 +165,10 @@ def get_mock_radar_data(driver: str) -> Dict:
         }
     }
 
+# Drivers used by mock whole-grid responses
+MOCK_GRID = ["VER", "NOR", "LEC", "PIA", "HAM", "RUS"]
+
+
 def get_mock_stint_data(driver: str) -> Dict:
     """Generate mock stint data for development/testing."""
     import random
@@ -96,6 +195,94 @@ def get_mock_stint_data(driver: str) -> Dict:
     }
 
 
+def get_mock_dominance_data(year: int, race: str) -> Dict:
+    """Generate mock whole-field mini-sector data for development/testing."""
+    import random
+    base = [round(random.uniform(1.2, 2.4), 3) for _ in range(DOMINANCE_MINISECTORS)]
+    times = [[round(t + random.uniform(0, 0.08), 3) for t in base] for _ in MOCK_GRID]
+    winners = [min(range(len(MOCK_GRID)), key=lambda d: times[d][i]) for i in range(DOMINANCE_MINISECTORS)]
+    return {
+        "race": race,
+        "year": year,
+        "is_mock": True,
+        "n_sectors": DOMINANCE_MINISECTORS,
+        "lap_length_m": 5000.0,
+        "drivers": MOCK_GRID,
+        "winners": winners,
+        "sectors_won": {d: winners.count(i) for i, d in enumerate(MOCK_GRID) if winners.count(i)},
+        "sector_times": times,
+        "sector_positions": []
+    }
+
+
+def get_mock_trace_data(driver: str, points: int) -> Dict:
+    """Generate a mock downsampled lap trace for development/testing."""
+    import random
+    distance = [round(5000 * i / (points - 1), 1) for i in range(points)]
+    speed = [int(200 + 100 * math.sin(d / 400) + random.uniform(-5, 5)) for d in distance]
+    return {
+        "driver": driver,
+        "lap": 1,
+        "lap_time": round(random.uniform(88, 92), 3),
+        "samples": points,
+        "channels": {
+            "speed": {"distance": distance, "value": speed},
+            "throttle": {"distance": distance, "value": [min(max(int((v - 150) / 1.5), 0), 100) for v in speed]},
+            "brake": {"distance": distance, "value": [int(v < 160) for v in speed]}
+        }
+    }
+
+
+# =============================================================================
+# JOBS
+# =============================================================================
+
+async def run_analytics_job(request: Request, kind: str, cache_key: str, factory,
+                            mode: str, error_prefix: str):
+    """Run a cache miss as a shared job: wait for its result, or answer 202 in async mode."""
+    try:
+        job = analytics_jobs.submit(kind, cache_key, factory)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+    if mode == "async" and not job.done:
+        body = job.to_dict()
+        body["poll"] = str(request.url_for("get_analytics_job", job_id=job.id))
+        return JSONResponse(status_code=202, content=body,
+                            headers={"Location": body["poll"], "Retry-After": str(body["eta_seconds"])})
+
+    try:
+        return await job.wait()
+    except AnalyticsTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except asyncio.CancelledError:
+        if not isinstance(job.error, asyncio.CancelledError):
+            # This request was cancelled, not the job
+            raise
+        raise HTTPException(status_code=503, detail=f"{error_prefix}: job cancelled, retry",
+                            headers={"Retry-After": str(WORKER_RESTART_RETRY_SECONDS)})
+    except BrokenProcessPool:
+        raise HTTPException(status_code=503, detail=f"{error_prefix}: analytics worker restarted, retry",
+                            headers={"Retry-After": str(WORKER_RESTART_RETRY_SECONDS)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"{error_prefix}: {str(e)}")
+
+
+@router.get("/jobs/{job_id}")
+async def get_analytics_job(job_id: str):
+    """
+    Status of an analytics job started with `mode=async`.
+
+    While queued or running the body carries `eta_seconds`; once done it
+    carries `result` (or `error` if the job failed). Finished jobs are
+    kept for 15 minutes.
+    """
+    job = analytics_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job.to_dict()
+
+
 # =============================================================================
 # ANALYTICS ENDPOINTS
 # =============================================================================
@@ -105,7 +292,9 @@ async def get_driver_radar(
     year: int,
     race: str,
     driver: str,
-    session_type: str = Query("R", description="Session type: R=Race, Q=Qualifying, FP1/FP2/FP3")
+    request: Request,
+    session_type: str = Query("R", description="Session type: R=Race, Q=Qualifying, FP1/FP2/FP3"),
+    mode: str = MODE_QUERY
 ):
     """
     Generate radar chart metrics for a driver's performance.
@@ -123,98 +312,185 @@ async def get_driver_radar(
     
     All values are normalized 0-1 for radar chart display.
     """
-    cache_key = f"radar_{year}_{race}_{driver}_{session_type}"
+    race = await canonical_race(year, race)
+    cache_key = analytics_key("radar", year, race, driver, session_type)
     cached = analytics_cache_get(cache_key)
     if cached:
         return cached
     
     if not FASTF1_AVAILABLE:
         # Return mock data for development
-        result = get_mock_radar_data(driver)
-        result["year"] = year
-        result["race"] = race
-        result["session_type"] = session_type
-        result["is_mock"] = True
-        analytics_cache_set(cache_key, result)
-        return result
+        return _mock_radar(year, race, driver, session_type, cache_key)
     
-    try:
-        # Run FastF1 processing in thread pool (it's CPU-bound)
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, _calculate_radar_metrics, year, race, driver, session_type)
-        result["is_mock"] = False
-        analytics_cache_set(cache_key, result)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analytics processing failed: {str(e)}")
+    return await run_analytics_job(
+        request, "radar", cache_key,
+        lambda: _compute_radar(year, race, driver, session_type, cache_key),
+        mode, "Analytics processing failed"
+    )
+
+
+def _mock_radar(year: int, race: str, driver: str, session_type: str, cache_key: str) -> Dict:
+    result = get_mock_radar_data(driver)
+    result["year"] = year
+    result["race"] = race
+    result["session_type"] = session_type
+    result["is_mock"] = True
+    analytics_cache_set(cache_key, result)
+    return result
+
+
+async def _compute_radar(year: int, race: str, driver: str, session_type: str, cache_key: str) -> Dict:
+    # Run FastF1 processing in a worker process (it's CPU-bound)
+    result = await analytics_pool.run((year, race.lower()), _calculate_radar_metrics, year, race, driver, session_type)
+    result["is_mock"] = False
+    analytics_cache_set(cache_key, result)
+    return result
 
 
 def _calculate_radar_metrics(year: int, race: str, driver: str, session_type: str) -> Dict:
-    """Calculate radar metrics using FastF1 (runs in thread pool)."""
-    import fastf1
+    """Calculate radar metrics using FastF1 (runs in a pool worker)."""
+    result = _calculate_radar_batch(year, race, [driver], session_type)[driver]
+    if "error" in result:
+        raise ValueError(result["error"])
+    return result
+
+
+def _pad_rows(rows: List[Any]) -> Any:
+    """Stack ragged 1-D arrays into a NaN-padded (len(rows), longest) float array."""
+    import numpy as np
+
+    stacked = np.full((len(rows), max(len(r) for r in rows)), np.nan)
+    for i, row in enumerate(rows):
+        stacked[i, :len(row)] = row
+    return stacked
+
+
+def _calculate_radar_batch(year: int, race: str, drivers: List[str], session_type: str) -> Dict[str, Dict]:
+    """
+    Radar metrics for several drivers from one loaded session.
+
+    Each driver's fastest-lap telemetry is extracted once and stacked into
+    NaN-padded (driver x sample) arrays, so every metric is one array
+    operation for the whole group. Drivers without laps get {"error": ...}.
+    """
     import numpy as np
     
-    # Load session
-    session = fastf1.get_session(year, race, session_type)
-    session.load()
+    # Load session (shared with the other analytics for this race)
+    session = get_loaded_session(year, race, session_type, "telemetry")
+    tyres = _tyre_baseline(year, race, session_type, session.laps)
     
-    # Get driver laps
-    driver_laps = session.laps.pick_driver(driver)
+    found, speed, brake, throttle, consistency = [], [], [], [], []
+    results: Dict[str, Dict] = {}
+    for driver in drivers:
+        driver_laps = session.laps.pick_driver(driver)
+        if driver_laps.empty:
+            results[driver] = {"driver": driver, "error": f"No lap data found for driver {driver}"}
+            continue
+        
+        # Fastest lap telemetry for the car-behaviour metrics
+        telemetry = driver_laps.pick_fastest().get_telemetry()
+        found.append(driver)
+        speed.append(telemetry['Speed'].to_numpy(dtype=float))
+        brake.append(telemetry['Brake'].to_numpy(dtype=float))
+        throttle.append(telemetry['Throttle'].to_numpy(dtype=float))
+        
+        # Consistency: Lap time standard deviation (inverted: lower = better)
+        lap_seconds = driver_laps['LapTime'].dropna().dt.total_seconds().to_numpy()
+        consistency.append(1 - min(float(lap_seconds.std(ddof=1)) / 5, 1.0) if len(lap_seconds) > 1 else 0.9)
     
-    if driver_laps.empty:
-        raise ValueError(f"No lap data found for driver {driver}")
+    if not found:
+        return results
     
-    # Get fastest lap for telemetry analysis
-    fastest_lap = driver_laps.pick_fastest()
-    telemetry = fastest_lap.get_telemetry()
+    speed, brake, throttle = _pad_rows(speed), _pad_rows(brake), _pad_rows(throttle)
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        
+        # Top speed: Max recorded speed on the lap
+        top_speed = np.nanmax(speed, axis=1)
+        
+        # Braking depth: Average brake application at high-speed points
+        braking_depth = np.nanmean(np.where(speed > 250, brake, np.nan), axis=1)
+        braking_depth = np.where(np.isnan(braking_depth), 0.5, braking_depth)
+        
+        # Throttle aggression: Rate of throttle application
+        throttle_aggression = np.minimum(np.nanmean(np.abs(np.diff(throttle, axis=1)), axis=1) / 10, 1.0)
+        
+        # Corner exit speed: The 20 lowest speed points averaged (NaN padding sorts last)
+        corner_exit = np.nanmean(np.sort(speed, axis=1)[:, :20], axis=1)
     
-    # Calculate metrics
-    top_speed = float(telemetry['Speed'].max())
+    for i, driver in enumerate(found):
+        # Normalize all values to 0-1 range
+        # These are approximate normalizations based on typical F1 values
+        normalized = {
+            "top_speed": {"value": float(top_speed[i]), "normalized": min(float(top_speed[i]) / 370, 1.0)},
+            "braking_depth": {"value": float(braking_depth[i]), "normalized": float(braking_depth[i])},
+            "throttle_aggression": {"value": float(throttle_aggression[i]), "normalized": float(throttle_aggression[i])},
+            "corner_exit_speed": {"value": float(corner_exit[i]), "normalized": min(float(corner_exit[i]) / 320, 1.0)},
+            "consistency": {"value": consistency[i], "normalized": consistency[i]},
+            "tyre_management": tyres["drivers"].get(driver, {"value": None, "normalized": 0.5})
+        }
+        results[driver] = {
+            "driver": driver,
+            "race": race,
+            "year": year,
+            "session_type": session_type,
+            "metrics": normalized
+        }
     
-    # Braking depth: Average brake pressure at high-speed points
-    high_speed_brake = telemetry[telemetry['Speed'] > 250]['Brake'].mean()
-    braking_depth = float(high_speed_brake) if not np.isnan(high_speed_brake) else 0.5
+    return results
+
+
+def _tyre_baseline(year: int, race: str, session_type: str, laps) -> Dict[str, Any]:
+    """
+    Tyre management for every driver in a session, relative to the field.
     
-    # Throttle aggression: Rate of throttle application
-    throttle_diff = telemetry['Throttle'].diff().abs().mean()
-    throttle_aggression = min(float(throttle_diff) / 10, 1.0)
+    Uses the laps already loaded for the radar. All stints of the session
+    are fitted in one pass and each driver's slopes compared with the
+    field's median on the same compound (stint_analysis). The result is
+    cached per session, so radar for the rest of the field reuses it.
+    `value` is the driver's degradation vs the field in s/lap (None when
+    none of their stints could be fitted, e.g. short qualifying runs,
+    which score a neutral 0.5).
+    """
+    import numpy as np
     
-    # Corner exit speed: Minimum speed points averaged
-    corner_exit = float(telemetry['Speed'].nsmallest(20).mean())
+    key = repr(session_key(year, race, session_type))
+    cached = _tyre_baselines.get(key)
+    if cached is not None:
+        return cached
     
-    # Consistency: Lap time standard deviation (inverted: lower = better)
-    valid_laps = driver_laps[driver_laps['LapTime'].notna()]
-    if len(valid_laps) > 1:
-        lap_times_seconds = valid_laps['LapTime'].dt.total_seconds()
-        consistency = 1 - min(float(lap_times_seconds.std()) / 5, 1.0)
-    else:
-        consistency = 0.9
-    
-    # Normalize all values to 0-1 range
-    # These are approximate normalizations based on typical F1 values
-    normalized = {
-        "top_speed": {"value": top_speed, "normalized": min(top_speed / 370, 1.0)},
-        "braking_depth": {"value": braking_depth, "normalized": braking_depth},
-        "throttle_aggression": {"value": throttle_aggression, "normalized": throttle_aggression},
-        "corner_exit_speed": {"value": corner_exit, "normalized": min(corner_exit / 320, 1.0)},
-        "consistency": {"value": consistency, "normalized": consistency},
-        "tyre_management": {"value": 0.85, "normalized": 0.85}  # Placeholder - needs stint analysis
-    }
+    laps = laps[laps['Driver'].notna() & laps['LapNumber'].notna()].sort_values(['Driver', 'LapNumber'])
+    baseline: Dict[str, Any] = {"compound_median": {}, "drivers": {}}
+    if not laps.empty:
+        arrays = _stint_arrays(laps)
+        segments = arrays["segments"]
+        timed = ~np.isnan(arrays["lap_seconds"])
+        stint_laps = np.bincount(segments["lap_stint"][timed], minlength=len(arrays["rates"]))
+        field = field_relative_degradation(
+            segments["driver"], segments["compound"], arrays["rates"], arrays["fitted"], stint_laps,
+            len(arrays["codes"])
+        )
+        baseline["compound_median"] = {
+            str(compound): round(float(median), 4)
+            for compound, median in zip(arrays["compounds"], field["compound_median"]) if not np.isnan(median)
+        }
+        for code, delta, score in zip(arrays["codes"], field["delta"], field["score"]):
+            baseline["drivers"][str(code)] = (
+                {"value": None, "normalized": 0.5} if np.isnan(delta)
+                else {"value": round(float(delta), 4), "normalized": round(float(score), 4)}
+            )
     
-    return {
-        "driver": driver,
-        "race": race,
-        "year": year,
-        "session_type": session_type,
-        "metrics": normalized
-    }
+    _tyre_baselines.set(key, baseline)
+    return baseline
 
 
 @router.get("/stint/{year}/{race}/{driver}")
 async def get_stint_analysis(
     year: int,
     race: str,
-    driver: str
+    driver: str,
+    request: Request,
+    mode: str = MODE_QUERY
 ):
     """
     Analyze tyre stints and degradation for a driver.
@@ -229,7 +505,8 @@ async def get_stint_analysis(
     
     Useful for strategy analysis and prediction modeling.
     """
-    cache_key = f"stint_{year}_{race}_{driver}"
+    race = await canonical_race(year, race)
+    cache_key = analytics_key("stint", year, race, driver)
     cached = analytics_cache_get(cache_key)
     if cached:
         return cached
@@ -242,92 +519,176 @@ async def get_stint_analysis(
         analytics_cache_set(cache_key, result)
         return result
     
-    try:
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, _calculate_stint_metrics, year, race, driver)
-        result["is_mock"] = False
+    return await run_analytics_job(
+        request, "stint", cache_key,
+        lambda: _compute_stint(year, race, driver, cache_key),
+        mode, "Stint analysis failed"
+    )
+
+
+async def _compute_stint(year: int, race: str, driver: str, cache_key: str) -> Dict:
+    result = await analytics_pool.run((year, race.lower()), _calculate_stint_metrics, year, race, driver)
+    result["is_mock"] = False
+    analytics_cache_set(cache_key, result)
+    return result
+
+
+@router.get("/stint/{year}/{race}")
+async def get_grid_stint_analysis(
+    year: int,
+    race: str,
+    request: Request,
+    mode: str = MODE_QUERY
+):
+    """
+    Tyre stints and degradation for every driver in the race.
+    
+    Same per-driver shape as /stint/{year}/{race}/{driver}, computed for
+    the whole grid in one pass (about the cost of one driver). Each
+    driver's stints are also cached for the single-driver route.
+    """
+    race = await canonical_race(year, race)
+    cache_key = analytics_key("stint_grid", year, race)
+    cached = analytics_cache_get(cache_key)
+    if cached:
+        return cached
+    
+    if not FASTF1_AVAILABLE:
+        drivers = []
+        for driver in MOCK_GRID:
+            stints = get_mock_stint_data(driver)
+            stints["year"] = year
+            stints["race"] = race
+            drivers.append(stints)
+        result = {"year": year, "race": race, "is_mock": True, "drivers": drivers}
         analytics_cache_set(cache_key, result)
         return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Stint analysis failed: {str(e)}")
+    
+    return await run_analytics_job(
+        request, "stint_grid", cache_key,
+        lambda: _compute_grid_stints(year, race, cache_key),
+        mode, "Stint analysis failed"
+    )
 
 
-def _calculate_stint_metrics(year: int, race: str, driver: str) -> Dict:
-    """Calculate stint/tyre degradation metrics using FastF1."""
-    import fastf1
+async def _compute_grid_stints(year: int, race: str, cache_key: str) -> Dict:
+    result = await analytics_pool.run((year, race.lower()), _calculate_grid_stints, year, race)
+    store_grid_stints(year, race, result, cache_key)
+    return result
+
+
+def store_radar_batch(year: int, race: str, session_type: str, batch: Dict[str, Dict]):
+    """Cache each driver's radar from a batch result; drivers that errored are left out."""
+    for driver, radar in batch.items():
+        if "error" not in radar:
+            radar["is_mock"] = False
+            analytics_cache_set(analytics_key("radar", year, race, driver, session_type), radar)
+
+
+def store_grid_stints(year: int, race: str, result: Dict, cache_key: str):
+    """Cache a grid stint result and each driver's share of it."""
+    result["is_mock"] = False
+    for stints in result["drivers"]:
+        analytics_cache_set(analytics_key("stint", year, race, stints["driver"]), {**stints, "is_mock": False})
+    analytics_cache_set(cache_key, result)
+
+
+def _race_laps(year: int, race: str, columns: List[str], drivers: Optional[List[str]] = None):
+    """Race laps (stored copy, else FastF1) sorted by driver and lap number."""
+    laps = read_laps(year, race, 'R', columns, drivers)
+    if laps is None:
+        session = get_loaded_session(year, race, 'R', "laps")
+        laps = session.laps
+        if drivers is not None:
+            laps = laps[laps['Driver'].isin(drivers)]
+    return laps[laps['Driver'].notna() & laps['LapNumber'].notna()].sort_values(['Driver', 'LapNumber'])
+
+
+def _stint_arrays(laps) -> Dict[str, Any]:
+    """Per-lap arrays for stint_analysis, the stint segmentation and every stint's fit."""
     import numpy as np
     
-    session = fastf1.get_session(year, race, 'R')
-    session.load()
+    codes, driver_ids = np.unique(laps['Driver'].astype(str).to_numpy(), return_inverse=True)
+    compounds, compound_ids = np.unique(laps['Compound'].fillna('UNKNOWN').astype(str).to_numpy(), return_inverse=True)
+    stint_numbers = laps['Stint'].to_numpy(dtype=float) if 'Stint' in laps.columns else np.full(len(laps), np.nan)
+    lap_numbers = laps['LapNumber'].to_numpy(dtype=float).astype(int)
+    lap_seconds = laps['LapTime'].dt.total_seconds().to_numpy(dtype=float)
     
-    driver_laps = session.laps.pick_driver(driver)
+    segments = segment_stints(driver_ids, lap_numbers, compound_ids, stint_numbers)
+    rates, fitted = fit_stints(segments["lap_stint"], lap_seconds, len(segments["driver"]))
+    return {
+        "codes": codes,
+        "driver_ids": driver_ids,
+        "compounds": compounds,
+        "lap_seconds": lap_seconds,
+        "segments": segments,
+        "rates": rates,
+        "fitted": fitted
+    }
+
+
+def _stints_by_driver(year: int, race: str, drivers: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """
+    Stints and degradation rates per driver from the race laps.
     
-    if driver_laps.empty:
-        raise ValueError(f"No lap data found for driver {driver}")
+    The laps are read column-wise (from the session store when the race
+    was ingested, otherwise from FastF1) and handed to stint_analysis,
+    which segments and fits every stint of every driver in one pass.
+    """
+    import numpy as np
     
-    # Group laps by stint
-    stints = []
-    current_stint = None
-    current_compound = None
+    laps = _race_laps(year, race, ["Driver", "LapNumber", "Compound", "Stint", "LapTime"], drivers)
+    if laps.empty:
+        return {}
     
-    for _, lap in driver_laps.iterrows():
-        compound = lap.get('Compound', 'UNKNOWN')
-        lap_number = int(lap['LapNumber'])
-        lap_time = lap['LapTime']
-        
-        if compound != current_compound:
-            if current_stint:
-                stints.append(current_stint)
-            current_stint = {
-                "stint_number": len(stints) + 1,
-                "compound": compound,
-                "start_lap": lap_number,
-                "end_lap": lap_number,
-                "lap_times": []
-            }
-            current_compound = compound
-        
-        if current_stint:
-            current_stint["end_lap"] = lap_number
-            if lap_time and not np.isnan(lap_time.total_seconds()):
-                current_stint["lap_times"].append(float(lap_time.total_seconds()))
-    
-    if current_stint:
-        stints.append(current_stint)
-    
-    # Calculate degradation rate for each stint
-    for stint in stints:
-        lap_times = stint["lap_times"]
-        if len(lap_times) >= 5:
-            # Linear regression to find degradation rate
-            x = np.arange(len(lap_times))
-            y = np.array(lap_times)
-            
-            # Remove outliers (pit in/out laps)
-            median = np.median(y)
-            valid_mask = np.abs(y - median) < 3
-            
-            if valid_mask.sum() >= 3:
-                slope, _ = np.polyfit(x[valid_mask], y[valid_mask], 1)
-                stint["degradation_rate"] = round(float(slope), 4)
-            else:
-                stint["degradation_rate"] = 0.03
-        else:
-            stint["degradation_rate"] = 0.03
+    arrays = _stint_arrays(laps)
+    codes, compounds, lap_seconds = arrays["codes"], arrays["compounds"], arrays["lap_seconds"]
+    segments = arrays["segments"]
+    rates = arrays["rates"]
     
-    return {
-        "driver": driver,
-        "race": race,
-        "year": year,
-        "stints": stints
-    }
+    # Lap times grouped by stint (laps are already in stint order)
+    timed = ~np.isnan(lap_seconds)
+    boundaries = np.cumsum(np.bincount(segments["lap_stint"][timed], minlength=len(rates)))[:-1]
+    lap_times = np.split(lap_seconds[timed], boundaries)
+    
+    results: Dict[str, Dict] = {}
+    for i in range(len(rates)):
+        driver = str(codes[segments["driver"][i]])
+        entry = results.setdefault(driver, {"driver": driver, "race": race, "year": year, "stints": []})
+        entry["stints"].append({
+            "stint_number": int(segments["stint_number"][i]),
+            "compound": str(compounds[segments["compound"][i]]),
+            "start_lap": int(segments["start_lap"][i]),
+            "end_lap": int(segments["end_lap"][i]),
+            "lap_times": [float(t) for t in lap_times[i]],
+            "degradation_rate": round(float(rates[i]), 4)
+        })
+    return results
+
+
+def _calculate_stint_metrics(year: int, race: str, driver: str) -> Dict:
+    """Calculate stint/tyre degradation metrics using FastF1."""
+    result = _stints_by_driver(year, race, [driver]).get(driver)
+    if result is None:
+        raise ValueError(f"No lap data found for driver {driver}")
+    return result
+
+
+def _calculate_grid_stints(year: int, race: str) -> Dict:
+    """Stint metrics for every driver in the race."""
+    by_driver = _stints_by_driver(year, race)
+    if not by_driver:
+        raise ValueError(f"No lap data found for {year} {race}")
+    return {"year": year, "race": race, "drivers": [by_driver[d] for d in sorted(by_driver)]}
 
 
 @router.get("/comparison/{year}/{race}")
 async def get_driver_comparison(
     year: int,
     race: str,
-    drivers: str = Query(..., description="Comma-separated driver codes (e.g., VER,HAM,NOR)")
+    request: Request,
+    drivers: str = Query(..., description="Comma-separated driver codes (e.g., VER,HAM,NOR)"),
+    mode: str = MODE_QUERY
 ):
     """
     Compare multiple drivers' performance metrics.
@@ -336,37 +697,64 @@ async def get_driver_comparison(
     Cache TTL: 24 hours
     
     Returns radar metrics for all requested drivers,
-    formatted for overlay comparison charts.
+    formatted for overlay comparison charts. Drivers without a cached
+    radar are computed together in one job from a single session parse,
+    and their radars are cached for single-driver requests too.
     """
     driver_list = [d.strip().upper() for d in drivers.split(",")]
     
     if len(driver_list) > 5:
         raise HTTPException(status_code=400, detail="Maximum 5 drivers for comparison")
     
-    cache_key = f"comparison_{year}_{race}_{'_'.join(sorted(driver_list))}"
+    race = await canonical_race(year, race)
+    cache_key = analytics_key("comparison", year, race, ",".join(sorted(driver_list)))
     cached = analytics_cache_get(cache_key)
     if cached:
         return cached
     
-    # Fetch radar data for each driver
-    results = []
+    if not FASTF1_AVAILABLE:
+        return await _compute_comparison(year, race, driver_list, cache_key)
+    
+    return await run_analytics_job(
+        request, "comparison", cache_key,
+        lambda: _compute_comparison(year, race, driver_list, cache_key),
+        mode, "Comparison failed"
+    )
+
+
+async def _compute_comparison(year: int, race: str, driver_list: List[str], cache_key: str) -> Dict:
+    # Cached radars first; every missing driver is computed in one worker job
+    radars: Dict[str, Dict] = {}
+    missing = []
     for driver in driver_list:
+        radar = analytics_cache_get(analytics_key("radar", year, race, driver, "R"))
+        if radar:
+            radars[driver] = radar
+        elif FASTF1_AVAILABLE:
+            missing.append(driver)
+        else:
+            radars[driver] = _mock_radar(year, race, driver, "R", analytics_key("radar", year, race, driver, "R"))
+    
+    if missing:
         try:
-            radar = await get_driver_radar(year, race, driver)
-            results.append(radar)
+            batch = await analytics_pool.run((year, race.lower()), _calculate_radar_batch, year, race, missing, "R")
         except Exception as e:
-            results.append({
-                "driver": driver,
-                "error": str(e)
-            })
+            batch = {driver: {"driver": driver, "error": str(e)} for driver in missing}
+        # Later single-driver requests hit these
+        store_radar_batch(year, race, "R", batch)
+        radars.update(batch)
     
+    results = [radars[driver] for driver in driver_list]
     result = {
         "year": year,
         "race": race,
+        "is_mock": not FASTF1_AVAILABLE,
         "drivers": results
     }
     
-    analytics_cache_set(cache_key, result)
+    # Don't keep a comparison with a failed driver around for a day
+    if not any("error" in r for r in results):
+        analytics_cache_set(cache_key, result)
     return result
 
 
@@ -374,84 +762,480 @@ async def get_driver_comparison(
 async def get_track_dominance(
     year: int,
     race: str,
-    driver: str = Query(..., description="Driver code")
+    request: Request,
+    driver: Optional[str] = Query(None, description="Driver code (omit for the whole field)"),
+    mode: str = MODE_QUERY
 ):
     """
-    Analyze where a driver gains/loses time on track.
+    Mini-sector dominance: who is fastest where on the lap.
     
-    Returns mini-sector analysis showing:
-    - Sectors where driver is faster than average
-    - Sectors where driver is slower
-    - Speed differential at each point
+    Every driver's fastest lap is split into the same 50 equal-length
+    mini-sectors. Without `driver` the response is the whole field:
+    driver codes, the winning driver index per mini-sector, each driver's
+    mini-sector times, sectors won and mini-sector positions for drawing
+    the track. With `driver` it is that driver's view: time, delta to the
+    fastest and status (fastest / faster or slower than the field median)
+    per mini-sector.
     
+    Computed once per session for the whole field.
     Cache TTL: 7 days (track data doesn't change)
+    
+    In async mode the polled job result is the whole-field document.
     """
-    cache_key = f"dominance_{year}_{race}_{driver}"
-    cached = analytics_cache_get(cache_key, ttl_hours=168)  # 7 days
-    if cached:
-        return cached
+    race = await canonical_race(year, race)
+    cache_key = analytics_key("dominance", year, race)
+    field = analytics_cache_get(cache_key, ttl_hours=168)  # 7 days
     
-    if not FASTF1_AVAILABLE:
-        # Return simplified mock data
-        return {
+    if not field and not FASTF1_AVAILABLE:
+        field = get_mock_dominance_data(year, race)
+        analytics_cache_set(cache_key, field)
+    
+    if not field:
+        field = await run_analytics_job(
+            request, "dominance", cache_key,
+            lambda: _compute_dominance(year, race, cache_key),
+            mode, "Track analysis failed"
+        )
+        if isinstance(field, JSONResponse):
+            return field
+    
+    if driver is None:
+        return field
+    try:
+        return driver_view(field, driver.upper())
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+async def _compute_dominance(year: int, race: str, cache_key: str) -> Dict:
+    result = await analytics_pool.run((year, race.lower()), _calculate_track_dominance, year, race)
+    result["is_mock"] = False
+    analytics_cache_set(cache_key, result)
+    return result
+
+
+def _fastest_lap_rows(laps):
+    """Each driver's fastest timed lap row, as pick_fastest() chooses it."""
+    laps = laps[laps['LapTime'].notna()]
+    if 'IsPersonalBest' in laps.columns:
+        # Personal bests only, where the driver has one
+        best = laps['IsPersonalBest'].fillna(False).astype(bool)
+        laps = laps[best | ~best.groupby(laps['Driver']).transform('any')]
+    return laps.loc[laps.groupby('Driver')['LapTime'].idxmin()]
+
+
+def _stored_fastest_laps(year: int, race: str) -> Optional[List[Dict]]:
+    """Fastest-lap car and position samples per driver from the session store, or None."""
+    if not has_parts(year, race, 'R', ["laps", "car", "pos"]):
+        return None
+    laps = read_laps(year, race, 'R', ["Driver", "LapTime", "LapStartTime", "Time", "IsPersonalBest"])
+    
+    traces = []
+    for _, lap in _fastest_lap_rows(laps).iterrows():
+        driver = str(lap['Driver'])
+        start, end = lap['LapStartTime'], lap['Time']
+        car = read_driver_data(year, race, 'R', "car", driver, ["SessionTime", "Speed"])
+        pos = read_driver_data(year, race, 'R', "pos", driver, ["SessionTime", "X", "Y"])
+        if car is None:
+            continue
+        car = car[(car['SessionTime'] >= start) & (car['SessionTime'] <= end)]
+        trace = {
             "driver": driver,
-            "race": race,
-            "year": year,
-            "is_mock": True,
-            "sectors": [
-                {"sector": 1, "delta": -0.15, "status": "faster"},
-                {"sector": 2, "delta": 0.08, "status": "slower"},
-                {"sector": 3, "delta": -0.22, "status": "faster"}
-            ]
+            "lap_seconds": lap['LapTime'].total_seconds(),
+            "car_seconds": (car['SessionTime'] - start).dt.total_seconds().to_numpy(dtype=float),
+            "speed": car['Speed'].to_numpy(dtype=float)
         }
+        if pos is not None:
+            pos = pos[(pos['SessionTime'] >= start) & (pos['SessionTime'] <= end)]
+            trace["pos_seconds"] = (pos['SessionTime'] - start).dt.total_seconds().to_numpy(dtype=float)
+            trace["x"] = pos['X'].to_numpy(dtype=float)
+            trace["y"] = pos['Y'].to_numpy(dtype=float)
+        traces.append(trace)
+    return traces
+
+
+def _session_fastest_laps(year: int, race: str) -> List[Dict]:
+    """Fastest-lap car and position samples per driver from a FastF1 load."""
+    import numpy as np
     
-    try:
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, _calculate_track_dominance, year, race, driver)
-        analytics_cache_set(cache_key, result)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Track analysis failed: {str(e)}")
+    session = get_loaded_session(year, race, 'R', "telemetry")
+    
+    traces = []
+    for driver in sorted(str(d) for d in session.laps['Driver'].dropna().unique()):
+        fastest = session.laps.pick_driver(driver).pick_fastest()
+        lap_time = fastest.get('LapTime') if fastest is not None else None
+        # NaT.total_seconds() is NaN
+        if not hasattr(lap_time, 'total_seconds') or np.isnan(lap_time.total_seconds()):
+            continue
+        try:
+            # Car data only: no position merge needed for time vs distance
+            car = fastest.get_car_data()
+            pos = fastest.get_pos_data()
+        except Exception:
+            continue
+        traces.append({
+            "driver": driver,
+            "lap_seconds": lap_time.total_seconds(),
+            "car_seconds": car['Time'].dt.total_seconds().to_numpy(dtype=float),
+            "speed": car['Speed'].to_numpy(dtype=float),
+            "pos_seconds": pos['Time'].dt.total_seconds().to_numpy(dtype=float),
+            "x": pos['X'].to_numpy(dtype=float),
+            "y": pos['Y'].to_numpy(dtype=float)
+        })
+    return traces
 
 
-def _calculate_track_dominance(year: int, race: str, driver: str) -> Dict:
-    """Calculate track dominance using mini-sector analysis."""
-    import fastf1
+def _calculate_track_dominance(year: int, race: str) -> Dict:
+    """Mini-sector dominance for the whole field from each driver's fastest lap."""
+    import numpy as np
+    
+    # The columnar store (when the race was ingested) avoids a FastF1 parse
+    traces = _stored_fastest_laps(year, race)
+    if traces is None:
+        traces = _session_fastest_laps(year, race)
+    traces = [t for t in traces if len(t["car_seconds"]) > 1 and not np.isnan(t["lap_seconds"])]
+    if not traces:
+        raise ValueError(f"No lap data found for {year} {race}")
+    
+    # Close every trace at the line so the last mini-sector is complete
+    for t in traces:
+        if t["car_seconds"][-1] < t["lap_seconds"]:
+            t["car_seconds"] = np.append(t["car_seconds"], t["lap_seconds"])
+            t["speed"] = np.append(t["speed"], t["speed"][-1])
+    
+    drivers = [t["driver"] for t in traces]
+    distances = [integrate_distance(t["car_seconds"], t["speed"]) for t in traces]
+    grid = minisector_times(distances, [t["car_seconds"] for t in traces], DOMINANCE_MINISECTORS)
+    winners = fastest_by_sector(grid["times"])
     
-    session = fastf1.get_session(year, race, 'R')
-    session.load()
-    
-    driver_laps = session.laps.pick_driver(driver)
-    fastest = driver_laps.pick_fastest()
-    
-    # Get sector times
-    sectors = []
-    for i in range(1, 4):
-        sector_key = f'Sector{i}Time'
-        if sector_key in fastest.keys():
-            sector_time = fastest[sector_key]
-            if sector_time:
-                sectors.append({
-                    "sector": i,
-                    "time": float(sector_time.total_seconds()) if hasattr(sector_time, 'total_seconds') else float(sector_time),
-                    "status": "personal_best"  # Would need session comparison for actual status
-                })
+    # Mini-sector midpoints on the fastest lap's line, for drawing the map
+    positions = []
+    best = min(range(len(traces)), key=lambda i: traces[i]["lap_seconds"])
+    line = traces[best]
+    if len(line.get("pos_seconds", [])) > 1:
+        pos_distance = np.interp(line["pos_seconds"], line["car_seconds"], distances[best])
+        middles = (grid["edges"][:-1] + grid["edges"][1:]) / 2
+        positions = [
+            [round(float(x), 1), round(float(y), 1)]
+            for x, y in zip(np.interp(middles, pos_distance, line["x"]), np.interp(middles, pos_distance, line["y"]))
+        ]
     
+    won = np.bincount(winners[winners >= 0], minlength=len(drivers))
     return {
-        "driver": driver,
         "race": race,
         "year": year,
-        "is_mock": False,
-        "sectors": sectors
+        "n_sectors": DOMINANCE_MINISECTORS,
+        "lap_length_m": round(float(grid["edges"][-1]), 1),
+        "drivers": drivers,
+        "winners": [int(w) for w in winners],
+        "sectors_won": {drivers[i]: int(won[i]) for i in range(len(drivers)) if won[i]},
+        "sector_times": [
+            [None if np.isnan(t) else round(float(t), 3) for t in row] for row in grid["times"]
+        ],
+        "sector_positions": positions
+    }
+
+
+@router.get("/trace/{year}/{race}")
+async def get_lap_traces(
+    year: int,
+    race: str,
+    request: Request,
+    drivers: str = Query(..., description="Comma-separated driver codes (e.g., VER,HAM,NOR)"),
+    lap: str = Query("fastest", pattern=r"^(fastest|\d+)$", description="Lap number, or 'fastest'"),
+    points: int = Query(TRACE_DEFAULT_POINTS, ge=10, le=TRACE_MAX_POINTS, description="Points per channel"),
+    session_type: str = Query("R", description="Session type (R, Q, FP1, etc.)"),
+    mode: str = MODE_QUERY
+):
+    """
+    Speed, throttle and brake traces over distance for lap overlays.
+    
+    Each channel is downsampled to `points` with LTTB, which keeps the
+    shape (peaks, braking points, lifts) of the full-resolution trace.
+    Traces are cached per (driver, lap, points); drivers without a cached
+    trace are computed together in one job from a single session parse.
+    """
+    driver_list = [d.strip().upper() for d in drivers.split(",") if d.strip()]
+    if not driver_list or len(driver_list) > TRACE_MAX_DRIVERS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {TRACE_MAX_DRIVERS} drivers per trace overlay")
+    race = await canonical_race(year, race)
+    session_type = session_type.upper()
+    
+    def trace_key(driver: str) -> str:
+        return analytics_key("trace", year, race, driver, f"{session_type}:{lap}:{points}")
+    
+    traces = {}
+    for driver in driver_list:
+        cached = analytics_cache_get(trace_key(driver), ttl_hours=168)
+        if cached:
+            traces[driver] = cached
+        elif not FASTF1_AVAILABLE:
+            traces[driver] = get_mock_trace_data(driver, points)
+    
+    missing = [d for d in driver_list if d not in traces]
+    if not missing:
+        return _trace_response(year, race, session_type, lap, points, driver_list, traces)
+    
+    return await run_analytics_job(
+        request, "trace", trace_key(",".join(driver_list)),
+        lambda: _compute_traces(year, race, session_type, lap, points, driver_list, traces, missing, trace_key),
+        mode, "Trace failed"
+    )
+
+
+def _trace_response(year: int, race: str, session_type: str, lap: str, points: int,
+                    driver_list: List[str], traces: Dict[str, Dict]) -> Dict:
+    return {
+        "year": year,
+        "race": race,
+        "session_type": session_type,
+        "lap": lap,
+        "points": points,
+        "is_mock": not FASTF1_AVAILABLE,
+        "drivers": [traces[d] for d in driver_list]
+    }
+
+
+async def _compute_traces(year: int, race: str, session_type: str, lap: str, points: int, driver_list: List[str],
+                          traces: Dict[str, Dict], missing: List[str], trace_key) -> Dict:
+    batch = await analytics_pool.run(
+        (year, race.lower()), _calculate_traces, year, race, session_type, missing, lap, points
+    )
+    for driver, trace in batch.items():
+        if "error" not in trace:
+            analytics_cache_set(trace_key(driver), trace)
+    return _trace_response(year, race, session_type, lap, points, driver_list, {**traces, **batch})
+
+
+def _select_lap_rows(laps, lap: str):
+    """The requested lap ("fastest" or a lap number) for every driver in `laps`."""
+    if lap == "fastest":
+        return _fastest_lap_rows(laps)
+    return laps[(laps['LapNumber'] == int(lap)) & laps['LapTime'].notna()].drop_duplicates('Driver')
+
+
+def _calculate_traces(year: int, race: str, session_type: str, drivers: List[str], lap: str,
+                      points: int) -> Dict[str, Dict]:
+    """
+    Downsampled speed/throttle/brake traces for one lap of each driver.
+    
+    Car samples come from the session store when the session was ingested
+    (only these drivers' files and columns are read), otherwise from the
+    loaded FastF1 session. Distance is integrated from speed, as for
+    track dominance. Drivers without the lap get {"error": ...}.
+    """
+    import numpy as np
+    
+    columns = ["SessionTime", "Speed", "Throttle", "Brake"]
+    samples: Dict[str, Any] = {}
+    if has_parts(year, race, session_type, ["laps", "car"]):
+        laps = read_laps(year, race, session_type,
+                         ["Driver", "LapNumber", "LapTime", "LapStartTime", "Time", "IsPersonalBest"], drivers)
+        for _, row in _select_lap_rows(laps, lap).iterrows():
+            driver = str(row['Driver'])
+            car = read_driver_data(year, race, session_type, "car", driver, columns)
+            if car is None:
+                continue
+            start = row['LapStartTime']
+            car = car[(car['SessionTime'] >= start) & (car['SessionTime'] <= row['Time'])]
+            samples[driver] = (row, (car['SessionTime'] - start).dt.total_seconds().to_numpy(dtype=float), car)
+    else:
+        session = get_loaded_session(year, race, session_type, "telemetry")
+        laps = session.laps[session.laps['Driver'].isin(drivers)]
+        for _, row in _select_lap_rows(laps, lap).iterrows():
+            try:
+                car = session.laps.loc[[row.name]].iloc[0].get_car_data()
+            except Exception:
+                continue
+            samples[str(row['Driver'])] = (row, car['Time'].dt.total_seconds().to_numpy(dtype=float), car)
+    
+    results: Dict[str, Dict] = {}
+    for driver in drivers:
+        if driver not in samples or len(samples[driver][1]) < 2:
+            results[driver] = {"driver": driver, "error": f"No {lap} lap telemetry for driver {driver}"}
+            continue
+        row, seconds, car = samples[driver]
+        speed = car['Speed'].to_numpy(dtype=float)
+        channels = {
+            "speed": speed,
+            "throttle": car['Throttle'].to_numpy(dtype=float),
+            "brake": car['Brake'].to_numpy(dtype=float)
+        }
+        results[driver] = {
+            "driver": driver,
+            "lap": int(row['LapNumber']) if not np.isnan(row['LapNumber']) else None,
+            "lap_time": round(row['LapTime'].total_seconds(), 3),
+            "samples": len(seconds),
+            "channels": downsample_channels(integrate_distance(seconds, speed), channels, points)
+        }
+    return results
+
+
+@router.get("/season/{year}")
+async def get_season_form(year: int):
+    """
+    Season-to-date form for every driver.
+    
+    Per compound degradation, qualifying vs race pace delta and lap time
+    consistency with its trend over the rounds. Answered from the season
+    aggregates, which are updated as each race is processed (precompute),
+    so past sessions are never reloaded here.
+    """
+    result = season_store.season(year)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No processed races for {year} yet")
+    return result
+
+
+@router.get("/season/{year}/{driver}")
+async def get_driver_season_form(year: int, driver: str):
+    """One driver's season-to-date form, with their figures race by race."""
+    result = season_store.driver(year, driver)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No processed races for {driver.upper()} in {year}")
+    return result
+
+
+def fold_race_form(year: int, race: str, result: Dict) -> int:
+    """Fold a `_calculate_race_form` result into the season aggregates."""
+    return season_store.fold_race(year, race, result["round"], result["drivers"])
+
+
+def _round_number(year: int, race: str) -> Optional[int]:
+    try:
+        return int(fastf1.get_event(year, race)["RoundNumber"])
+    except Exception:
+        return None
+
+
+def _quali_best(year: int, race: str) -> Dict[str, float]:
+    """Each driver's fastest qualifying lap in seconds ({} if qualifying isn't available)."""
+    try:
+        laps = read_laps(year, race, 'Q', ["Driver", "LapTime"])
+        if laps is None:
+            laps = get_loaded_session(year, race, 'Q', "laps").laps
+    except Exception as e:
+        print(f"WARNING: No qualifying laps for {year} {race}: {e}")
+        return {}
+    best = laps.dropna(subset=['Driver', 'LapTime']).groupby('Driver')['LapTime'].min()
+    return {str(driver): float(t.total_seconds()) for driver, t in best.items()}
+
+
+def _calculate_race_form(year: int, race: str) -> Dict:
+    """
+    Each driver's form in one race, as folded into the season aggregates.
+    
+    Race pace and consistency use clean laps only: timed, not a pit in or
+    out lap and within CLEAN_LAP_FACTOR of the driver's fastest lap.
+    Degradation counts fitted stints only, weighted by their timed laps.
+    """
+    import numpy as np
+    import pandas as pd
+    
+    laps = _race_laps(year, race, ["Driver", "Team", "LapNumber", "Compound", "Stint", "LapTime",
+                                   "PitInTime", "PitOutTime"])
+    if laps.empty:
+        raise ValueError(f"No lap data found for {year} {race}")
+    
+    arrays = _stint_arrays(laps)
+    codes, driver_ids, lap_seconds = arrays["codes"], arrays["driver_ids"], arrays["lap_seconds"]
+    segments, rates, fitted = arrays["segments"], arrays["rates"], arrays["fitted"]
+    
+    timed = ~np.isnan(lap_seconds)
+    stint_laps = np.bincount(segments["lap_stint"][timed], minlength=len(rates))
+    
+    racing = timed.copy()
+    for column in ("PitInTime", "PitOutTime"):
+        if column in laps.columns:
+            racing &= laps[column].isna().to_numpy()
+    fastest = np.full(len(codes), np.inf)
+    np.fmin.at(fastest, driver_ids[racing], lap_seconds[racing])
+    clean = racing & (lap_seconds <= CLEAN_LAP_FACTOR * fastest[driver_ids])
+    pace = pd.Series(lap_seconds[clean]).groupby(driver_ids[clean]).agg(["median", "mean", "std", "count"])
+    
+    teams = laps.dropna(subset=['Team']).groupby('Driver')['Team'].first() if 'Team' in laps.columns else {}
+    quali = _quali_best(year, race)
+    
+    forms = []
+    for i, code in enumerate(codes):
+        code = str(code)
+        compounds: Dict[str, Dict[str, Any]] = {}
+        for s in np.flatnonzero(fitted & (segments["driver"] == i)):
+            stats = compounds.setdefault(str(arrays["compounds"][segments["compound"][s]]),
+                                         {"slope_laps": 0.0, "laps": 0, "stints": 0})
+            stats["slope_laps"] += float(rates[s]) * int(stint_laps[s])
+            stats["laps"] += int(stint_laps[s])
+            stats["stints"] += 1
+        
+        race_pace, consistency, clean_laps = None, None, 0
+        if i in pace.index:
+            row = pace.loc[i]
+            clean_laps = int(row["count"])
+            race_pace = round(float(row["median"]), 3)
+            if clean_laps >= MIN_CONSISTENCY_LAPS:
+                consistency = round(float(row["std"] / row["mean"] * 100), 4)
+        
+        quali_best = quali.get(code)
+        delta = None
+        if race_pace is not None and quali_best:
+            delta = round((race_pace - quali_best) / quali_best * 100, 4)
+        
+        forms.append({
+            "driver": code,
+            "team": str(teams[code]) if code in teams else None,
+            "race_pace": race_pace,
+            "quali_best": round(quali_best, 3) if quali_best else None,
+            "pace_delta_pct": delta,
+            "consistency_pct": consistency,
+            "clean_laps": clean_laps,
+            "compounds": compounds
+        })
+    
+    return {"year": year, "race": race, "round": _round_number(year, race), "drivers": forms}
+
+
+def _list_session_drivers(year: int, race: str, session_type: str) -> List[str]:
+    """Driver codes with laps in a session (loads it into the worker's cache)."""
+    session = get_loaded_session(year, race, session_type, "laps")
+    if session.laps.empty:
+        # Don't let a retry (precompute) be served this session again
+        session_cache.evict(year, race, session_type)
+        raise ValueError(f"No lap data yet for {year} {race} {session_type}")
+    return sorted(str(code) for code in session.laps['Driver'].dropna().unique())
+
+
+def _drop_race_data(year: int, race: str) -> Dict[str, Any]:
+    """
+    Forget a race's loaded sessions, tyre baselines and stored session copy.
+
+    Runs on the race's worker (the caches are per process), so the next
+    load of the race parses it afresh.
+    """
+    prefix = repr((int(year), race.strip().lower()))[:-1] + ","
+    return {
+        "sessions": session_cache.evict_race(year, race),
+        "tyre_baselines": _tyre_baselines.delete_where(lambda key: key.startswith(prefix)),
+        "stored_copy": delete_stored_race(year, race)
     }
 
 
 @router.get("/health")
 async def analytics_health():
     """Check if analytics service is operational."""
+    # Scanning the disk cache walks the filesystem; keep it off the event loop
+    loop = asyncio.get_event_loop()
+    disk_usage = await loop.run_in_executor(None, disk_cache.stats)
     return {
         "status": "healthy",
         "fastf1_available": FASTF1_AVAILABLE,
         "cache_dir": CACHE_DIR,
-        "cache_entries": len(_analytics_cache)
+        "cache_entries": len(_analytics_cache),
+        "caches": cache_stats(),
+        "sessions": session_cache.stats(),
+        "pool": analytics_pool.stats(),
+        "store": _result_store.stats(),
+        "jobs": analytics_jobs.stats(),
+        "session_store": store_stats(),
+        "disk_cache": disk_usage,
+        "season_store": season_store.stats()
     }
@@ -0,0 +1,204 @@
+"""
+F1 Apex Analytics Jobs
+In-flight analytics computations as pollable jobs.
+
+A cache miss on an analytics route becomes a job keyed by its result cache
+key, so identical requests attach to the computation already running
+instead of starting another. Callers either wait for the job (sync mode)
+or get a 202 with the job id and an ETA and poll `/analysis/jobs/{id}`
+(async mode), which keeps requests short under serverless timeouts.
+
+ETAs come from an exponentially weighted average of past run times per
+analysis kind plus the work queued ahead. The number of unfinished jobs is
+bounded; past the bound new work is shed with QueueFull (503).
+"""
+
+import asyncio
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+ANALYTICS_MAX_PENDING_JOBS = int(os.environ.get("ANALYTICS_MAX_PENDING_JOBS", 32))
+
+# Finished jobs stay pollable this long
+JOB_RESULT_TTL_SECONDS = 900
+MAX_FINISHED_JOBS = 512
+
+# Weight of the newest run time in the per-kind average
+ETA_SMOOTHING = 0.3
+
+# Starting estimates (seconds) before any job of a kind has run
+DEFAULT_RUN_SECONDS = {
+    "radar": 12.0,
+    "stint": 8.0,
+    "stint_grid": 10.0,
+    "comparison": 20.0,
+    "dominance": 10.0,
+    "trace": 8.0
+}
+
+
+class QueueFull(Exception):
+    """Raised when too many analytics jobs are already waiting or running."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Analytics queue is full, try again shortly")
+        self.retry_after = retry_after
+
+
+class AnalyticsJob:
+    """One computation: status, timing estimate and, when finished, result or error."""
+
+    def __init__(self, kind: str, key: str, estimate: float, eta: float):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.estimate = estimate
+        self.status = "queued"     # queued | running | done | failed
+        self.created_at = datetime.now().isoformat()
+        self.submitted = time.monotonic()
+        self.eta_at = self.submitted + eta
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.attached = 0
+        self._done = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def remaining(self) -> float:
+        """Estimated seconds of work this job still represents."""
+        if self.done:
+            return 0.0
+        if self.started is None:
+            return self.estimate
+        return max(self.estimate - (time.monotonic() - self.started), 1.0)
+
+    async def wait(self) -> Any:
+        """Wait for the job; returns its result or raises its error."""
+        await self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def to_dict(self) -> Dict[str, Any]:
+        body = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "attached_requests": self.attached
+        }
+        if self.done:
+            body["run_seconds"] = round(self.finished - (self.started or self.finished), 2)
+            if self.error is None:
+                body["result"] = self.result
+            else:
+                body["error"] = str(self.error) or type(self.error).__name__
+        else:
+            body["eta_seconds"] = math.ceil(max(self.eta_at - time.monotonic(), 1.0))
+        return body
+
+
+class JobQueue:
+    """Deduplicating, bounded runner for analytics jobs with run-time based ETAs."""
+
+    def __init__(self, max_pending: int, concurrency: int):
+        self.max_pending = max_pending
+        self.concurrency = max(concurrency, 1)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._active: Dict[str, AnalyticsJob] = {}               # cache key -> unfinished job
+        self._jobs: "OrderedDict[str, AnalyticsJob]" = OrderedDict()  # job id -> job
+        self.estimates = dict(DEFAULT_RUN_SECONDS)
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.shed = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _backlog_seconds(self) -> float:
+        return sum(job.remaining() for job in self._active.values()) / self.concurrency
+
+    def submit(self, kind: str, key: str, factory: Callable[[], Awaitable[Any]]) -> AnalyticsJob:
+        """
+        Return the unfinished job for `key`, or start `factory()` as a new one.
+
+        Raises QueueFull when `max_pending` jobs are already unfinished.
+        """
+        job = self._active.get(key)
+        if job is not None:
+            job.attached += 1
+            self.deduplicated += 1
+            return job
+
+        if len(self._active) >= self.max_pending:
+            self.shed += 1
+            raise QueueFull(retry_after=max(self._backlog_seconds(), 1.0))
+
+        estimate = self.estimates.get(kind, max(DEFAULT_RUN_SECONDS.values()))
+        job = AnalyticsJob(kind, key, estimate, self._backlog_seconds() + estimate)
+        self._active[key] = job
+        self._jobs[job.id] = job
+        self._prune()
+        self.submitted += 1
+        asyncio.ensure_future(self._run(job, factory))
+        return job
+
+    async def _run(self, job: AnalyticsJob, factory: Callable[[], Awaitable[Any]]):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started = time.monotonic()
+                job.result = await factory()
+            job.status = "done"
+            self.completed += 1
+            elapsed = time.monotonic() - job.started
+            self.estimates[job.kind] = ETA_SMOOTHING * elapsed + (1 - ETA_SMOOTHING) * job.estimate
+        except BaseException as e:
+            job.status = "failed"
+            job.error = e
+            self.failed += 1
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            job.finished = time.monotonic()
+            self._active.pop(job.key, None)
+            job._done.set()
+
+    def get(self, job_id: str) -> Optional[AnalyticsJob]:
+        return self._jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.monotonic() - JOB_RESULT_TTL_SECONDS
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        excess = len(finished) - MAX_FINISHED_JOBS
+        for job_id in finished:
+            job = self._jobs[job_id]
+            if excess > 0 or job.finished < cutoff:
+                del self._jobs[job_id]
+                excess -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": len(self._active),
+            "max_pending": self.max_pending,
+            "concurrency": self.concurrency,
+            "backlog_seconds": round(self._backlog_seconds(), 1),
+            "tracked": len(self._jobs),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "shed": self.shed,
+            "completed": self.completed,
+            "failed": self.failed,
+            "estimates": {kind: round(seconds, 1) for kind, seconds in self.estimates.items()}
+        }
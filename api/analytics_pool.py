@@ -0,0 +1,223 @@
+"""
+F1 Apex Analytics Worker Pool
+Runs FastF1 analytics in dedicated worker processes, away from the event loop.
+
+FastF1/pandas work holds the GIL for seconds at a time, so running it on
+the default thread executor stalls every other request in the process,
+including the live endpoints. Jobs run instead in a small, fixed set of
+single-process workers:
+
+- Workers are started with a warm-up initializer (FastF1 imported, disk
+  cache enabled and trimmed to its budget) and keep their own loaded-session cache (f1_sessions.py).
+- Jobs for the same race always go to the same worker, so one parse
+  serves every analytic for that race.
+- Each job has a timeout. A job that times out or is cancelled while
+  running has its worker terminated and replaced, which is the only way
+  to stop a running process job. Jobs queued behind it on that worker are
+  resubmitted to the replacement (within their own timeouts) rather than
+  failed.
+
+Set ANALYTICS_WORKERS=0 (or run where processes can't be started, e.g.
+without /dev/shm) to fall back to the thread executor.
+"""
+
+import asyncio
+import atexit
+import multiprocessing
+import os
+import threading
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ANALYTICS_WORKERS = int(os.environ.get("ANALYTICS_WORKERS", min(2, os.cpu_count() or 1)))
+ANALYTICS_JOB_TIMEOUT = float(os.environ.get("ANALYTICS_JOB_TIMEOUT", 180))
+
+
+class AnalyticsTimeout(Exception):
+    """Raised when an analytics job exceeds its timeout (its worker is recycled)."""
+
+
+def warm_worker(cache_dir: str):
+    """Worker initializer: pay FastF1's import and cache setup once per process."""
+    try:
+        import fastf1
+        import numpy  # noqa: F401
+        import pandas  # noqa: F401
+        fastf1.Cache.enable_cache(cache_dir)
+    except ImportError:
+        return
+    # Start from a disk cache within budget; loads keep it there (fastf1_cache.py)
+    from fastf1_cache import disk_cache
+    disk_cache.maybe_housekeep()
+
+
+class AnalyticsPool:
+    """Fixed set of single-process workers with race affinity, timeouts and recycling."""
+
+    def __init__(self, workers: int, cache_dir: str, timeout: float):
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self._slots: List[Optional[ProcessPoolExecutor]] = [None] * workers
+        # Bumped on every recycle, so a job can tell its worker was replaced under it
+        self._generations = [0] * workers
+        self._running = [0] * workers
+        self._lock = threading.Lock()
+        self.fallback_reason: Optional[str] = None if workers > 0 else "ANALYTICS_WORKERS=0"
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self.resubmitted = 0
+
+    def _slot_for(self, affinity: Any) -> int:
+        return zlib.crc32(repr(affinity).encode("utf-8")) % self.workers
+
+    def _executor(self, slot: int) -> Tuple[Optional[ProcessPoolExecutor], int]:
+        """The slot's executor (started if needed) and its generation; None when using threads."""
+        with self._lock:
+            if self.fallback_reason is not None:
+                return None, 0
+            if self._slots[slot] is None:
+                try:
+                    self._slots[slot] = ProcessPoolExecutor(
+                        max_workers=1,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=warm_worker,
+                        initargs=(self.cache_dir,)
+                    )
+                except (OSError, NotImplementedError, ImportError) as e:
+                    # No process support here (e.g. serverless without /dev/shm)
+                    self.fallback_reason = f"process pool unavailable: {e}"
+                    print(f"WARNING: Analytics {self.fallback_reason}; using threads")
+                    return None, 0
+            return self._slots[slot], self._generations[slot]
+
+    def _submit(self, slot: int, fn: Callable, args: tuple) -> Tuple[Optional[Future], int]:
+        """Submit to the slot's worker, replacing it once if it is already broken."""
+        executor, generation = self._executor(slot)
+        if executor is None:
+            return None, 0
+        try:
+            return executor.submit(fn, *args), generation
+        except (BrokenProcessPool, RuntimeError):
+            self.recycle(slot, generation)
+            executor, generation = self._executor(slot)
+            return executor.submit(fn, *args), generation
+
+    def recycle(self, slot: int, generation: Optional[int] = None):
+        """
+        Terminate a worker (and whatever it is running); a fresh one starts on next use.
+
+        With `generation`, only if the slot still runs that worker, so two
+        jobs reacting to the same failure don't replace it twice.
+        """
+        with self._lock:
+            executor = self._slots[slot]
+            if executor is None or (generation is not None and generation != self._generations[slot]):
+                return
+            self._slots[slot] = None
+            self._generations[slot] += 1
+            self.recycled += 1
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, affinity: Any, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """
+        Run `fn(*args)` on the worker owning `affinity` (e.g. (year, race)).
+
+        Raises AnalyticsTimeout after `timeout` seconds (default
+        ANALYTICS_JOB_TIMEOUT), and BrokenProcessPool if the worker died
+        while running this job. `fn` must be a picklable module-level function.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        slot = self._slot_for(affinity) if self.workers > 0 else 0
+
+        self.submitted += 1
+        counted = crashed = False
+        try:
+            while True:
+                future, generation = self._submit(slot, fn, args) if self.workers > 0 else (None, 0)
+                if future is None:
+                    job = loop.run_in_executor(None, fn, *args)
+                else:
+                    job = asyncio.wrap_future(future)
+                    if not counted:
+                        self._running[slot] += 1
+                        counted = True
+
+                try:
+                    done, _ = await asyncio.wait({job}, timeout=max(deadline - loop.time(), 0))
+                except asyncio.CancelledError:
+                    # The caller went away: stop the work rather than let it hog the worker
+                    if future is not None and not future.cancel():
+                        self.recycle(slot, generation)
+                    job.cancel()
+                    raise
+
+                if not done:
+                    self.timeouts += 1
+                    # Only a job that is actually running needs its worker killed
+                    if future is not None and not future.cancel():
+                        self.recycle(slot, generation)
+                    job.cancel()
+                    raise AnalyticsTimeout(f"Analytics job exceeded {timeout:.0f}s")
+
+                if future is not None and (job.cancelled() or isinstance(job.exception(), BrokenProcessPool)):
+                    if self._generations[slot] != generation:
+                        # Another job's timeout replaced the worker before this one ran
+                        self.resubmitted += 1
+                        continue
+                    # The worker died; a queued job can't tell whether it was the cause,
+                    # so each job gets one retry on a fresh worker
+                    self.recycle(slot, generation)
+                    if not crashed:
+                        crashed = True
+                        self.resubmitted += 1
+                        continue
+                    self.failed += 1
+                    raise BrokenProcessPool("Analytics worker stopped while running the job")
+
+                try:
+                    result = job.result()
+                except Exception:
+                    self.failed += 1
+                    raise
+                self.completed += 1
+                return result
+        finally:
+            if counted:
+                self._running[slot] -= 1
+
+    def shutdown(self):
+        for slot in range(self.workers):
+            self.recycle(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "threads" if self.fallback_reason else "processes",
+            "fallback_reason": self.fallback_reason,
+            "workers": self.workers,
+            "workers_started": sum(1 for ex in self._slots if ex is not None),
+            "running": list(self._running),
+            "timeout_seconds": self.timeout,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "recycled": self.recycled,
+            "resubmitted": self.resubmitted
+        }
+
+
+def create_pool(cache_dir: str) -> AnalyticsPool:
+    pool = AnalyticsPool(ANALYTICS_WORKERS, cache_dir, ANALYTICS_JOB_TIMEOUT)
+    atexit.register(pool.shutdown)
+    return pool
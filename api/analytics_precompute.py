@@ -0,0 +1,252 @@
+"""
+F1 Apex Analytics Precompute
+Post-race warmup that fills the analytics result cache for the whole grid.
+
+After a race the first user to open radar or stint analysis would otherwise
+wait for the session parse and the computation. A precompute job loads the
+session once (on one pool worker, which keeps it cached), then computes
+radar, stints and mini-sector dominance for the whole grid in one pass
+each, and stores each result (and each driver's share) under the same key
+the endpoints read. Comparisons are assembled from the per-driver radar
+results, so these cover them too. The race's per-driver form is also
+folded into the season aggregates (season_aggregates.py).
+
+Sessions are often not on the FastF1 feed straight after the flag; a job
+keeps retrying the load until the data appears or it runs out of attempts.
+Jobs are started from the admin endpoint or by race settlement (main.py).
+A forced job (including one for a re-settled race) first drops the race's
+cached results, and on its worker the loaded sessions, tyre baselines and
+stored session copy, so the recompute parses the race afresh. FastF1's
+own download cache is kept.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from analytics_f1 import (
+    FASTF1_AVAILABLE, analytics_cache_get, analytics_cache_set, analytics_key, analytics_pool,
+    canonical_race, fold_race_form, invalidate_race, season_store, store_grid_stints, store_radar_batch,
+    _calculate_grid_stints, _calculate_race_form, _calculate_radar_batch, _calculate_track_dominance,
+    _drop_race_data, _list_session_drivers
+)
+
+# Retry the session load this often until data is published
+PRECOMPUTE_RETRY_SECONDS = float(os.environ.get("PRECOMPUTE_RETRY_SECONDS", 900))
+PRECOMPUTE_MAX_ATTEMPTS = int(os.environ.get("PRECOMPUTE_MAX_ATTEMPTS", 8))
+
+# Finished jobs kept for progress reporting
+MAX_JOB_HISTORY = 20
+
+
+class PrecomputeJob:
+    """One race's warmup: progress counters and per-analysis timings."""
+
+    def __init__(self, year: int, race: str, session_types: Sequence[str], force: bool = False):
+        self.year = year
+        self.race = race
+        self.session_types = [s.upper() for s in session_types]
+        self.force = force
+
+        self.status = "pending"    # pending | waiting | running | done | failed
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+
+        self.total = 0
+        self.computed = 0
+        self.skipped = 0
+        self.failures: List[Dict[str, str]] = []
+        self.seconds: Dict[str, float] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("pending", "waiting", "running")
+
+    def _plan(self, session_type: str, drivers: List[str]) -> List[Tuple[str, str, Any, tuple, int]]:
+        """(analysis, driver, function, args, ttl hours) for every result to produce."""
+        year, race = self.year, self.race
+        # One batch for the drivers whose radar isn't cached yet (or all of them when forced)
+        pending = [
+            d for d in drivers
+            if self.force or analytics_cache_get(analytics_key("radar", year, race, d, session_type)) is None
+        ]
+        plan = [("radar", "", _calculate_radar_batch, (year, race, pending, session_type), 24)]
+        # Stint, dominance and season form analyse the race only
+        if session_type == "R":
+            plan.append(("stint_grid", "", _calculate_grid_stints, (year, race), 24))
+            plan.append(("dominance", "", _calculate_track_dominance, (year, race), 168))
+            plan.append(("season_form", "", _calculate_race_form, (year, race), 0))
+        return plan
+
+    async def _load_drivers(self, session_type: str) -> Optional[List[str]]:
+        """Load the session on its worker, retrying until it is published."""
+        affinity = (self.year, self.race.lower())
+        while True:
+            self.attempts += 1
+            started = time.monotonic()
+            try:
+                drivers = await analytics_pool.run(affinity, _list_session_drivers, self.year, self.race, session_type)
+                self.seconds[f"load_{session_type}"] = round(time.monotonic() - started, 2)
+                return drivers
+            except Exception as e:
+                self.error = str(e)
+                if self.attempts >= PRECOMPUTE_MAX_ATTEMPTS:
+                    return None
+                self.status = "waiting"
+                await asyncio.sleep(PRECOMPUTE_RETRY_SECONDS)
+                self.status = "running"
+
+    async def run(self):
+        self.started_at = datetime.now().isoformat()
+        if not FASTF1_AVAILABLE:
+            self.status = "failed"
+            self.error = "FastF1 not installed"
+            self.finished_at = datetime.now().isoformat()
+            return
+
+        self.status = "running"
+        affinity = (self.year, self.race.lower())
+        try:
+            if self.force:
+                # Results from the old data must not be served while it recomputes,
+                # nor the old parse be reused by the recompute
+                invalidate_race(self.year, self.race)
+                await analytics_pool.run(affinity, _drop_race_data, self.year, self.race)
+            for session_type in self.session_types:
+                drivers = await self._load_drivers(session_type)
+                if drivers is None:
+                    self.status = "failed"
+                    return
+                self.error = None
+
+                plan = self._plan(session_type, drivers)
+                # Radar is counted per driver; cached drivers are left out of its batch
+                self.total += len(plan) - 1 + len(drivers)
+                for analysis, driver, fn, args, ttl_hours in plan:
+                    if analysis == "radar":
+                        pending = args[2]
+                        self.skipped += len(drivers) - len(pending)
+                        key, done = "", not pending
+                    elif analysis == "season_form":
+                        # Folded into the season aggregates, not the result cache
+                        key, done = "", season_store.has_race(self.year, self.race)
+                    else:
+                        key = analytics_key(analysis, self.year, self.race, driver)
+                        done = analytics_cache_get(key, ttl_hours=ttl_hours) is not None
+                    if analysis == "radar" and done:
+                        continue
+                    if not self.force and done:
+                        self.skipped += 1
+                        continue
+
+                    started = time.monotonic()
+                    try:
+                        result = await analytics_pool.run(affinity, fn, *args)
+                    except Exception as e:
+                        failed = pending if analysis == "radar" else [driver]
+                        self.failures.extend({"analysis": analysis, "driver": d, "error": str(e)} for d in failed)
+                        continue
+                    if analysis == "radar":
+                        store_radar_batch(self.year, self.race, session_type, result)
+                        errors = [{"analysis": analysis, "driver": d, "error": r["error"]}
+                                  for d, r in result.items() if "error" in r]
+                        self.failures.extend(errors)
+                        self.computed += len(result) - len(errors)
+                    elif analysis == "stint_grid":
+                        # Also fills each driver's stint entry
+                        store_grid_stints(self.year, self.race, result, key)
+                    elif analysis == "season_form":
+                        fold_race_form(self.year, self.race, result)
+                    else:
+                        result["is_mock"] = False
+                        analytics_cache_set(key, result)
+                    if analysis != "radar":
+                        self.computed += 1
+                    self.seconds[analysis] = round(self.seconds.get(analysis, 0.0) + time.monotonic() - started, 2)
+
+            self.status = "done"
+        except asyncio.CancelledError:
+            self.status = "failed"
+            self.error = "cancelled"
+            raise
+        except Exception as e:
+            # Never leave an active-looking job behind; start_precompute would keep returning it
+            self.status = "failed"
+            self.error = str(e)
+        finally:
+            self.finished_at = datetime.now().isoformat()
+
+    def progress(self) -> Dict[str, Any]:
+        finished = self.computed + self.skipped + len(self.failures)
+        return {
+            "year": self.year,
+            "race": self.race,
+            "session_types": self.session_types,
+            "status": self.status,
+            "error": self.error,
+            "attempts": self.attempts,
+            "total": self.total,
+            "computed": self.computed,
+            "skipped": self.skipped,
+            "failed": len(self.failures),
+            "failures": self.failures[:20],
+            "percent": round(finished / self.total * 100, 1) if self.total else 0.0,
+            "seconds": self.seconds,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+# =============================================================================
+# JOB REGISTRY
+# =============================================================================
+
+_jobs: "OrderedDict[Tuple[int, str], PrecomputeJob]" = OrderedDict()
+
+
+async def start_precompute(year: int, race: str, session_types: Sequence[str] = ("R",),
+                           force: bool = False) -> PrecomputeJob:
+    """
+    Start warming a race, or return its job if one is already in progress.
+
+    A forced start replaces an unforced job in progress (it may be
+    computing from data the caller knows to be outdated).
+    """
+    # Same keys as the endpoints, whatever spelling the job was started with
+    race = await canonical_race(year, race)
+    key = (int(year), race.lower())
+    existing = _jobs.get(key)
+    if existing is not None and existing.active:
+        if existing.force or not force:
+            return existing
+        existing.task.cancel()
+
+    job = PrecomputeJob(year, race, session_types, force)
+    _jobs[key] = job
+    _jobs.move_to_end(key)
+    while len(_jobs) > MAX_JOB_HISTORY:
+        oldest = next(iter(_jobs))
+        if _jobs[oldest].active:
+            break
+        _jobs.pop(oldest)
+
+    job.task = asyncio.ensure_future(job.run())
+    return job
+
+
+async def get_precompute(year: int, race: str) -> Optional[PrecomputeJob]:
+    race = await canonical_race(year, race)
+    return _jobs.get((int(year), race.lower()))
+
+
+def list_precompute() -> List[Dict[str, Any]]:
+    """Progress of every tracked job, newest first."""
+    return [job.progress() for job in reversed(_jobs.values())]
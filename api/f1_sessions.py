@@ -0,0 +1,235 @@
+"""
+F1 Apex Session Cache
+Loaded FastF1 sessions shared by every analytic for a race.
+
+Parsing a session (`fastf1.get_session(...).load()`) is the slow part of
+every analytics request, so loaded `Session` objects are kept in memory,
+keyed by (year, race, session type), and reused by radar, stint,
+comparison and dominance. The cache is bounded by an approximate byte
+budget (the pandas frames a session holds) and a session count, evicting
+least recently used first. Concurrent requests for a session that is still
+loading wait for that one load instead of starting their own.
+
+Analytics ask for a loading profile rather than a full load: "laps" for
+lap-based work (stints), "telemetry" when car or position data is needed
+(radar, dominance), "full" for everything including weather and race
+control. A cached session is upgraded in place when a later request needs
+a richer profile.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Tuple
+
+import session_store
+from fastf1_cache import disk_cache
+
+SESSION_CACHE_MAX_BYTES = int(os.environ.get("SESSION_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+SESSION_CACHE_MAX_SESSIONS = int(os.environ.get("SESSION_CACHE_MAX_SESSIONS", 6))
+
+SessionKey = Tuple[int, str, str]
+
+# What each profile asks Session.load() for. FastF1 loads car and position
+# data together, so both are the "telemetry" profile.
+LOAD_PROFILES = {
+    "laps": {"laps": True, "telemetry": False, "weather": False, "messages": False},
+    "telemetry": {"laps": True, "telemetry": True, "weather": False, "messages": False},
+    "full": {"laps": True, "telemetry": True, "weather": True, "messages": True}
+}
+PROFILE_ORDER = ["laps", "telemetry", "full"]
+PROFILE_ALIASES = {"car": "telemetry", "position": "telemetry"}
+
+
+def profile_level(profile: str) -> int:
+    return PROFILE_ORDER.index(PROFILE_ALIASES.get(profile, profile))
+
+
+def session_key(year: int, race: str, session_type: str) -> SessionKey:
+    return (int(year), race.strip().lower(), session_type.strip().upper())
+
+
+def _frame_bytes(frame: Any) -> int:
+    try:
+        return int(frame.memory_usage(deep=True).sum())
+    except Exception:
+        return 0
+
+
+def estimate_session_bytes(session: Any) -> int:
+    """Approximate resident size of a loaded session from its pandas frames."""
+    total = 0
+    for attr in ("laps", "results", "weather_data", "race_control_messages"):
+        try:
+            total += _frame_bytes(getattr(session, attr))
+        except Exception:
+            # FastF1 raises when a part of the session wasn't loaded
+            pass
+    for attr in ("car_data", "pos_data"):
+        try:
+            total += sum(_frame_bytes(frame) for frame in getattr(session, attr).values())
+        except Exception:
+            pass
+    return total
+
+
+class SessionCache:
+    """Byte- and count-bounded LRU of loaded sessions with single-flight loading."""
+
+    def __init__(self, max_bytes: int, max_sessions: int):
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+
+        # key -> (session, size, profile level)
+        self._entries: "OrderedDict[SessionKey, Tuple[Any, int, int]]" = OrderedDict()
+        self._loading: Dict[SessionKey, Future] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0
+        self.upgrades = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get(self, year: int, race: str, session_type: str, profile: str = "full", loader=None) -> Any:
+        """
+        Return the session loaded to at least `profile`, loading at most once across threads.
+
+        A cached session with a smaller profile is upgraded in place.
+        `loader(year, race, session_type, profile, session)` defaults to
+        FastF1; `session` is the cached object to upgrade, or None.
+        """
+        key = session_key(year, race, session_type)
+        level = profile_level(profile)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[2] >= level:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+
+                future = self._loading.get(key)
+                owner = future is None
+                if owner:
+                    future = Future()
+                    self._loading[key] = future
+                    if entry is None:
+                        self.misses += 1
+                    else:
+                        self.upgrades += 1
+                else:
+                    self.joined += 1
+
+            if owner:
+                break
+            # Another thread is loading this session; its profile may be smaller than ours
+            future.result()
+
+        try:
+            started = time.monotonic()
+            base = entry[0] if entry is not None else None
+            session = (loader or load_fastf1_session)(year, race, session_type, PROFILE_ORDER[level], base)
+            size = estimate_session_bytes(session)
+            with self._lock:
+                self.load_seconds += time.monotonic() - started
+                self._store(key, session, size, level)
+            future.set_result(session)
+            return session
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+
+    def _store(self, key: SessionKey, session: Any, size: int, level: int):
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (session, size, level)
+        self._bytes += size
+
+        # Always keep the session just loaded, even if it alone is over budget
+        while len(self._entries) > 1 and (self._bytes > self.max_bytes or len(self._entries) > self.max_sessions):
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def evict(self, year: int, race: str, session_type: str):
+        with self._lock:
+            entry = self._entries.pop(session_key(year, race, session_type), None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def evict_race(self, year: int, race: str) -> int:
+        """Drop every cached session of a race. Returns the number dropped."""
+        year, race = int(year), race.strip().lower()
+        with self._lock:
+            keys = [k for k in self._entries if k[0] == year and k[1] == race]
+            for key in keys:
+                self._bytes -= self._entries.pop(key)[1]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": [
+                    {"year": k[0], "race": k[1], "session_type": k[2], "bytes": size,
+                     "profile": PROFILE_ORDER[level]}
+                    for k, (_, size, level) in self._entries.items()
+                ],
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_sessions": self.max_sessions,
+                "loading": len(self._loading),
+                "hits": self.hits,
+                "misses": self.misses,
+                "joined_loads": self.joined,
+                "upgrades": self.upgrades,
+                "evictions": self.evictions,
+                "load_seconds": round(self.load_seconds, 1)
+            }
+
+
+def load_fastf1_session(year: int, race: str, session_type: str, profile: str = "full",
+                       session: Any = None) -> Any:
+    """Load (or reload `session` with) only the data the profile needs."""
+    import fastf1
+
+    if session is None:
+        session = fastf1.get_session(year, race, session_type)
+    session.load(**LOAD_PROFILES[profile])
+
+    # FastF1 logs rather than raises when the data isn't published yet; raising
+    # here keeps the empty session out of the cache (and the store) so the
+    # next request loads it again
+    try:
+        has_laps = not session.laps.empty
+    except Exception:
+        has_laps = False
+    if not has_laps:
+        raise ValueError(f"No lap data yet for {year} {race} {session_type}")
+
+    # Keep a columnar copy so later analytics can skip this parse
+    try:
+        session_store.ingest(session, year, race, session_type)
+    except Exception as e:
+        print(f"WARNING: Session store ingest failed for {year} {race} {session_type}: {e}")
+
+    # Keep this session hot on disk and the disk cache within its budget
+    disk_cache.touch_session(session)
+    disk_cache.touch(session_store.session_dir(year, race, session_type))
+    disk_cache.maybe_housekeep()
+    return session
+
+
+session_cache = SessionCache(SESSION_CACHE_MAX_BYTES, SESSION_CACHE_MAX_SESSIONS)
+
+
+def get_loaded_session(year: int, race: str, session_type: str, profile: str = "full") -> Any:
+    """Shared FastF1 session for (year, race, session type), loaded to at least `profile`."""
+    return session_cache.get(year, race, session_type, profile)
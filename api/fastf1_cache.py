@@ -0,0 +1,221 @@
+"""
+F1 Apex FastF1 Disk Cache
+Byte-bounded housekeeping for FastF1's on-disk cache.
+
+FastF1 keeps every session it has ever loaded under the cache directory
+(pickled API responses in `<year>/<event>/<session>/`) and never removes
+anything, so on small hosts the cache eventually fills the disk and loads
+start failing. The manager treats each session directory as one cache
+entry, together with the session's Parquet copy (session_store.py), and
+keeps their total under a byte budget by deleting the least recently used
+sessions first:
+
+- A session counts as used when it is loaded or read from the session
+  store (its directory mtime is bumped), so repeat analytics keep it hot.
+- Sessions of the current season are never evicted; those are the races
+  users are looking at.
+- Sessions used in the last MIN_IDLE_SECONDS are left alone, so a load in
+  progress in another worker is not deleted under it.
+
+Files that aren't session data (FastF1's HTTP cache, the analytics result
+store) count towards usage but are never deleted here. Housekeeping runs
+when a worker starts and after loads, at most every
+FASTF1_CACHE_HOUSEKEEPING_SECONDS per process.
+"""
+
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import session_store
+
+FASTF1_CACHE_DIR = os.environ.get("FASTF1_CACHE_DIR", "/tmp/fastf1_cache")
+FASTF1_CACHE_MAX_BYTES = int(os.environ.get("FASTF1_CACHE_MAX_BYTES", 4 * 1024 * 1024 * 1024))
+FASTF1_CACHE_PROTECT_CURRENT_SEASON = os.environ.get("FASTF1_CACHE_PROTECT_CURRENT_SEASON", "1") == "1"
+FASTF1_CACHE_HOUSEKEEPING_SECONDS = float(os.environ.get("FASTF1_CACHE_HOUSEKEEPING_SECONDS", 600))
+
+# Never evict a session used this recently (it may be loading elsewhere)
+MIN_IDLE_SECONDS = 3600
+
+# Usage reports older than this are rescanned for /analysis/health
+REPORT_MAX_AGE_SECONDS = 60
+
+_YEAR = re.compile(r"^\d{4}$")
+
+
+def _dir_usage(path: str) -> Dict[str, float]:
+    """Total file size and newest mtime (including the directory's own) under `path`."""
+    size, newest = 0, 0.0
+    try:
+        newest = os.stat(path).st_mtime
+    except OSError:
+        pass
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            size += stat.st_size
+            newest = max(newest, stat.st_mtime)
+    return {"bytes": size, "last_used": newest}
+
+
+def _session_dirs(base: str) -> List[Dict[str, Any]]:
+    """`<base>/<year>/<event>/<session>` directories with their season."""
+    found = []
+    try:
+        years = [e for e in os.scandir(base) if e.is_dir() and _YEAR.match(e.name)]
+    except OSError:
+        return found
+    for year in years:
+        for event in os.scandir(year.path):
+            if not event.is_dir():
+                continue
+            for session in os.scandir(event.path):
+                if session.is_dir():
+                    found.append({"path": session.path, "year": int(year.name)})
+    return found
+
+
+class DiskCacheManager:
+    """Keeps FastF1's disk cache and the session store under a byte budget, LRU by session."""
+
+    def __init__(self, root: str, store_dir: str, max_bytes: int, protect_current_season: bool = True,
+                 interval: float = FASTF1_CACHE_HOUSEKEEPING_SECONDS):
+        self.root = root
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self.protect_current_season = protect_current_season
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last_run = 0.0
+        self._report: Optional[Dict[str, Any]] = None
+
+        self.runs = 0
+        self.evicted_sessions = 0
+        self.evicted_bytes = 0
+
+    def touch(self, path: str):
+        """Mark a session directory as just used."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def touch_session(self, session: Any):
+        """Mark a loaded FastF1 session's cache directory as just used."""
+        api_path = getattr(session, "api_path", None)
+        if api_path:
+            # FastF1 stores "/static/<year>/<event>/<session>/" under the cache dir
+            self.touch(os.path.join(self.root, api_path[len("/static/"):]))
+
+    def scan(self) -> Dict[str, Any]:
+        """Current usage: every session entry plus bytes that aren't session data."""
+        current_season = datetime.now().year
+        entries = []
+        for kind, base in (("fastf1", self.root), ("store", self.store_dir)):
+            for found in _session_dirs(base):
+                usage = _dir_usage(found["path"])
+                entries.append({
+                    "kind": kind,
+                    "path": found["path"],
+                    "year": found["year"],
+                    "bytes": usage["bytes"],
+                    "last_used": usage["last_used"],
+                    "protected": self.protect_current_season and found["year"] >= current_season
+                })
+
+        total = _dir_usage(self.root)["bytes"]
+        if os.path.relpath(self.store_dir, self.root).startswith(os.pardir):
+            total += _dir_usage(self.store_dir)["bytes"]
+        session_bytes = sum(e["bytes"] for e in entries)
+        return {"entries": entries, "bytes": total, "other_bytes": max(total - session_bytes, 0)}
+
+    def housekeep(self) -> List[Dict[str, Any]]:
+        """Evict least recently used sessions until usage fits the budget. Returns the evicted entries."""
+        with self._lock:
+            self._last_run = time.monotonic()
+            self.runs += 1
+            usage = self.scan()
+            total = usage["bytes"]
+            evicted = []
+            if total > self.max_bytes:
+                idle_before = time.time() - MIN_IDLE_SECONDS
+                candidates = sorted(
+                    (e for e in usage["entries"] if not e["protected"] and e["last_used"] < idle_before),
+                    key=lambda e: e["last_used"]
+                )
+                for entry in candidates:
+                    if total <= self.max_bytes:
+                        break
+                    shutil.rmtree(entry["path"], ignore_errors=True)
+                    # Drop the event (and season) directories once empty
+                    for parent in (os.path.dirname(entry["path"]), os.path.dirname(os.path.dirname(entry["path"]))):
+                        try:
+                            os.rmdir(parent)
+                        except OSError:
+                            break
+                    total -= entry["bytes"]
+                    evicted.append(entry)
+
+                if total > self.max_bytes:
+                    print(f"WARNING: FastF1 cache at {total} bytes is over its {self.max_bytes} byte budget "
+                          f"with nothing left to evict")
+
+            self.evicted_sessions += len(evicted)
+            self.evicted_bytes += sum(e["bytes"] for e in evicted)
+            evicted_paths = {e["path"] for e in evicted}
+            usage["entries"] = [e for e in usage["entries"] if e["path"] not in evicted_paths]
+            usage["bytes"] = total
+            usage["scanned_at"] = time.monotonic()
+            self._report = usage
+            return evicted
+
+    def maybe_housekeep(self) -> List[Dict[str, Any]]:
+        """Run housekeeping if this process hasn't in the last `interval` seconds."""
+        if self._last_run and time.monotonic() - self._last_run < self.interval:
+            return []
+        try:
+            return self.housekeep()
+        except Exception as e:
+            print(f"WARNING: FastF1 cache housekeeping failed: {e}")
+            return []
+
+    def stats(self) -> Dict[str, Any]:
+        report = self._report
+        if report is None or time.monotonic() - report["scanned_at"] > REPORT_MAX_AGE_SECONDS:
+            report = self.scan()
+            report["scanned_at"] = time.monotonic()
+            self._report = report
+
+        entries = report["entries"]
+        by_kind: Dict[str, Dict[str, int]] = {}
+        for entry in entries:
+            kind = by_kind.setdefault(entry["kind"], {"sessions": 0, "bytes": 0})
+            kind["sessions"] += 1
+            kind["bytes"] += entry["bytes"]
+        oldest = min((e["last_used"] for e in entries), default=None)
+        return {
+            "dir": self.root,
+            "bytes": report["bytes"],
+            "max_bytes": self.max_bytes,
+            "usage_percent": round(report["bytes"] / self.max_bytes * 100, 1) if self.max_bytes else None,
+            "other_bytes": report["other_bytes"],
+            "sessions": by_kind,
+            "protected_sessions": sum(1 for e in entries if e["protected"]),
+            "protected_bytes": sum(e["bytes"] for e in entries if e["protected"]),
+            "oldest_use": datetime.fromtimestamp(oldest).isoformat() if oldest else None,
+            "housekeeping_runs": self.runs,
+            "evicted_sessions": self.evicted_sessions,
+            "evicted_bytes": self.evicted_bytes
+        }
+
+
+disk_cache = DiskCacheManager(
+    FASTF1_CACHE_DIR, session_store.SESSION_STORE_DIR, FASTF1_CACHE_MAX_BYTES, FASTF1_CACHE_PROTECT_CURRENT_SEASON
+)
@@ -8,50 +8,641 @@ adding caching and normalization for the Next.js frontend.
 
 import os
 import httpx
-from fastapi import APIRouter, HTTPException, Query
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Tuple
+from datetime import datetime, timedelta, timezone
 from functools import lru_cache
+from collections import OrderedDict
 import asyncio
+import time
 
-# OpenF1 Base URL
-OPENF1_BASE = "https://api.openf1.org/v1"
+from ttl_cache import get_cache
+from upstream import (
+    CircuitBreaker, RateBudget, BudgetExceeded,
+    PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+)
+from wire_format import column, negotiate_response
+from live_timing import LiveClassification
+from live_series import TimeSeriesBuffer
+from races import get_circuit_code
+from track_geometry import get_track_geometry, register, project
+
+# OpenF1 Base URL (override to point at scripts/openf1_replay.py for offline runs)
+OPENF1_BASE = os.environ.get("OPENF1_BASE", "https://api.openf1.org/v1")
 
 # Create router
 router = APIRouter(prefix="/live", tags=["Live Telemetry"])
 
-# Simple in-memory cache with TTL
-_cache: Dict[str, tuple[Any, datetime]] = {}
+# Bounded in-memory cache with TTL (see ttl_cache.py)
+LIVE_CACHE_MAX_BYTES = int(os.environ.get("LIVE_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+_cache = get_cache("live", max_bytes=LIVE_CACHE_MAX_BYTES, max_age_seconds=300)
 
-def cache_get(key: str, ttl_seconds: int = 5) -> Optional[Any]:
+def cache_get(key: str, ttl_seconds: float = 5) -> Optional[Any]:
     """Get from cache if not expired."""
-    if key in _cache:
-        data, timestamp = _cache[key]
-        if datetime.now() - timestamp < timedelta(seconds=ttl_seconds):
-            return data
-    return None
+    return _cache.get(key, ttl_seconds)
 
 def cache_set(key: str, data: Any):
     """Set cache with timestamp."""
-    _cache[key] = (data, datetime.now())
+    _cache.set(key, data)
+
+
+# In-flight producer per cache key, so a key is only ever refreshed once at a time
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+def mark_stale(data: Any, age_seconds: float) -> Any:
+    """Copy of a cached payload flagged as stale with its age."""
+    if not isinstance(data, dict):
+        return data
+    return {**data, "stale": True, "age_seconds": round(age_seconds, 1)}
+
+
+def _refresh(cache_key: str, producer: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+    """Start (or join) the single refresh task for a key."""
+    task = _inflight.get(cache_key)
+    if task is None:
+        async def run():
+            result = await producer()
+            cache_set(cache_key, result)
+            return result
+
+        task = asyncio.ensure_future(run())
+        _inflight[cache_key] = task
+
+        def done(t: asyncio.Task):
+            _inflight.pop(cache_key, None)
+            if t.cancelled() or t.exception() is None:
+                return
+            # Budget refusals are expected deferrals, not failures
+            if not isinstance(t.exception().__cause__, BudgetExceeded):
+                print(f"WARNING: Live refresh for {cache_key} failed: {t.exception()}")
+
+        task.add_done_callback(done)
+    return task
+
+
+async def cached_or_refresh(cache_key: str, ttl_seconds: float,
+                            producer: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Stale-while-revalidate lookup for the live endpoints.
+
+    - Fresh hit: returned as is.
+    - Stale hit: the last good value is returned immediately, marked
+      `stale` with its age, while one background refresh runs.
+    - Miss: wait for the (shared) refresh; upstream errors propagate.
+    """
+    cached = cache_get(cache_key, ttl_seconds)
+    if cached is not None:
+        return cached
+
+    stale = _cache.get_stale(cache_key)
+    if stale is not None:
+        _refresh(cache_key, producer)
+        return mark_stale(*stale)
+
+    return await asyncio.shield(_refresh(cache_key, producer))
 
 
 # =============================================================================
 # OPENF1 API HELPERS
 # =============================================================================
 
+# Shared by every OpenF1 call; opens after repeated upstream failures
+openf1_breaker = CircuitBreaker("openf1", failure_threshold=5, reset_timeout=5.0, max_timeout=120.0)
+
+# OpenF1 request quota shared by all live endpoints (requests/second)
+OPENF1_RATE_LIMIT = float(os.environ.get("OPENF1_RATE_LIMIT", 6))
+openf1_budget = RateBudget("openf1", rate=OPENF1_RATE_LIMIT, burst=OPENF1_RATE_LIMIT * 2)
+
+# Timing and positions are spent first; weather and race control only
+# refresh while there's headroom and are otherwise served stale.
+openf1_budget.configure("intervals", PRIORITY_HIGH, share=0.5)
+openf1_budget.configure("drivers", PRIORITY_HIGH, share=0.5)
+openf1_budget.configure("location", PRIORITY_HIGH, share=0.5)
+openf1_budget.configure("sessions", PRIORITY_HIGH, share=0.25)
+openf1_budget.configure("car_data", PRIORITY_NORMAL, share=0.5)
+openf1_budget.configure("race_control", PRIORITY_LOW, share=0.25)
+openf1_budget.configure("weather", PRIORITY_LOW, share=0.1)
+
+
 async def fetch_openf1(endpoint: str, params: Optional[Dict] = None) -> Any:
     """Fetch data from OpenF1 API with error handling."""
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
+    # The breaker goes first so calls it rejects don't spend the rate quota
+    if not openf1_breaker.allow():
+        raise HTTPException(
+            status_code=503,
+            detail=f"OpenF1 temporarily unavailable, retrying in {openf1_breaker.retry_after():.0f}s"
+        )
+
+    # This call is the half-open breaker's single probe
+    probe = openf1_breaker.state == CircuitBreaker.HALF_OPEN
+    try:
+        await openf1_budget.acquire(endpoint)
+    except BaseException as e:
+        if probe:
+            openf1_breaker.release()
+        if isinstance(e, BudgetExceeded):
+            raise HTTPException(
+                status_code=503,
+                detail=str(e),
+                headers={"Retry-After": str(max(1, round(e.retry_after)))}
+            ) from e
+        raise
+
+    try:
+        async with httpx.AsyncClient(timeout=10.0) as client:
             url = f"{OPENF1_BASE}/{endpoint}"
             response = await client.get(url, params=params)
             response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=f"OpenF1 API error: {e}")
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"OpenF1 unreachable: {e}")
+            data = response.json()
+        openf1_breaker.record_success()
+        return data
+    except httpx.HTTPStatusError as e:
+        # Only throttling and server errors count against the upstream
+        if e.response.status_code == 429 or e.response.status_code >= 500:
+            openf1_breaker.record_failure()
+        else:
+            openf1_breaker.record_success()
+        raise HTTPException(status_code=e.response.status_code, detail=f"OpenF1 API error: {e}")
+    except httpx.RequestError as e:
+        openf1_breaker.record_failure()
+        raise HTTPException(status_code=503, detail=f"OpenF1 unreachable: {e}")
+    except Exception:
+        # e.g. a body that isn't JSON
+        openf1_breaker.record_failure()
+        raise
+    finally:
+        # A cancelled probe must not leave a half-open breaker shut for good
+        if probe:
+            openf1_breaker.release()
+
+
+def parse_openf1_date(value: str) -> datetime:
+    """Parse an OpenF1 ISO timestamp (always UTC)."""
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _epoch_seconds(value: str) -> float:
+    return parse_openf1_date(value).timestamp()
+
+
+# Row tables offered in the columnar wire format (see wire_format.py)
+TELEMETRY_COLUMNS = [
+    column("driver_number", "B"),
+    column("seq", "I"),
+    column("timestamp", "d", convert=_epoch_seconds),
+    column("speed", "H", "telemetry.speed"),
+    column("rpm", "H", "telemetry.rpm"),
+    column("throttle", "B", "telemetry.throttle"),
+    column("brake", "B", "telemetry.brake"),
+    column("gear", "b", "telemetry.gear"),
+    column("drs", "B", "telemetry.drs"),
+]
+
+HISTORY_COLUMNS = [
+    column("timestamp", "d", convert=_epoch_seconds),
+    column("speed", "H"),
+    column("throttle", "B"),
+    column("brake", "B"),
+    column("gear", "b"),
+    column("drs", "B"),
+]
+
+POSITION_COLUMNS = [
+    column("driver_number", "B"),
+    column("x", "i"),
+    column("y", "i"),
+    column("z", "i"),
+    column("timestamp", "d", convert=_epoch_seconds),
+]
+
+WEATHER_COLUMNS = [
+    column("id", "I"),
+    column("timestamp", "d", convert=_epoch_seconds),
+    column("air_temperature", "f"),
+    column("track_temperature", "f"),
+    column("humidity", "f"),
+    column("pressure", "f"),
+    column("wind_speed", "f"),
+    column("wind_direction", "f"),
+    column("rainfall", "B"),
+]
+
+POSITION_TRACK_COLUMNS = POSITION_COLUMNS + [
+    column("lap_distance", "f"),
+    column("lap_fraction", "f"),
+    column("svg_x", "f"),
+    column("svg_y", "f"),
+    column("track_offset", "f"),
+]
+
+TIMING_COLUMNS = [
+    column("position", "B"),
+    column("driver_number", "B"),
+    column("driver_code", "s"),
+    column("team_name", "s"),
+    column("team_colour", "s"),
+    column("gap_seconds", "f"),
+    column("laps_down", "B"),
+    column("interval", "f"),
+    column("seq", "I"),
+    column("date", "d", convert=_epoch_seconds),
+]
+
+
+# =============================================================================
+# SHARED TELEMETRY INGEST
+# =============================================================================
+
+# How often the shared car_data feed is pulled from OpenF1 (4Hz source)
+TELEMETRY_REFRESH_SECONDS = 0.5
+# Window fetched when a session's ingest starts with no cursor
+TELEMETRY_COLD_WINDOW_SECONDS = 10
+# Number of sessions with resident ingest state
+MAX_INGEST_SESSIONS = 8
+
+
+class TelemetryState:
+    """
+    Latest car_data sample per driver for one session.
+
+    Fed incrementally from a single all-driver OpenF1 query (`date>` the
+    last sample seen), so any number of viewers and drivers cost one
+    upstream request per refresh. Every refresh that changes at least one
+    driver bumps `seq`, and each driver remembers the seq it last changed
+    at so clients can ask for deltas.
+    """
+
+    def __init__(self, session_key: Optional[int]):
+        self.session_key = session_key
+        self.seq = 0
+        self.cursor: Optional[datetime] = None
+        self.latest: Dict[int, Dict] = {}
+        self.latest_date: Dict[int, datetime] = {}
+        self.changed_seq: Dict[int, int] = {}
+        self.refreshed_at = 0.0
+        self.ingested_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def ingest(self, rows: List[Dict]) -> List[int]:
+        """Fold new car_data rows in. Returns the driver numbers that changed."""
+        updates: Dict[int, tuple[datetime, Dict]] = {}
+        for row in rows:
+            driver_num = row.get("driver_number")
+            if driver_num is None or not row.get("date"):
+                continue
+            date = parse_openf1_date(row["date"])
+            previous = updates.get(driver_num)
+            if previous is None or date > previous[0]:
+                updates[driver_num] = (date, row)
+
+        changed = []
+        for driver_num, (date, row) in updates.items():
+            known = self.latest_date.get(driver_num)
+            if known is not None and date <= known:
+                continue
+            self.latest_date[driver_num] = date
+            self.latest[driver_num] = {
+                "driver_number": driver_num,
+                "timestamp": row.get("date"),
+                "telemetry": {
+                    "speed": row.get("speed"),
+                    "rpm": row.get("rpm"),
+                    "throttle": row.get("throttle"),
+                    "brake": row.get("brake"),
+                    "gear": row.get("n_gear"),
+                    "drs": row.get("drs")
+                }
+            }
+            changed.append(driver_num)
+            if self.cursor is None or date > self.cursor:
+                self.cursor = date
+
+        if changed:
+            self.seq += 1
+            for driver_num in changed:
+                self.changed_seq[driver_num] = self.seq
+        return changed
+
+
+_telemetry_states: "OrderedDict[str, TelemetryState]" = OrderedDict()
+_timing_states: "OrderedDict[str, TimingState]" = OrderedDict()
+
+
+def _get_state(registry: "OrderedDict[str, Any]", session_key: Optional[int], factory: Callable[[Optional[int]], Any]):
+    """Get (or create) a session's ingest state, keeping only the most recent few."""
+    key = str(session_key or "latest")
+    state = registry.get(key)
+    if state is None:
+        state = factory(session_key)
+        registry[key] = state
+        while len(registry) > MAX_INGEST_SESSIONS:
+            registry.popitem(last=False)
+    registry.move_to_end(key)
+    return state
+
+
+def get_telemetry_state(session_key: Optional[int]) -> TelemetryState:
+    return _get_state(_telemetry_states, session_key, TelemetryState)
+
+
+async def fetch_since(endpoint: str, session_key: Optional[int], cursor: Optional[datetime],
+                      cold_window_seconds: Optional[float]) -> List[Dict]:
+    """
+    Incremental OpenF1 query: rows of `endpoint` newer than `cursor`.
+
+    With no cursor yet, only the last `cold_window_seconds` are fetched (or
+    the whole session when that is None). A session that has already
+    finished has nothing in that window, so the window is anchored on the
+    session end instead.
+    """
+    params: Dict[str, Any] = {"session_key": session_key or "latest"}
+    if cursor is not None:
+        params["date>"] = cursor.isoformat()
+    elif cold_window_seconds is not None:
+        cold_start = datetime.now(timezone.utc) - timedelta(seconds=cold_window_seconds)
+        params["date>"] = cold_start.isoformat()
+
+    rows = await fetch_openf1(endpoint, params)
+
+    if not rows and cursor is None and cold_window_seconds is not None:
+        sessions = await fetch_openf1("sessions", {"session_key": params["session_key"]})
+        session = sessions[0] if sessions else {}
+        if session.get("date_end"):
+            end = parse_openf1_date(session["date_end"])
+            params["date>"] = (end - timedelta(seconds=cold_window_seconds)).isoformat()
+            rows = await fetch_openf1(endpoint, params)
+
+    return rows or []
+
+
+async def refresh_telemetry_state(state: TelemetryState):
+    """Pull new car_data for every driver at most once per refresh interval."""
+    async with state.lock:
+        now = time.monotonic()
+        if now - state.refreshed_at < TELEMETRY_REFRESH_SECONDS:
+            return
+
+        try:
+            rows = await fetch_since("car_data", state.session_key, state.cursor, TELEMETRY_COLD_WINDOW_SECONDS)
+        finally:
+            # Failed refreshes are throttled too, so waiters don't stampede upstream
+            state.refreshed_at = time.monotonic()
+
+        state.ingest(rows)
+        state.ingested_at = time.monotonic()
+
+
+# =============================================================================
+# LIVE CLASSIFICATION INGEST
+# =============================================================================
+
+# Intervals arrive roughly every 4s per car; poll the shared feed each second
+TIMING_REFRESH_SECONDS = 1.0
+TIMING_COLD_WINDOW_SECONDS = 60
+
+
+class TimingState:
+    """Incremental intervals feed for one session driving a LiveClassification."""
+
+    def __init__(self, session_key: Optional[int]):
+        self.session_key = session_key
+        self.engine = LiveClassification()
+        self.cursor: Optional[datetime] = None
+        self.refreshed_at = 0.0
+        self.ingested_at = 0.0
+        self.lock = asyncio.Lock()
+
+
+def get_timing_state(session_key: Optional[int]) -> TimingState:
+    return _get_state(_timing_states, session_key, TimingState)
+
+
+async def refresh_timing_state(state: TimingState):
+    """Ingest new interval rows and reclassify, at most once per refresh interval."""
+    async with state.lock:
+        if time.monotonic() - state.refreshed_at < TIMING_REFRESH_SECONDS:
+            return
+
+        try:
+            rows = await fetch_since("intervals", state.session_key, state.cursor, TIMING_COLD_WINDOW_SECONDS)
+        finally:
+            state.refreshed_at = time.monotonic()
+
+        if rows:
+            state.engine.ingest(rows)
+            latest = max(parse_openf1_date(r["date"]) for r in rows if r.get("date"))
+            if state.cursor is None or latest > state.cursor:
+                state.cursor = latest
+        state.engine.classify()
+        state.ingested_at = time.monotonic()
+
+
+# =============================================================================
+# RACE CONTROL & WEATHER INGEST
+# =============================================================================
+
+RACE_CONTROL_REFRESH_SECONDS = 5.0
+MAX_RACE_CONTROL_MESSAGES = 1000
+
+# OpenF1 publishes a weather sample roughly once a minute
+WEATHER_REFRESH_SECONDS = 30.0
+WEATHER_FIELDS = [
+    "air_temperature", "track_temperature", "humidity", "pressure",
+    "wind_speed", "wind_direction", "rainfall"
+]
+
+
+class RaceControlState:
+    """Race control messages for one session, each stamped with a monotonic id."""
+
+    def __init__(self, session_key: Optional[int]):
+        self.session_key = session_key
+        self.messages: List[Dict] = []
+        self.seq = 0
+        self.cursor: Optional[datetime] = None
+        self.seen_at_cursor: set = set()
+        self.refreshed_at = 0.0
+        self.ingested_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def ingest(self, rows: List[Dict]):
+        for msg in rows:
+            if not msg.get("date"):
+                continue
+            date = parse_openf1_date(msg["date"])
+            # Rows before the cursor are already held. Several messages can share the
+            # cursor's timestamp, so rows at it are new unless already seen.
+            identity = (msg.get("date"), msg.get("message"), msg.get("driver_number"))
+            if self.cursor is not None and (date < self.cursor or (date == self.cursor and identity in self.seen_at_cursor)):
+                continue
+            if self.cursor is None or date > self.cursor:
+                self.cursor = date
+                self.seen_at_cursor = set()
+            self.seen_at_cursor.add(identity)
+
+            self.seq += 1
+            self.messages.append({
+                "id": self.seq,
+                "category": msg.get("category"),
+                "message": msg.get("message"),
+                "flag": msg.get("flag"),
+                "scope": msg.get("scope"),
+                "driver_number": msg.get("driver_number"),
+                "timestamp": msg.get("date")
+            })
+        del self.messages[:-MAX_RACE_CONTROL_MESSAGES]
+
+
+class WeatherState:
+    """Weather samples for one session in a time-series ring buffer."""
+
+    def __init__(self, session_key: Optional[int]):
+        self.session_key = session_key
+        self.series = TimeSeriesBuffer(WEATHER_FIELDS, circular=["wind_direction"], max_fields=["rainfall"])
+        self.cursor: Optional[datetime] = None
+        self.refreshed_at = 0.0
+        self.ingested_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def ingest(self, rows: List[Dict]):
+        for row in rows:
+            if not row.get("date"):
+                continue
+            date = parse_openf1_date(row["date"])
+            if self.cursor is not None and date <= self.cursor:
+                continue
+            self.cursor = date
+            sample = {field: row.get(field) for field in WEATHER_FIELDS}
+            if isinstance(sample["rainfall"], bool):
+                sample["rainfall"] = int(sample["rainfall"])
+            self.series.append(date.timestamp(), sample)
+
+
+_race_control_states: "OrderedDict[str, RaceControlState]" = OrderedDict()
+_weather_states: "OrderedDict[str, WeatherState]" = OrderedDict()
+
+
+async def refresh_feed_state(state, endpoint: str, interval: float) -> bool:
+    """
+    Pull rows newer than the state's cursor (whole session when cold), at most once per interval.
+
+    Returns False when a warm state skipped its refresh because the rate
+    budget is low for `endpoint`; callers then serve what they hold as stale.
+    """
+    async with state.lock:
+        if time.monotonic() - state.refreshed_at < interval:
+            return True
+
+        # Leave the headroom to timing rather than be refused upstream
+        if state.ingested_at and openf1_budget.is_low(endpoint):
+            return False
+
+        try:
+            rows = await fetch_since(endpoint, state.session_key, state.cursor, None)
+        finally:
+            state.refreshed_at = time.monotonic()
+
+        state.ingest(rows)
+        state.ingested_at = time.monotonic()
+        return True
+
+
+async def get_driver_map(session_key: Optional[int]) -> Dict[int, Dict]:
+    """Driver metadata (acronym, team, colour) by driver number."""
+    async def build():
+        params = {}
+        if session_key:
+            params["session_key"] = session_key
+        drivers = await fetch_openf1("drivers", params)
+        return {"drivers": drivers or []}
+
+    result = await cached_or_refresh(f"drivers_{session_key or 'latest'}", 60, build)
+    return {d.get("driver_number"): d for d in result["drivers"]}
+
+
+# =============================================================================
+# TRACK PROJECTION
+# =============================================================================
+
+# Location history used to register OpenF1's x/y frame (enough for a full lap)
+REGISTRATION_WINDOW_SECONDS = 150
+# Wait before retrying a session that couldn't be registered (e.g. no full lap yet)
+REGISTRATION_RETRY_SECONDS = 30
+
+
+class ProjectionState:
+    """Circuit geometry and the fitted OpenF1 -> centreline transform for one session."""
+
+    def __init__(self, session_key: Optional[int]):
+        self.session_key = session_key
+        self.code: Optional[str] = None
+        self.geometry = None
+        self.registration = None
+        self.attempted_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "code": self.code,
+            "source": self.geometry.source if self.geometry else None,
+            "length_m": round(self.geometry.length, 1) if self.geometry else None,
+            "registered": self.registration is not None,
+            "registration": self.registration.stats() if self.registration else None
+        }
+
+
+_projection_states: "OrderedDict[str, ProjectionState]" = OrderedDict()
+
+
+async def get_session_info(session_key: Optional[int]) -> Dict:
+    """Raw OpenF1 session record (circuit, meeting, dates)."""
+    async def build():
+        sessions = await fetch_openf1("sessions", {"session_key": session_key or "latest"})
+        return sessions[0] if sessions else {}
+
+    return await cached_or_refresh(f"session_info_{session_key or 'latest'}", 60, build)
+
+
+async def get_projection_state(session_key: Optional[int]) -> ProjectionState:
+    """
+    Load the circuit and register OpenF1 coordinates onto it, once per session.
+
+    Registration needs a car to have completed a lap in the recent location
+    history, so failed attempts are retried every REGISTRATION_RETRY_SECONDS.
+    """
+    state = _get_state(_projection_states, session_key, ProjectionState)
+    if state.registration is not None:
+        return state
+
+    async with state.lock:
+        if state.registration is not None or time.monotonic() - state.attempted_at < REGISTRATION_RETRY_SECONDS:
+            return state
+        state.attempted_at = time.monotonic()
+
+        loop = asyncio.get_event_loop()
+        if state.geometry is None:
+            state.code = get_circuit_code(await get_session_info(session_key))
+            if state.code is None:
+                return state
+            state.geometry = await loop.run_in_executor(None, get_track_geometry, state.code)
+            if state.geometry is None:
+                return state
+
+        rows = await fetch_since("location", session_key, None, REGISTRATION_WINDOW_SECONDS)
+        rows = [r for r in rows if r.get("x") is not None and r.get("y") is not None]
+        if not rows:
+            return state
+
+        state.registration = await loop.run_in_executor(
+            None, register, state.geometry,
+            [r["x"] for r in rows], [r["y"] for r in rows], [r.get("driver_number") for r in rows]
+        )
+        if state.registration is not None:
+            print(f"Registered OpenF1 frame for {state.code}: {state.registration.stats()}")
+
+    return state
 
 
 # =============================================================================
@@ -66,37 +657,34 @@ async def get_current_session():
     Returns session metadata including circuit, session type, and status.
     Frontend polling interval: 10 seconds
     """
-    cache_key = "current_session"
-    cached = cache_get(cache_key, ttl_seconds=10)
-    if cached:
-        return cached
-    
-    # Get latest session from OpenF1
-    sessions = await fetch_openf1("sessions", {"session_key": "latest"})
-    
-    if not sessions:
-        return {"status": "no_session", "message": "No active session found"}
-    
-    session = sessions[0] if isinstance(sessions, list) else sessions
-    
-    result = {
-        "session_key": session.get("session_key"),
-        "session_name": session.get("session_name"),
-        "session_type": session.get("session_type"),
-        "circuit_short_name": session.get("circuit_short_name"),
-        "country_name": session.get("country_name"),
-        "date_start": session.get("date_start"),
-        "date_end": session.get("date_end"),
-        "gmt_offset": session.get("gmt_offset"),
-        "status": "active" if session.get("date_end") is None else "finished"
-    }
+    async def build():
+        # Get latest session from OpenF1
+        sessions = await fetch_openf1("sessions", {"session_key": "latest"})
+        
+        if not sessions:
+            return {"status": "no_session", "message": "No active session found"}
+        
+        session = sessions[0] if isinstance(sessions, list) else sessions
+        
+        return {
+            "session_key": session.get("session_key"),
+            "session_name": session.get("session_name"),
+            "session_type": session.get("session_type"),
+            "circuit_short_name": session.get("circuit_short_name"),
+            "country_name": session.get("country_name"),
+            "date_start": session.get("date_start"),
+            "date_end": session.get("date_end"),
+            "gmt_offset": session.get("gmt_offset"),
+            "status": "active" if session.get("date_end") is None else "finished"
+        }
     
-    cache_set(cache_key, result)
-    return result
+    return await cached_or_refresh("current_session", 10, build)
 
 
 @router.get("/timing")
 async def get_live_timing(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="Only return rows changed after this sequence number"),
     session_key: Optional[int] = Query(None, description="Session key (uses latest if not provided)")
 ):
     """
@@ -105,73 +693,122 @@ async def get_live_timing(
     This powers the Live Timing Tower component.
     Frontend polling interval: 4 seconds
     
+    Order, gaps and intervals come from the live classification engine
+    (live_timing.py), fed incrementally from one shared intervals feed.
+    Lapped cars ("+1 LAP") are ordered behind the cars on the lead lap.
+    Pass the returned `seq` back as `since` to receive only changed rows.
+    
     Response includes:
     - Driver positions
-    - Gap to leader
+    - Gap to leader (seconds, or "+N LAP" for lapped cars)
+    - Laps down
     - Interval to car ahead
-    - Sector times with purple/green/yellow status
-    - Pit status
     """
-    cache_key = f"timing_{session_key or 'latest'}"
-    cached = cache_get(cache_key, ttl_seconds=4)
-    if cached:
-        return cached
+    state = get_timing_state(session_key)
+    stale = False
+    try:
+        await refresh_timing_state(state)
+    except HTTPException:
+        if state.engine.count == 0:
+            raise
+        stale = True
     
-    params = {}
-    if session_key:
-        params["session_key"] = session_key
-    
-    # Fetch intervals (gap data)
-    intervals = await fetch_openf1("intervals", params)
+    driver_map = {}
+    try:
+        driver_map = await get_driver_map(session_key)
+    except HTTPException:
+        pass
     
-    # Fetch drivers for mapping
-    drivers = await fetch_openf1("drivers", params)
+    engine = state.engine
+    # A client holding a seq from another process/restart gets every row
+    full = since is None or since > engine.seq
     
-    # Create driver lookup
-    driver_map = {d.get("driver_number"): d for d in (drivers or [])}
-    
-    # Process intervals into timing data
     timing_data = []
-    seen_drivers = set()
-    
-    for interval in reversed(intervals or []):
-        driver_num = interval.get("driver_number")
-        if driver_num in seen_drivers:
-            continue
-        seen_drivers.add(driver_num)
-        
-        driver_info = driver_map.get(driver_num, {})
-        
+    for row in engine.rows(None if full else since):
+        driver_info = driver_map.get(row["driver_number"], {})
         timing_data.append({
-            "position": interval.get("driver_number"),  # Will be reordered
-            "driver_number": driver_num,
+            **row,
             "driver_code": driver_info.get("name_acronym", "---"),
             "team_name": driver_info.get("team_name"),
-            "team_colour": driver_info.get("team_colour"),
-            "gap_to_leader": interval.get("gap_to_leader"),
-            "interval": interval.get("interval"),
-            "date": interval.get("date")
+            "team_colour": driver_info.get("team_colour")
         })
     
-    # Sort by gap to leader
-    timing_data.sort(key=lambda x: float(x["gap_to_leader"] or 0) if x["gap_to_leader"] else 0)
-    
-    # Assign positions
-    for i, driver in enumerate(timing_data):
-        driver["position"] = i + 1
-    
     result = {
         "timestamp": datetime.now().isoformat(),
         "session_key": session_key,
-        "drivers": timing_data[:20]  # Top 20
+        "seq": engine.seq,
+        "full": full,
+        "drivers": timing_data
     }
-    
-    cache_set(cache_key, result)
-    return result
+    if stale:
+        result = mark_stale(result, time.monotonic() - state.ingested_at)
+    return negotiate_response(request, result, "drivers", TIMING_COLUMNS)
+
+
+@router.get("/telemetry/snapshot")
+async def get_telemetry_snapshot(
+    request: Request,
+    drivers: Optional[str] = Query(None, description="Comma-separated driver numbers (all drivers if omitted)"),
+    since: Optional[int] = Query(None, ge=0, description="Only return drivers changed after this sequence number"),
+    session_key: Optional[int] = Query(None, description="Session key")
+):
+    """
+    Get the latest telemetry sample for many drivers at once.
+
+    All viewers and drivers share one incremental OpenF1 feed, so a
+    full-grid dashboard costs a single request per poll instead of one per
+    driver. Pass the returned `seq` back as `since` to receive only the
+    drivers whose sample changed (delta mode). If OpenF1 fails, the last
+    ingested samples are served with `stale` set.
+    Frontend polling interval: 250ms
+
+    Returns:
+    - seq: Sequence number of this snapshot
+    - full: False when only changed drivers are included
+    - drivers: Same shape as /telemetry/{driver_number}
+    """
+    driver_filter = None
+    if drivers:
+        try:
+            driver_filter = {int(d) for d in drivers.split(",") if d.strip()}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="drivers must be comma-separated driver numbers")
+
+    state = get_telemetry_state(session_key)
+    stale = False
+    try:
+        await refresh_telemetry_state(state)
+    except HTTPException:
+        if not state.latest:
+            raise
+        stale = True
+
+    # A client holding a seq from another process/restart gets a full snapshot
+    full = since is None or since > state.seq
+
+    rows = []
+    for driver_num in sorted(state.latest):
+        if driver_filter is not None and driver_num not in driver_filter:
+            continue
+        changed_seq = state.changed_seq.get(driver_num, 0)
+        if not full and changed_seq <= since:
+            continue
+        rows.append({**state.latest[driver_num], "seq": changed_seq})
+
+    result = {
+        "session_key": session_key,
+        "seq": state.seq,
+        "full": full,
+        "drivers": rows
+    }
+    if stale:
+        result = mark_stale(result, time.monotonic() - state.ingested_at)
+    return negotiate_response(request, result, "drivers", TELEMETRY_COLUMNS)
 
 
 @router.get("/telemetry/{driver_number}")
 async def get_driver_telemetry(
+    request: Request,
     driver_number: int,
     session_key: Optional[int] = Query(None, description="Session key")
 ):
@@ -189,43 +826,41 @@ async def get_driver_telemetry(
     - Gear (1-8)
     - DRS (0=closed, 1=open)
     """
-    cache_key = f"telemetry_{driver_number}_{session_key or 'latest'}"
-    cached = cache_get(cache_key, ttl_seconds=0.5)  # 500ms cache
-    if cached:
-        return cached
-    
-    params = {"driver_number": driver_number}
-    if session_key:
-        params["session_key"] = session_key
-    
-    # Get latest car data
-    car_data = await fetch_openf1("car_data", params)
-    
-    if not car_data:
-        raise HTTPException(status_code=404, detail=f"No telemetry for driver {driver_number}")
-    
-    # Get most recent entry
-    latest = car_data[-1] if isinstance(car_data, list) else car_data
-    
-    result = {
-        "driver_number": driver_number,
-        "timestamp": latest.get("date"),
-        "telemetry": {
-            "speed": latest.get("speed"),
-            "rpm": latest.get("rpm"),
-            "throttle": latest.get("throttle"),
-            "brake": latest.get("brake"),
-            "gear": latest.get("n_gear"),
-            "drs": latest.get("drs")
+    async def build():
+        params = {"driver_number": driver_number}
+        if session_key:
+            params["session_key"] = session_key
+        
+        # Get latest car data
+        car_data = await fetch_openf1("car_data", params)
+        
+        if not car_data:
+            raise HTTPException(status_code=404, detail=f"No telemetry for driver {driver_number}")
+        
+        # Get most recent entry
+        latest = car_data[-1] if isinstance(car_data, list) else car_data
+        
+        return {
+            "driver_number": driver_number,
+            "timestamp": latest.get("date"),
+            "telemetry": {
+                "speed": latest.get("speed"),
+                "rpm": latest.get("rpm"),
+                "throttle": latest.get("throttle"),
+                "brake": latest.get("brake"),
+                "gear": latest.get("n_gear"),
+                "drs": latest.get("drs")
+            }
         }
-    }
     
-    cache_set(cache_key, result)
-    return result
+    cache_key = f"telemetry_{driver_number}_{session_key or 'latest'}"
+    result = await cached_or_refresh(cache_key, 0.5, build)  # 500ms cache
+    return negotiate_response(request, result)
 
 
 @router.get("/telemetry/{driver_number}/history")
 async def get_driver_telemetry_history(
+    request: Request,
     driver_number: int,
     seconds: int = Query(30, ge=5, le=120, description="Seconds of history to fetch"),
     session_key: Optional[int] = Query(None)
@@ -243,12 +878,13 @@ async def get_driver_telemetry_history(
     car_data = await fetch_openf1("car_data", params)
     
     if not car_data:
-        return {"driver_number": driver_number, "history": []}
+        return negotiate_response(request, {"driver_number": driver_number, "history": []},
+                                  "history", HISTORY_COLUMNS)
     
     # Get last N entries (roughly 4 per second)
     entries = car_data[-(seconds * 4):] if len(car_data) > seconds * 4 else car_data
     
-    return {
+    result = {
         "driver_number": driver_number,
         "history": [
             {
@@ -262,10 +898,35 @@ async def get_driver_telemetry_history(
             for entry in entries
         ]
     }
+    return negotiate_response(request, result, "history", HISTORY_COLUMNS)
+
+
+def _weather_row(sample: Dict) -> Dict:
+    """Buffer sample -> API shape (ISO timestamp, boolean rainfall)."""
+    return {
+        **sample,
+        "timestamp": datetime.fromtimestamp(sample["timestamp"], tz=timezone.utc).isoformat(),
+        "rainfall": bool(sample["rainfall"]) if sample.get("rainfall") is not None else False
+    }
+
+
+async def refreshed_weather_state(session_key: Optional[int]) -> Tuple[WeatherState, bool]:
+    """Weather state brought up to date; flags stale data if the refresh failed."""
+    state = _get_state(_weather_states, session_key, WeatherState)
+    try:
+        refreshed = await refresh_feed_state(state, "weather", WEATHER_REFRESH_SECONDS)
+    except HTTPException:
+        if state.series.count == 0:
+            raise
+        return state, True
+    return state, not refreshed
 
 
 @router.get("/weather")
-async def get_track_weather(session_key: Optional[int] = Query(None)):
+async def get_track_weather(
+    session_key: Optional[int] = Query(None),
+    since: Optional[int] = Query(None, ge=0, description="Only return samples with an id after this one")
+):
     """
     Get current track weather conditions.
     
@@ -278,87 +939,140 @@ async def get_track_weather(session_key: Optional[int] = Query(None)):
     - Pressure
     - Wind speed & direction
     - Rainfall status
+    
+    Every sample carries a monotonic `id`. With `since`, only the samples
+    newer than that id are returned (an empty list when nothing changed);
+    an id ahead of the server's (after a restart) gets every sample, with
+    `full` set.
     """
-    cache_key = f"weather_{session_key or 'latest'}"
-    cached = cache_get(cache_key, ttl_seconds=60)
-    if cached:
-        return cached
+    state, stale = await refreshed_weather_state(session_key)
     
-    params = {}
-    if session_key:
-        params["session_key"] = session_key
+    if since is not None:
+        full = since > state.series.seq
+        result = {
+            "id": state.series.seq,
+            "full": full,
+            "samples": [_weather_row(s) for s in state.series.since(0 if full else since)]
+        }
+    else:
+        latest = state.series.latest()
+        if latest is None:
+            return {"status": "unavailable"}
+        result = _weather_row(latest)
     
-    weather_data = await fetch_openf1("weather", params)
+    if stale:
+        result = mark_stale(result, time.monotonic() - state.ingested_at)
+    return result
+
+
+@router.get("/weather/history")
+async def get_weather_history(
+    request: Request,
+    session_key: Optional[int] = Query(None),
+    start: Optional[datetime] = Query(None, description="ISO start time (session start if omitted)"),
+    end: Optional[datetime] = Query(None, description="ISO end time (latest if omitted)"),
+    max_points: int = Query(200, ge=2, le=2000)
+):
+    """
+    Weather over a time range for charts, downsampled to at most `max_points`.
     
-    if not weather_data:
-        return {"status": "unavailable"}
+    Long spans are averaged into equal time buckets (wind direction as a
+    vector mean, rainfall as "any rain in the bucket").
+    """
+    state, stale = await refreshed_weather_state(session_key)
     
-    latest = weather_data[-1] if isinstance(weather_data, list) else weather_data
+    def epoch(value: Optional[datetime]) -> Optional[float]:
+        if value is None:
+            return None
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
     
+    samples = state.series.range(epoch(start), epoch(end), max_points)
     result = {
-        "timestamp": latest.get("date"),
-        "air_temperature": latest.get("air_temperature"),
-        "track_temperature": latest.get("track_temperature"),
-        "humidity": latest.get("humidity"),
-        "pressure": latest.get("pressure"),
-        "wind_speed": latest.get("wind_speed"),
-        "wind_direction": latest.get("wind_direction"),
-        "rainfall": latest.get("rainfall", False)
+        "session_key": session_key,
+        "id": state.series.seq,
+        "samples": [_weather_row(s) for s in samples]
     }
-    
-    cache_set(cache_key, result)
-    return result
+    if stale:
+        result = mark_stale(result, time.monotonic() - state.ingested_at)
+    return negotiate_response(request, result, "samples", WEATHER_COLUMNS)
 
 
 @router.get("/positions")
-async def get_driver_positions(session_key: Optional[int] = Query(None)):
+async def get_driver_positions(
+    request: Request,
+    session_key: Optional[int] = Query(None),
+    project_to_track: bool = Query(False, alias="project", description="Add lap distance and track map coordinates")
+):
     """
     Get GPS positions for all drivers on track.
     
     Useful for track map visualization.
     Frontend polling interval: 1 second
     
-    Returns X, Y coordinates for each driver.
+    Returns X, Y coordinates for each driver. With `project=true` each car
+    is also placed on the circuit centreline (track_geometry.py): lap
+    distance in metres, lap fraction, x/y in the trackPaths.ts viewbox and
+    distance off the centreline. These are null until the session's
+    coordinate frame has been registered from a completed lap.
     """
-    cache_key = f"positions_{session_key or 'latest'}"
-    cached = cache_get(cache_key, ttl_seconds=1)
-    if cached:
-        return cached
+    async def build():
+        params = {}
+        if session_key:
+            params["session_key"] = session_key
+        
+        location_data = await fetch_openf1("location", params)
+        
+        if not location_data:
+            return {"drivers": []}
+        
+        # Group by driver, get latest position each
+        driver_positions = {}
+        for loc in location_data:
+            driver_num = loc.get("driver_number")
+            driver_positions[driver_num] = {
+                "driver_number": driver_num,
+                "x": loc.get("x"),
+                "y": loc.get("y"),
+                "z": loc.get("z"),
+                "timestamp": loc.get("date")
+            }
+        
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "drivers": list(driver_positions.values())
+        }
     
-    params = {}
-    if session_key:
-        params["session_key"] = session_key
+    result = await cached_or_refresh(f"positions_{session_key or 'latest'}", 1, build)
+    if not project_to_track:
+        return negotiate_response(request, result, "drivers", POSITION_COLUMNS)
     
-    location_data = await fetch_openf1("location", params)
-    
-    if not location_data:
-        return {"drivers": []}
-    
-    # Group by driver, get latest position each
-    driver_positions = {}
-    for loc in location_data:
-        driver_num = loc.get("driver_number")
-        driver_positions[driver_num] = {
-            "driver_number": driver_num,
-            "x": loc.get("x"),
-            "y": loc.get("y"),
-            "z": loc.get("z"),
-            "timestamp": loc.get("date")
-        }
+    try:
+        projection = await get_projection_state(session_key)
+    except HTTPException:
+        projection = _get_state(_projection_states, session_key, ProjectionState)
     
-    result = {
-        "timestamp": datetime.now().isoformat(),
-        "drivers": list(driver_positions.values())
-    }
+    # Copy rows so the cached positions stay unprojected
+    drivers = [dict(d) for d in result.get("drivers", [])]
+    placed = [d for d in drivers if d.get("x") is not None and d.get("y") is not None]
+    if projection.registration is not None and placed:
+        on_track = project(projection.geometry, projection.registration,
+                           [d["x"] for d in placed], [d["y"] for d in placed])
+        for i, d in enumerate(placed):
+            d["lap_distance"] = round(float(on_track["lap_distance"][i]), 1)
+            d["lap_fraction"] = round(float(on_track["lap_fraction"][i]), 4)
+            d["svg_x"] = round(float(on_track["svg_x"][i]), 2)
+            d["svg_y"] = round(float(on_track["svg_y"][i]), 2)
+            d["track_offset"] = round(float(on_track["offset"][i]), 1)
     
-    cache_set(cache_key, result)
-    return result
+    projected = {**result, "drivers": drivers, "track": projection.stats()}
+    return negotiate_response(request, projected, "drivers", POSITION_TRACK_COLUMNS)
 
 
 @router.get("/race-control")
 async def get_race_control_messages(
     session_key: Optional[int] = Query(None),
-    limit: int = Query(20, ge=1, le=100)
+    limit: int = Query(20, ge=1, le=100),
+    since: Optional[int] = Query(None, ge=0, description="Only return messages with an id after this one")
 ):
     """
     Get race control messages (flags, incidents, penalties).
@@ -366,37 +1080,71 @@ async def get_race_control_messages(
     Frontend polling interval: 5 seconds
     
     Returns:
+    - Message id (monotonic per session)
     - Message text
     - Category (Flag, SafetyCar, Drs, etc.)
     - Timestamp
-    """
-    cache_key = f"race_control_{session_key or 'latest'}"
-    cached = cache_get(cache_key, ttl_seconds=5)
-    if cached:
-        return cached
-    
-    params = {}
-    if session_key:
-        params["session_key"] = session_key
     
-    messages = await fetch_openf1("race_control", params)
+    Without `since` the latest `limit` messages are returned. With `since`,
+    the next `limit` messages after that id, oldest first; pass the returned
+    `last_id` back as `since` to page forward. An id ahead of the server's
+    (after a restart or session change) gets the latest page, with `full`
+    set.
+    """
+    state = _get_state(_race_control_states, session_key, RaceControlState)
+    try:
+        stale = not await refresh_feed_state(state, "race_control", RACE_CONTROL_REFRESH_SECONDS)
+    except HTTPException:
+        if not state.messages:
+            raise
+        stale = True
     
-    if not messages:
-        return {"messages": []}
+    # A client holding an id from another process/restart gets the latest page
+    full = since is None or since > state.seq
+    if full:
+        messages = state.messages[-limit:]
+    else:
+        # Ids are contiguous, so the first newer message is found by offset
+        first_id = state.messages[0]["id"] if state.messages else 1
+        offset = max(0, since + 1 - first_id)
+        messages = state.messages[offset:offset + limit]
     
     result = {
-        "messages": [
-            {
-                "category": msg.get("category"),
-                "message": msg.get("message"),
-                "flag": msg.get("flag"),
-                "scope": msg.get("scope"),
-                "driver_number": msg.get("driver_number"),
-                "timestamp": msg.get("date")
-            }
-            for msg in messages[-limit:]
-        ]
+        "messages": messages,
+        "last_id": messages[-1]["id"] if messages else (state.seq if full else since),
+        "latest_id": state.seq,
+        "full": full,
+        "has_more": bool(messages) and messages[-1]["id"] < state.seq
     }
-    
-    cache_set(cache_key, result)
+    if stale:
+        result = mark_stale(result, time.monotonic() - state.ingested_at)
     return result
+
+
+@router.get("/health")
+async def live_health():
+    """Check upstream and cache state of the live service."""
+    return {
+        "status": "degraded" if openf1_breaker.state != CircuitBreaker.CLOSED else "healthy",
+        "openf1_base": OPENF1_BASE,
+        "circuit_breaker": openf1_breaker.stats(),
+        "rate_budget": openf1_budget.stats(),
+        "cache": _cache.stats(),
+        "refreshes_in_flight": len(_inflight),
+        "ingest_sessions": {
+            key: {"seq": state.seq, "drivers": len(state.latest)}
+            for key, state in _telemetry_states.items()
+        },
+        "feed_sessions": {
+            "race_control": {key: {"latest_id": state.seq} for key, state in _race_control_states.items()},
+            "weather": {key: {"latest_id": state.series.seq, "samples": state.series.count}
+                        for key, state in _weather_states.items()}
+        },
+        "track_projections": {
+            key: state.stats() for key, state in _projection_states.items()
+        },
+        "timing_sessions": {
+            key: {"seq": state.engine.seq, "order_seq": state.engine.order_seq, "drivers": state.engine.count}
+            for key, state in _timing_states.items()
+        }
+    }
@@ -0,0 +1,301 @@
+"""
+F1 Apex Live Points Projection
+Projected prediction points and standings while a session is running.
+
+When an admin starts a live session, every prediction for the race is
+loaded into a PredictionBlock (scoring.py) together with league
+memberships. Each time the live classification (live_timing.py) changes
+its running order, the whole block is rescored against the current order
+in one vectorized pass and league tables are re-ranked, so per-user and
+per-league projections are always one order change behind at most.
+"""
+
+import asyncio
+import time
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from fastapi import HTTPException
+
+from scoring import PICK_FIELDS, PredictionBlock, score_block
+from live_f1 import (
+    fetch_openf1, get_driver_map, get_session_info, get_timing_state, refresh_timing_state
+)
+
+# Sessions whose running order is the qualifying result rather than the race
+QUALIFYING_SESSIONS = {"Qualifying", "Sprint Qualifying", "Sprint Shootout"}
+
+# How often to look for the qualifying result again if it isn't on OpenF1 yet
+QUALI_RETRY_SECONDS = 60
+
+
+def _normalize_name(name: str) -> str:
+    text = unicodedata.normalize("NFKD", name or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).strip().lower()
+
+
+def match_driver_names(driver_map: Dict[int, Dict], names: Sequence[str]) -> Dict[int, str]:
+    """
+    Map OpenF1 driver numbers to the app's driver names ("Max Verstappen (Red Bull)").
+
+    Matches on surname, accents ignored, since OpenF1 spells names in its own
+    case and style (e.g. "HULKENBERG").
+    """
+    by_surname = {}
+    for name in names:
+        person = name.split(" (")[0]
+        by_surname[_normalize_name(person.split(" ")[-1])] = name
+
+    matched = {}
+    for number, info in driver_map.items():
+        surname = _normalize_name(info.get("last_name") or (info.get("full_name") or "").split(" ")[-1])
+        if surname in by_surname:
+            matched[number] = by_surname[surname]
+    return matched
+
+
+class LiveProjection:
+    """
+    Preloaded predictions and league tables for one race, rescored on demand.
+
+    `rescore` takes the running order (best first) and the qualifying top 3
+    as driver names; everything else is array work over the preloaded block.
+    """
+
+    def __init__(self, race_id: int, session_type: str, predictions: List[dict],
+                 members: List[dict], profiles: List[dict], drivers: Sequence[str],
+                 session_key: Optional[int] = None, quali_result: Optional[List[str]] = None):
+        self.race_id = race_id
+        self.session_type = session_type
+        self.session_key = session_key
+        self.drivers = list(drivers)
+        self.quali_result = list(quali_result or [])
+        self.quali_checked_at = 0.0
+        self.started_at = datetime.now().isoformat()
+
+        streaks = {p["id"]: p.get("current_streak") or 0 for p in profiles}
+        self.usernames = {p["id"]: p.get("username") for p in profiles}
+
+        # One prediction per user (the latest wins, as in the predictions table)
+        latest = {}
+        for prediction in predictions:
+            latest[prediction.get("user_id")] = prediction
+        self.block = PredictionBlock(list(latest.values()), streaks, self.drivers)
+        self.row_of_user = {user_id: row for row, user_id in enumerate(self.block.user_ids)}
+
+        # League tables as flat arrays sorted by league
+        members = sorted(members, key=lambda m: m["league_id"])
+        self.member_league = np.array([m["league_id"] for m in members], dtype=np.int64)
+        self.member_user = np.array([m["user_id"] for m in members], dtype=object)
+        self.member_season = np.array([m.get("season_points") or 0 for m in members], dtype=np.int64)
+        self.member_row = np.array([self.row_of_user.get(m["user_id"], -1) for m in members], dtype=np.int64)
+        self.league_ids, self.league_start = np.unique(self.member_league, return_index=True)
+        self.league_end = np.append(self.league_start[1:], len(members))
+
+        # Latest projection
+        self.order_seq = -1
+        self.version = 0
+        self.running_order: List[str] = []
+        self.points = np.zeros(len(self.block), dtype=np.int32)
+        self.breakdown: Dict[str, np.ndarray] = {}
+        self.overall_rank = np.zeros(len(self.block), dtype=np.int64)
+        self.league_order = np.arange(len(members))
+        self.league_projected = self.member_season.copy()
+        self.computed_at: Optional[str] = None
+        self.compute_ms = 0.0
+
+    def rescore(self, running_order: List[str], quali_result: Optional[List[str]] = None):
+        """Rescore every prediction against the given order and re-rank leagues."""
+        started = time.perf_counter()
+        quali = quali_result if quali_result is not None else self.quali_result
+
+        result: Dict[str, Optional[str]] = {field: None for field in PICK_FIELDS}
+        if self.session_type in QUALIFYING_SESSIONS:
+            quali = running_order
+        else:
+            for i, field in enumerate(("race_p1_driver", "race_p2_driver", "race_p3_driver")):
+                result[field] = running_order[i] if i < len(running_order) else None
+        for i, field in enumerate(("quali_p1_driver", "quali_p2_driver", "quali_p3_driver")):
+            result[field] = quali[i] if i < len(quali) else None
+
+        scored = score_block(self.block, self.block.encode_result(result))
+        points = scored["total_points"]
+
+        # Overall rank: competition ranking (ties share the better rank)
+        order = np.argsort(-points, kind="stable")
+        sorted_points = points[order]
+        rank_sorted = np.searchsorted(-sorted_points, -sorted_points, side="left") + 1
+        overall_rank = np.empty_like(rank_sorted)
+        overall_rank[order] = rank_sorted
+
+        # League tables: season points plus projected race points, ranked per league
+        race_points = np.where(self.member_row >= 0, points[np.maximum(self.member_row, 0)], 0)
+        projected = self.member_season + race_points
+        league_order = np.lexsort((-projected, self.member_league))
+
+        self.running_order = list(running_order)
+        self.points = points
+        self.breakdown = scored
+        self.overall_rank = overall_rank
+        self.league_projected = projected
+        self.league_order = league_order
+        self.version += 1
+        self.computed_at = datetime.now().isoformat()
+        self.compute_ms = (time.perf_counter() - started) * 1000
+
+    # -------------------------------------------------------------------------
+    # Views
+    # -------------------------------------------------------------------------
+
+    def summary(self, top: int = 10) -> Dict[str, Any]:
+        leaders = np.argsort(-self.points, kind="stable")[:top]
+        return {
+            "race_id": self.race_id,
+            "session_type": self.session_type,
+            "version": self.version,
+            "computed_at": self.computed_at,
+            "compute_ms": round(self.compute_ms, 2),
+            "predictions": len(self.block),
+            "running_order": self.running_order[:10],
+            "quali_result": self.quali_result[:3],
+            "leaders": [self._user_row(int(row)) for row in leaders]
+        }
+
+    def _user_row(self, row: int) -> Dict[str, Any]:
+        user_id = self.block.user_ids[row]
+        return {
+            "user_id": user_id,
+            "username": self.usernames.get(user_id),
+            "rank": int(self.overall_rank[row]),
+            "projected_points": int(self.points[row]),
+            "breakdown": {
+                key: int(self.breakdown[key][row]) for key in ("qualifying", "race", "bonuses")
+            } if self.breakdown else None
+        }
+
+    def user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        row = self.row_of_user.get(user_id)
+        return None if row is None else self._user_row(row)
+
+    def is_member(self, league_id: int, user_id: str) -> bool:
+        i = np.searchsorted(self.league_ids, league_id)
+        if i >= len(self.league_ids) or self.league_ids[i] != league_id:
+            return False
+        return user_id in set(self.member_user[self.league_start[i]:self.league_end[i]])
+
+    def league(self, league_id: int) -> Optional[Dict[str, Any]]:
+        i = np.searchsorted(self.league_ids, league_id)
+        if i >= len(self.league_ids) or self.league_ids[i] != league_id:
+            return None
+
+        # league_order keeps leagues contiguous in the same ranges as the member arrays
+        rows = self.league_order[self.league_start[i]:self.league_end[i]]
+        standings = []
+        for position, m in enumerate(rows):
+            pred_row = self.member_row[m]
+            user_id = self.member_user[m]
+            standings.append({
+                "position": position + 1,
+                "user_id": user_id,
+                "username": self.usernames.get(user_id),
+                "season_points": int(self.member_season[m]),
+                "projected_race_points": int(self.points[pred_row]) if pred_row >= 0 else 0,
+                "projected_total": int(self.league_projected[m])
+            })
+        return {
+            "league_id": league_id,
+            "race_id": self.race_id,
+            "version": self.version,
+            "computed_at": self.computed_at,
+            "standings": standings
+        }
+
+
+# =============================================================================
+# ACTIVE PROJECTION
+# =============================================================================
+
+_active: Optional[LiveProjection] = None
+_refresh_lock = asyncio.Lock()
+
+
+def start_projection(projection: LiveProjection):
+    """Make a freshly loaded projection the active one."""
+    global _active
+    _active = projection
+
+
+def stop_projection():
+    global _active
+    _active = None
+
+
+def get_projection() -> Optional[LiveProjection]:
+    return _active
+
+
+async def fetch_quali_result(session_key: Optional[int], names: Sequence[str]) -> List[str]:
+    """Final qualifying top 3 for the meeting of `session_key`, as app driver names."""
+    session = await get_session_info(session_key)
+    if not session.get("meeting_key"):
+        return []
+
+    sessions = await fetch_openf1("sessions", {"meeting_key": session["meeting_key"], "session_name": "Qualifying"})
+    if not sessions:
+        return []
+    quali_key = sessions[0].get("session_key")
+
+    positions = await fetch_openf1("position", {"session_key": quali_key})
+    final = {}
+    for row in positions or []:
+        final[row.get("driver_number")] = row.get("position")
+    top = sorted((p, n) for n, p in final.items() if p is not None)[:3]
+
+    matched = match_driver_names(await get_driver_map(quali_key), names)
+    return [matched[n] for _, n in top if n in matched]
+
+
+async def refresh_projection() -> Optional[LiveProjection]:
+    """
+    Bring the active projection up to date with the live running order.
+
+    Rescoring only happens when the classification's order_seq moved, so
+    callers can poll this as often as they like.
+    """
+    projection = _active
+    if projection is None:
+        return None
+
+    async with _refresh_lock:
+        timing = get_timing_state(projection.session_key)
+        try:
+            await refresh_timing_state(timing)
+        except HTTPException:
+            # Keep serving the last projection while the feed is unavailable
+            return projection
+
+        if timing.engine.order_seq == projection.order_seq:
+            return projection
+
+        if (not projection.quali_result and projection.session_type not in QUALIFYING_SESSIONS
+                and time.monotonic() - projection.quali_checked_at > QUALI_RETRY_SECONDS):
+            projection.quali_checked_at = time.monotonic()
+            try:
+                projection.quali_result = await fetch_quali_result(projection.session_key, projection.drivers)
+            except HTTPException:
+                pass
+
+        try:
+            matched = match_driver_names(await get_driver_map(projection.session_key), projection.drivers)
+        except HTTPException:
+            return projection
+        running_order = [matched[n] for n in timing.engine.running_order() if n in matched]
+
+        order_seq = timing.engine.order_seq
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, projection.rescore, running_order)
+        projection.order_seq = order_seq
+
+    return projection
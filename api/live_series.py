@@ -0,0 +1,130 @@
+"""
+F1 Apex Live Time Series
+Compact ring buffers for sampled live feeds (weather) with downsampled range queries.
+
+Samples are stored column-wise in preallocated NumPy arrays, one float32
+column per field plus float64 timestamps. Every appended sample gets a
+monotonic sequence id, so pollers can ask for "everything after id N".
+Range queries average samples into fixed-width time buckets, giving charts
+at most `max_points` points whatever the span.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class TimeSeriesBuffer:
+    """
+    Fixed-capacity ring buffer of timestamped samples.
+
+    `circular` fields (angles in degrees) are averaged as unit vectors and
+    `max_fields` (flags such as rainfall) keep the bucket maximum.
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int = 4096,
+                 circular: Sequence[str] = (), max_fields: Sequence[str] = ()):
+        self.fields = list(fields)
+        self.capacity = capacity
+        self.circular = set(circular)
+        self.max_fields = set(max_fields)
+
+        self.timestamps = np.zeros(capacity)
+        self.values = np.full((capacity, len(self.fields)), np.nan, dtype=np.float32)
+        self.count = 0      # samples currently held
+        self.seq = 0        # id of the newest sample (total ever appended)
+
+    def append(self, timestamp: float, sample: Dict[str, Optional[float]]) -> int:
+        """Add one sample (missing fields are NaN). Returns its sequence id."""
+        slot = self.seq % self.capacity
+        self.timestamps[slot] = timestamp
+        self.values[slot] = [np.nan if sample.get(f) is None else float(sample[f]) for f in self.fields]
+        self.seq += 1
+        self.count = min(self.count + 1, self.capacity)
+        return self.seq
+
+    def _ordered(self):
+        """(sequence ids, timestamps, values) oldest first."""
+        first_seq = self.seq - self.count + 1
+        seqs = np.arange(first_seq, self.seq + 1)
+        slots = (seqs - 1) % self.capacity
+        return seqs, self.timestamps[slots], self.values[slots]
+
+    def _rows(self, seqs: np.ndarray, timestamps: np.ndarray, values: np.ndarray) -> List[Dict]:
+        rows = []
+        for seq, ts, row in zip(seqs, timestamps, values):
+            item = {"id": int(seq), "timestamp": float(ts)}
+            for field, v in zip(self.fields, row):
+                item[field] = None if np.isnan(v) else round(float(v), 3)
+            rows.append(item)
+        return rows
+
+    def latest(self) -> Optional[Dict]:
+        if self.count == 0:
+            return None
+        seqs, timestamps, values = self._ordered()
+        return self._rows(seqs[-1:], timestamps[-1:], values[-1:])[0]
+
+    def since(self, seq: int, limit: Optional[int] = None) -> List[Dict]:
+        """Samples with an id greater than `seq`, oldest first."""
+        seqs, timestamps, values = self._ordered()
+        mask = seqs > seq
+        seqs, timestamps, values = seqs[mask], timestamps[mask], values[mask]
+        if limit is not None:
+            seqs, timestamps, values = seqs[:limit], timestamps[:limit], values[:limit]
+        return self._rows(seqs, timestamps, values)
+
+    def range(self, start: Optional[float] = None, end: Optional[float] = None,
+              max_points: int = 200) -> List[Dict]:
+        """
+        Samples between `start` and `end` (epoch seconds), downsampled.
+
+        Spans with more than `max_points` samples are split into equal time
+        buckets; each bucket reports its mean time and mean values (vector
+        mean for circular fields, maximum for max fields). Empty buckets are
+        skipped.
+        """
+        seqs, timestamps, values = self._ordered()
+        mask = np.ones(len(seqs), dtype=bool)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps <= end
+        seqs, timestamps, values = seqs[mask], timestamps[mask], values[mask]
+
+        if len(seqs) <= max_points:
+            return self._rows(seqs, timestamps, values)
+
+        edges = np.linspace(timestamps[0], timestamps[-1], max_points + 1)
+        bucket = np.clip(np.searchsorted(edges, timestamps, side="right") - 1, 0, max_points - 1)
+        counts = np.bincount(bucket, minlength=max_points)
+        occupied = counts > 0
+
+        def bucket_mean(column: np.ndarray) -> np.ndarray:
+            valid = ~np.isnan(column)
+            sums = np.bincount(bucket[valid], weights=column[valid], minlength=max_points)
+            n = np.bincount(bucket[valid], minlength=max_points)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return np.where(n > 0, sums / n, np.nan)
+
+        out_values = np.full((max_points, len(self.fields)), np.nan)
+        for i, field in enumerate(self.fields):
+            column = values[:, i].astype(float)
+            if field in self.circular:
+                radians = np.radians(column)
+                angle = np.degrees(np.arctan2(bucket_mean(np.sin(radians)), bucket_mean(np.cos(radians))))
+                out_values[:, i] = np.mod(angle, 360)
+            elif field in self.max_fields:
+                filled = np.where(np.isnan(column), -np.inf, column)
+                peak = np.full(max_points, -np.inf)
+                np.maximum.at(peak, bucket, filled)
+                out_values[:, i] = np.where(np.isfinite(peak), peak, np.nan)
+            else:
+                out_values[:, i] = bucket_mean(column)
+
+        out_times = bucket_mean(timestamps)
+        # A bucket's id is the newest sample it contains
+        last_seq = np.zeros(max_points, dtype=np.int64)
+        np.maximum.at(last_seq, bucket, seqs)
+
+        return self._rows(last_seq[occupied], out_times[occupied], out_values[occupied])
@@ -0,0 +1,202 @@
+"""
+F1 Apex Live Classification Engine
+Running order, gaps and intervals computed from OpenF1 interval rows.
+
+Each session keeps fixed per-driver state arrays that are updated in place
+as new interval rows are ingested. Classification sorts, diffs and compares
+the whole field in a single NumPy pass, so the cost per update depends on
+the number of cars, never on how long the session has been running.
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# More than any grid we'll see (22 cars in 2026)
+MAX_DRIVERS = 32
+
+# Gap strings such as "+1 LAP" / "+2 LAPS"
+LAPS_DOWN_RE = re.compile(r"\+?\s*(\d+)\s*LAPS?", re.IGNORECASE)
+
+# Differences below a millisecond are not a change worth pushing
+CHANGE_TOLERANCE = 5e-4
+
+
+def parse_gap(value: Any) -> Tuple[float, int]:
+    """
+    Split an OpenF1 gap/interval value into (seconds, laps_down).
+
+    Numeric gaps return (seconds, 0); lapped cars ("+1 LAP") return
+    (nan, laps). None is the leader's gap and counts as 0 seconds.
+    """
+    if value is None:
+        return 0.0, 0
+    if isinstance(value, (int, float)):
+        return float(value), 0
+
+    text = str(value).strip()
+    match = LAPS_DOWN_RE.search(text)
+    if match:
+        return float("nan"), int(match.group(1))
+    try:
+        return float(text.lstrip("+")), 0
+    except ValueError:
+        return float("nan"), 0
+
+
+class LiveClassification:
+    """
+    Running order for one session, updated incrementally.
+
+    `ingest` folds new interval rows into the state arrays; `classify`
+    recomputes order, gaps and intervals for every car at once and stamps
+    the rows that changed with a new sequence number.
+    """
+
+    def __init__(self):
+        self.slots: Dict[int, int] = {}
+        self.count = 0
+
+        self.driver_numbers = np.zeros(MAX_DRIVERS, dtype=np.int16)
+        self.gap = np.full(MAX_DRIVERS, np.nan)          # seconds to leader
+        self.last_numeric_gap = np.full(MAX_DRIVERS, np.inf)
+        self.laps_down = np.zeros(MAX_DRIVERS, dtype=np.int16)
+        self.upstream_interval = np.full(MAX_DRIVERS, np.nan)
+        self.updated_at = np.zeros(MAX_DRIVERS)           # epoch seconds
+        self.raw_gap: List[Any] = [None] * MAX_DRIVERS
+        self.raw_date: List[Optional[str]] = [None] * MAX_DRIVERS
+
+        # Output of the last classification, indexed by slot
+        self.position = np.zeros(MAX_DRIVERS, dtype=np.int16)
+        self.interval = np.full(MAX_DRIVERS, np.nan)
+        self.classified_gap = np.full(MAX_DRIVERS, np.nan)
+        self.classified_laps = np.zeros(MAX_DRIVERS, dtype=np.int16)
+        self.row_seq = np.zeros(MAX_DRIVERS, dtype=np.int64)
+        self.order = np.zeros(0, dtype=np.int64)          # slots in running order
+
+        self.seq = 0
+        self.order_seq = 0
+
+    def _slot(self, driver_number: int) -> Optional[int]:
+        slot = self.slots.get(driver_number)
+        if slot is None:
+            if self.count >= MAX_DRIVERS:
+                return None
+            slot = self.count
+            self.slots[driver_number] = slot
+            self.driver_numbers[slot] = driver_number
+            self.count += 1
+        return slot
+
+    def ingest(self, rows: List[Dict]) -> int:
+        """Apply new interval rows (oldest first). Returns how many were applied."""
+        applied = 0
+        for row in rows:
+            driver_num = row.get("driver_number")
+            date = row.get("date")
+            if driver_num is None or not date:
+                continue
+            slot = self._slot(driver_num)
+            if slot is None:
+                continue
+
+            ts = datetime.fromisoformat(date.replace("Z", "+00:00")).timestamp()
+            if ts <= self.updated_at[slot]:
+                continue
+
+            gap, laps = parse_gap(row.get("gap_to_leader"))
+            interval, _ = parse_gap(row.get("interval")) if row.get("interval") is not None else (np.nan, 0)
+
+            self.gap[slot] = gap
+            self.laps_down[slot] = laps
+            if not np.isnan(gap):
+                self.last_numeric_gap[slot] = gap
+            self.upstream_interval[slot] = interval
+            self.updated_at[slot] = ts
+            self.raw_gap[slot] = row.get("gap_to_leader")
+            self.raw_date[slot] = date
+            applied += 1
+        return applied
+
+    def classify(self) -> np.ndarray:
+        """
+        Recompute the running order in one vectorized pass.
+
+        Cars are ordered by laps down, then gap to the leader; lapped cars
+        (no numeric gap) keep the order of their last known gap. Intervals
+        are gap differences to the car ahead on the same lap, falling back
+        to OpenF1's own interval across lap boundaries. Returns the driver
+        numbers whose row changed.
+        """
+        n = self.count
+        if n == 0:
+            return np.zeros(0, dtype=np.int16)
+
+        gap = self.gap[:n]
+        laps = self.laps_down[:n]
+
+        order = np.lexsort((self.last_numeric_gap[:n], np.where(np.isnan(gap), np.inf, gap), laps))
+
+        position = np.empty(n, dtype=np.int16)
+        position[order] = np.arange(1, n + 1, dtype=np.int16)
+
+        sorted_gap = gap[order]
+        sorted_laps = laps[order]
+        interval_sorted = np.full(n, np.nan)
+        same_lap = sorted_laps[1:] == sorted_laps[:-1]
+        interval_sorted[1:] = np.where(same_lap, sorted_gap[1:] - sorted_gap[:-1], np.nan)
+        interval_sorted = np.where(np.isnan(interval_sorted), self.upstream_interval[:n][order], interval_sorted)
+        interval_sorted[0] = np.nan
+
+        interval = np.empty(n)
+        interval[order] = interval_sorted
+
+        def moved(new: np.ndarray, old: np.ndarray) -> np.ndarray:
+            return ~np.isclose(new, old, atol=CHANGE_TOLERANCE, rtol=0, equal_nan=True)
+
+        changed = (
+            (position != self.position[:n])
+            | (laps != self.classified_laps[:n])
+            | moved(gap, self.classified_gap[:n])
+            | moved(interval, self.interval[:n])
+        )
+
+        if changed.any():
+            self.seq += 1
+            self.row_seq[:n][changed] = self.seq
+
+        if not np.array_equal(order, self.order):
+            self.order_seq += 1
+
+        self.position[:n] = position
+        self.interval[:n] = interval
+        self.classified_gap[:n] = gap
+        self.classified_laps[:n] = laps
+        self.order = order
+        return self.driver_numbers[:n][changed]
+
+    def running_order(self) -> List[int]:
+        """Driver numbers from leader to last."""
+        return [int(d) for d in self.driver_numbers[self.order]]
+
+    def rows(self, since: Optional[int] = None) -> List[Dict]:
+        """Classified rows in running order, optionally only those changed after `since`."""
+        out = []
+        for slot in self.order:
+            if since is not None and self.row_seq[slot] <= since:
+                continue
+            gap = self.gap[slot]
+            interval = self.interval[slot]
+            out.append({
+                "position": int(self.position[slot]),
+                "driver_number": int(self.driver_numbers[slot]),
+                "gap_to_leader": self.raw_gap[slot] if np.isnan(gap) else round(float(gap), 3),
+                "gap_seconds": None if np.isnan(gap) else round(float(gap), 3),
+                "laps_down": int(self.laps_down[slot]),
+                "interval": None if np.isnan(interval) else round(float(interval), 3),
+                "seq": int(self.row_seq[slot]),
+                "date": self.raw_date[slot]
+            })
+        return out
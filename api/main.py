@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, Depends, Request, Header
+from fastapi import FastAPI, HTTPException, Depends, Request, Header, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from supabase import create_client, Client
 from pydantic import BaseModel, field_validator
@@ -7,11 +7,17 @@ from datetime import datetime, timezone
 from typing import Optional, List
 import os
 import re
+import json
+import time
+import asyncio
 from scoring import calculate_points
+from races import get_race_code
 
 # Import new live F1 routers
 from live_f1 import router as live_router
 from analytics_f1 import router as analytics_router
+import live_projection
+import analytics_precompute
 
 # Rate limiting imports
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -38,7 +44,8 @@ limiter = Limiter(key_func=get_remote_address)
 # However, Vercel Python runtime usually receives the full path.
 # If the request is /api/races, and route is /races, we need root_path="/api".
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 
 app = FastAPI(
     title="F1 Predictor API", 
@@ -347,22 +354,24 @@ def grade_prediction(request: Request, grading: GradingInput, admin_id: str = De
 
 @app.post("/admin/settle")
 @limiter.limit("5/minute")  # Settling should be rare
-def settle_race(request: Request, result: RaceResultInput, admin_id: str = Depends(verify_admin)):
+def settle_race(request: Request, result: RaceResultInput, background_tasks: BackgroundTasks,
+                admin_id: str = Depends(verify_admin)):
     print(f"Settling Race {result.race_id} by admin {admin_id}...")
     response = supabase.table("predictions").select("*").eq("race_id", result.race_id).execute()
-    predictions = response.data
+    predictions = response.data or []
+    
+    # Warm race analytics for the grid once the session data is published.
+    # Settling again means the result was corrected, so analytics are rebuilt.
+    resettled = any(pred.get('points_total') is not None for pred in predictions)
+    background_tasks.add_task(precompute_race_analytics, result.race_id, resettled)
     
     if not predictions:
         return {"message": "No predictions found for this race"}
 
     updated_count = 0
     for pred in predictions:
-        # Calculate automatic points from scoring algorithm
-        auto_points = calculate_points(pred, result.dict())
-        # Add manual grading points (wild prediction, flop, surprise bonuses)
-        manual_points = pred.get('manual_score') or 0
-        # Total = automatic + manual
-        total_points = auto_points + manual_points
+        # Scoring algorithm total, manual grading points (manual_score) included
+        total_points = calculate_points(pred, result.dict())["total_points"]
         
         supabase.table("predictions").update({"points_total": total_points}).eq("id", pred['id']).execute()
         updated_count += 1
@@ -370,36 +379,6 @@ def settle_race(request: Request, result: RaceResultInput, admin_id: str = Depen
     return {"message": f"Race settled! Updated {updated_count} predictions."}
 
 # --- REAL-TIME STANDINGS ENDPOINT ---
-def get_race_code(race_name):
-    # Maps race names to 3-letter codes for 2026 calendar
-    name = race_name.lower()
-    if "australian" in name: return "AUS"
-    if "chinese" in name: return "CHN"
-    if "japanese" in name: return "JPN"
-    if "bahrain" in name: return "BHR"
-    if "saudi" in name: return "SAU"
-    if "miami" in name: return "MIA"
-    if "emilia" in name or "imola" in name: return "ITA"
-    if "monaco" in name: return "MCO"
-    if "spanish" in name or "spain" in name: return "ESP"
-    if "canadian" in name or "canada" in name: return "CAN"
-    if "austrian" in name or "austria" in name: return "AUT"
-    if "british" in name or "silverstone" in name: return "GBR"
-    if "belgian" in name or "spa" in name: return "BEL"
-    if "hungarian" in name or "hungary" in name: return "HUN"
-    if "dutch" in name or "netherlands" in name: return "NED"
-    if "italian" in name or "monza" in name: return "ITA"
-    if "madrid" in name: return "MAD"
-    if "azerbaijan" in name or "baku" in name: return "AZE"
-    if "singapore" in name: return "SGP"
-    if "united states" in name or "austin" in name or "cota" in name: return "USA"
-    if "mexico" in name: return "MEX"
-    if "brazil" in name or "são paulo" in name or "sao paulo" in name: return "BRA"
-    if "las vegas" in name: return "LVS"
-    if "qatar" in name: return "QAT"
-    if "abu dhabi" in name: return "ABU"
-    return "GP"
-
 @app.get("/standings")
 @limiter.limit("30/minute")
 def get_standings(request: Request):
@@ -2003,6 +1982,39 @@ def get_live_positions(request: Request, session_id: Optional[int] = None):
 class LiveSessionInput(BaseModel):
     race_id: int
     session_type: str  # FP1, FP2, FP3, Qualifying, Sprint, Race
+    session_key: Optional[int] = None  # OpenF1 session (latest if not provided)
+    quali_result: Optional[List[str]] = None  # Top 3, looked up on OpenF1 if not provided
+
+
+def select_all(table: str, columns: str, page_size: int = 1000, order: str = "id", **filters) -> List[dict]:
+    """
+    Select every matching row, paging past Supabase's per-request row limit.
+    
+    Pages are taken in `order` (a unique column), so no row is skipped or
+    repeated between pages and callers get rows in insertion order.
+    """
+    rows = []
+    start = 0
+    while True:
+        query = supabase.table(table).select(columns)
+        for column_name, value in filters.items():
+            query = query.eq(column_name, value)
+        page = query.order(order).range(start, start + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+
+def load_live_projection(session: LiveSessionInput) -> live_projection.LiveProjection:
+    """Preload every prediction, profile streak and league table for the race."""
+    predictions = select_all("predictions", "*", race_id=session.race_id)
+    members = select_all("league_members", "league_id, user_id, season_points")
+    profiles = select_all("profiles", "id, username, current_streak")
+    return live_projection.LiveProjection(
+        session.race_id, session.session_type, predictions, members, profiles, VALID_DRIVERS,
+        session_key=session.session_key, quali_result=session.quali_result
+    )
 
 
 @app.post("/admin/live/start")
@@ -2020,10 +2032,20 @@ def start_live_session(request: Request, session: LiveSessionInput, admin_id: st
             "status": "live",
             "started_at": datetime.now(timezone.utc).isoformat()
         }).execute()
-        
-        return {"success": True, "session": result.data[0] if result.data else None}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    
+    # Projected points are best-effort: the session still starts without them
+    projection = None
+    try:
+        loaded = load_live_projection(session)
+        live_projection.start_projection(loaded)
+        projection = {"predictions": len(loaded.block), "leagues": len(loaded.league_ids)}
+    except Exception as e:
+        live_projection.stop_projection()
+        logger.error(f"Live projection preload failed for race {session.race_id}: {e}")
+    
+    return {"success": True, "session": result.data[0] if result.data else None, "projection": projection}
 
 
 @app.post("/admin/live/end")
@@ -2036,6 +2058,7 @@ def end_live_session(request: Request, session_id: int, admin_id: str = Depends(
             "ended_at": datetime.now(timezone.utc).isoformat()
         }).eq("id", session_id).execute()
         
+        live_projection.stop_projection()
         return {"success": True, "message": "Session ended"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -2065,6 +2088,146 @@ def update_live_positions(request: Request, update: PositionUpdateInput, admin_i
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# =============================================
+# LIVE PROJECTED POINTS
+# =============================================
+
+def require_projection() -> live_projection.LiveProjection:
+    projection = live_projection.get_projection()
+    if projection is None:
+        raise HTTPException(status_code=404, detail="No live projection running")
+    return projection
+
+
+async def check_league_access(projection: live_projection.LiveProjection, league_id: int, user_id: Optional[str]):
+    """Members see their league's projection; anyone can see public leagues."""
+    if user_id and projection.is_member(league_id, user_id):
+        return
+    # The supabase client blocks; keep the live endpoints' event loop free
+    league = await run_in_threadpool(
+        supabase.table("leagues").select("is_public").eq("id", league_id).single().execute
+    )
+    if not league.data or not league.data.get("is_public"):
+        raise HTTPException(status_code=403, detail="Access denied")
+
+
+@app.get("/live/projection")
+@limiter.limit("120/minute")
+async def get_live_projection(request: Request, top: int = 10):
+    """Projected points leaderboard for the race in progress."""
+    require_projection()
+    projection = await live_projection.refresh_projection()
+    return projection.summary(top=min(max(top, 1), 100))
+
+
+@app.get("/live/projection/me")
+@limiter.limit("120/minute")
+async def get_my_live_projection(request: Request, user_id: str = Depends(verify_user)):
+    """The caller's projected points and overall rank."""
+    require_projection()
+    projection = await live_projection.refresh_projection()
+    row = projection.user(user_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="No prediction for this race")
+    return {**row, "version": projection.version, "computed_at": projection.computed_at}
+
+
+@app.get("/live/projection/leagues/{league_id}")
+@limiter.limit("120/minute")
+async def get_league_live_projection(request: Request, league_id: int, user_id: str = Depends(verify_user)):
+    """Projected league table: season points plus projected points for this race."""
+    projection = require_projection()
+    await check_league_access(projection, league_id, user_id)
+    projection = await live_projection.refresh_projection()
+    table = projection.league(league_id)
+    if table is None:
+        raise HTTPException(status_code=404, detail="League not found")
+    return table
+
+
+@app.get("/live/projection/stream")
+async def stream_live_projection(request: Request, token: Optional[str] = None, league_id: Optional[int] = None):
+    """
+    Server-sent events with the projection, pushed whenever the order changes.
+    
+    Each `projection` event carries the leaderboard summary. With `token`
+    (the user's access token; EventSource can't send an Authorization
+    header) it also carries the caller's own row, and `league_id` adds that
+    league's table for its members, or for anyone if the league is public.
+    """
+    projection = require_projection()
+    user_id = await verify_user(f"Bearer {token}") if token else None
+    if league_id is not None:
+        await check_league_access(projection, league_id, user_id)
+    
+    async def events():
+        sent_version = None
+        last_sent = 0.0
+        while not await request.is_disconnected():
+            projection = await live_projection.refresh_projection()
+            if projection is None:
+                yield "event: end\ndata: {}\n\n"
+                return
+            
+            if projection.version != sent_version:
+                payload = {"summary": projection.summary()}
+                if user_id:
+                    payload["user"] = projection.user(user_id)
+                if league_id is not None:
+                    payload["league"] = projection.league(league_id)
+                yield f"event: projection\ndata: {json.dumps(payload, default=str)}\n\n"
+                sent_version = projection.version
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent > 15:
+                # Keep proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            
+            await asyncio.sleep(1)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+# =============================================
+# ANALYTICS PRECOMPUTE
+# =============================================
+
+class PrecomputeInput(BaseModel):
+    year: int
+    race: str
+    session_types: List[str] = ["R"]
+    force: bool = False
+
+
+async def precompute_race_analytics(race_id: int, force: bool = False):
+    """Start the analytics warmup for a settled race (best effort); force recomputes cached results."""
+    try:
+        race = await run_in_threadpool(
+            supabase.table("races").select("name, race_time").eq("id", race_id).single().execute
+        )
+        if not race.data:
+            return
+        year = datetime.fromisoformat(race.data["race_time"].replace("Z", "+00:00")).year
+        await analytics_precompute.start_precompute(year, race.data["name"], force=force)
+    except Exception as e:
+        logger.error(f"Analytics precompute not started for race {race_id}: {e}")
+
+
+@app.post("/admin/analytics/precompute")
+@limiter.limit("10/minute")
+async def start_analytics_precompute(request: Request, body: PrecomputeInput, admin_id: str = Depends(verify_admin)):
+    """Precompute radar, stint and dominance for every driver of a race (admin only)."""
+    job = await analytics_precompute.start_precompute(body.year, body.race, body.session_types, force=body.force)
+    return job.progress()
+
+
+@app.get("/admin/analytics/precompute")
+@limiter.limit("60/minute")
+async def get_analytics_precompute(request: Request, admin_id: str = Depends(verify_admin)):
+    """Progress and timings of recent precompute jobs (admin only)."""
+    return {"jobs": analytics_precompute.list_precompute()}
+
+
 # =============================================
 # FANTASY TEAM ROUTES
 # =============================================
@@ -0,0 +1,132 @@
+"""
+F1 Apex Race Resolver
+Canonical event names for the race identifiers analytics routes accept.
+
+Analytics keys, worker affinity, the session store and FastF1 loads all
+use the race string from the URL, so "Monaco", "monaco", "Monaco Grand
+Prix" and "8" would each be computed and cached separately. Every
+identifier is resolved once per season against the FastF1 event schedule
+to the event's official name (e.g. "Monaco Grand Prix"), which everything
+downstream then uses.
+
+Identifiers are matched, in order, as a round number, an exact event name
+or location, a race code ("MCO"), the race code `get_race_code` (races.py,
+the table the rest of the app uses) gives the identifier, a unique
+substring of an event name or location, and finally a country with one
+race. Anything that can't be matched (or any season whose schedule
+can't be fetched) passes through unchanged, as before.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from races import get_race_code
+from ttl_cache import get_cache
+
+SCHEDULE_TTL_SECONDS = 24 * 3600
+
+# A failed schedule fetch is retried after this long
+SCHEDULE_RETRY_SECONDS = 300
+
+_schedules = get_cache("event_schedules", max_bytes=1024 * 1024, max_age_seconds=SCHEDULE_TTL_SECONDS)
+_resolved = get_cache("race_keys", max_bytes=1024 * 1024, max_age_seconds=SCHEDULE_TTL_SECONDS)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", str(text).strip().lower())
+
+
+def _event_code(event: Dict[str, Any]) -> str:
+    """Race code for a schedule event, trying its name, then location and country."""
+    for field in ("name", "location", "country"):
+        code = get_race_code(event[field])
+        if code != "GP":
+            return code
+    return "GP"
+
+
+def event_schedule(year: int) -> Optional[List[Dict[str, Any]]]:
+    """The season's race weekends (round, name, location, country, code), or None if unavailable."""
+    cached = _schedules.get(str(year))
+    if cached is not None:
+        # [] marks a recent failed fetch
+        return cached or None
+
+    try:
+        import fastf1
+        schedule = fastf1.get_event_schedule(int(year), include_testing=False)
+        events = []
+        for row in schedule.itertuples():
+            event = {
+                "round": int(row.RoundNumber),
+                "name": str(row.EventName),
+                "location": str(row.Location),
+                "country": str(row.Country)
+            }
+            event["code"] = _event_code(event)
+            events.append(event)
+    except Exception as e:
+        print(f"WARNING: Event schedule for {year} unavailable: {e}")
+        _schedules.set(str(year), [], age=SCHEDULE_TTL_SECONDS - SCHEDULE_RETRY_SECONDS)
+        return None
+
+    _schedules.set(str(year), events)
+    return events or None
+
+
+def match_event(events: List[Dict[str, Any]], race: str) -> Optional[Dict[str, Any]]:
+    """The schedule event `race` identifies, or None if it matches none (or several)."""
+    ident = _normalize(race)
+    if not ident:
+        return None
+    if ident.isdigit():
+        return next((e for e in events if e["round"] == int(ident)), None)
+
+    for field in ("name", "location"):
+        exact = [e for e in events if _normalize(e[field]) == ident]
+        if len(exact) == 1:
+            return exact[0]
+
+    # The app's own race codes ("MCO")
+    by_code = [e for e in events if e["code"].lower() == ident]
+    if len(by_code) == 1:
+        return by_code[0]
+
+    def named(event: Dict[str, Any]) -> bool:
+        return ident in _normalize(event["name"]) or ident in _normalize(event["location"])
+
+    code = get_race_code(ident)
+    if code != "GP":
+        candidates = [e for e in events if e["code"] == code]
+        if len(candidates) > 1:
+            # One code can cover two weekends (Imola and Monza are both ITA)
+            candidates = [e for e in candidates if named(e)]
+        if len(candidates) == 1:
+            return candidates[0]
+
+    partial = [e for e in events if named(e)]
+    if len(partial) == 1:
+        return partial[0]
+    country = [e for e in events if _normalize(e["country"]) == ident]
+    return country[0] if len(country) == 1 else None
+
+
+def resolve_race(year: int, race: str) -> str:
+    """
+    Canonical event name for a race identifier in a season.
+
+    Blocking on the first call for a season (the schedule is fetched
+    through FastF1's HTTP cache); cached afterwards.
+    """
+    key = f"{int(year)}:{_normalize(race)}"
+    cached = _resolved.get(key)
+    if cached is not None:
+        return cached
+
+    events = event_schedule(year)
+    if events is None:
+        return race.strip()
+    event = match_event(events, race)
+    canonical = event["name"] if event is not None else race.strip()
+    _resolved.set(key, canonical)
+    return canonical
@@ -0,0 +1,212 @@
+"""
+F1 Apex Result Store
+Durable analytics results shared across restarts, cold starts and instances.
+
+Computed analytics are written to a SQLite database (by default under the
+FastF1 cache directory) keyed by (analysis, year, race, driver, session
+type, code version), so a result computed once is served from disk by
+any process pointed at the same file instead of being recomputed. Bumping
+an analysis' code version makes its old rows unreachable; they then age
+out. Rows expire after `max_age_seconds` and the least recently read rows
+are evicted when the store grows past `max_bytes`.
+
+The store is best effort: any SQLite error is counted and treated as a
+miss, so a read-only or missing disk only costs recomputation.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+# Run expiry/size eviction after this many writes
+EVICT_EVERY_N_SETS = 32
+
+# Don't rewrite a row's last-read time more often than this
+TOUCH_INTERVAL_SECONDS = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    analysis TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    race TEXT NOT NULL,
+    driver TEXT NOT NULL,
+    session_type TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at);
+CREATE INDEX IF NOT EXISTS results_race ON results (year, race);
+"""
+
+
+def result_key(analysis: str, version: int, year: int, race: str,
+               driver: str = "", session_type: str = "") -> str:
+    """Canonical key for one analytics result (also used by the memory layer)."""
+    return f"{analysis}:v{version}:{int(year)}:{race.strip().lower()}:{driver.upper()}:{session_type.upper()}"
+
+
+def _parse_key(key: str) -> Tuple[str, int, int, str, str, str]:
+    analysis, version, year, race, driver, session_type = key.split(":", 5)
+    return analysis, int(version[1:]), int(year), race, driver, session_type
+
+
+class ResultStore:
+    """SQLite-backed result store with TTL and byte-budget eviction."""
+
+    def __init__(self, path: str, max_bytes: int, max_age_seconds: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._sets_since_evict = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self.disabled_reason: Optional[str] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and self.disabled_reason is None:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(SCHEMA)
+                self._conn = conn
+            except (OSError, sqlite3.Error) as e:
+                self.disabled_reason = str(e)
+                print(f"WARNING: Analytics result store disabled ({self.path}): {e}")
+        return self._conn
+
+    def get(self, key: str, ttl_seconds: Optional[float] = None) -> Optional[Tuple[Any, float]]:
+        """Return ``(value, age_seconds)`` if stored and younger than ``ttl_seconds``."""
+        ttl = self.max_age_seconds if ttl_seconds is None else min(ttl_seconds, self.max_age_seconds)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT payload, created_at, accessed_at FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or now - row[1] >= ttl:
+                    self.misses += 1
+                    return None
+                if now - row[2] > TOUCH_INTERVAL_SECONDS:
+                    conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+                    conn.commit()
+                value = json.loads(zlib.decompress(row[0]))
+            except (sqlite3.Error, ValueError, zlib.error):
+                self.errors += 1
+                return None
+            self.hits += 1
+            return value, now - row[1]
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serializable result under a key from `result_key`."""
+        now = time.time()
+        payload = zlib.compress(json.dumps(value, default=str).encode("utf-8"))
+        with self._lock:
+            conn = self._connect()
+            if conn is None or len(payload) > self.max_bytes:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, analysis, version, year, race, driver, session_type, "
+                    "payload, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, *_parse_key(key), payload, len(payload), now, now)
+                )
+                conn.commit()
+                self.writes += 1
+                self._sets_since_evict += 1
+                if self._sets_since_evict >= EVICT_EVERY_N_SETS:
+                    self._evict_locked(conn)
+            except sqlite3.Error:
+                self.errors += 1
+
+    def delete_race(self, year: int, race: str) -> int:
+        """Drop every stored result for a race (e.g. after a data correction)."""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return 0
+            try:
+                removed = conn.execute(
+                    "DELETE FROM results WHERE year = ? AND race = ?", (int(year), race.strip().lower())
+                ).rowcount
+                conn.commit()
+                return removed
+            except sqlite3.Error:
+                self.errors += 1
+                return 0
+
+    def evict(self) -> int:
+        """Remove expired rows, then least recently read rows over budget."""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return 0
+            try:
+                return self._evict_locked(conn)
+            except sqlite3.Error:
+                self.errors += 1
+                return 0
+
+    def _evict_locked(self, conn: sqlite3.Connection) -> int:
+        self._sets_since_evict = 0
+        removed = conn.execute(
+            "DELETE FROM results WHERE created_at <= ?", (time.time() - self.max_age_seconds,)
+        ).rowcount
+        removed += conn.execute(
+            """
+            DELETE FROM results WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS running
+                    FROM results
+                ) WHERE running > ?
+            )
+            """,
+            (self.max_bytes,)
+        ).rowcount
+        conn.commit()
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = 0, 0
+        with self._lock:
+            conn = self._connect()
+            if conn is not None:
+                try:
+                    entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+                except sqlite3.Error:
+                    self.errors += 1
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "enabled": self.disabled_reason is None,
+            "disabled_reason": self.disabled_reason,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "max_age_seconds": self.max_age_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors
+        }
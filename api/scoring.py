@@ -3,6 +3,10 @@ F1 Apex Scoring Engine
 Calculates prediction points with streak multipliers.
 """
 
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
 
 # =============================================================================
 # SCORING CONSTANTS
@@ -191,6 +195,117 @@ def calculate_points(prediction: dict, result: dict, current_streak: int = 0) ->
     }
 
 
+# =============================================================================
+# BATCH SCORING
+# =============================================================================
+
+# Pick columns of a PredictionBlock, in order
+PICK_FIELDS = (
+    'quali_p1_driver', 'quali_p2_driver', 'quali_p3_driver',
+    'race_p1_driver', 'race_p2_driver', 'race_p3_driver',
+    'fastest_lap_driver'
+)
+Q1, Q2, Q3, R1, R2, R3, FL = range(len(PICK_FIELDS))
+
+# Code for a missing pick (None compares equal to None, like the dict scorer)
+NO_PICK = -1
+
+
+class PredictionBlock:
+    """
+    All predictions for one race as int-coded NumPy columns.
+
+    Driver names are mapped to small integer codes once, so scoring a whole
+    race is a handful of array comparisons instead of a Python loop over
+    prediction dicts. `score_block` gives the same totals as
+    `calculate_points` for every row.
+    """
+
+    def __init__(self, predictions: List[dict], streaks: Optional[Dict[str, int]] = None,
+                 drivers: Sequence[str] = ()):
+        self.codes: Dict[str, int] = {}
+        for name in drivers:
+            self.code(name)
+
+        n = len(predictions)
+        self.ids = np.array([p.get('id') for p in predictions], dtype=object)
+        self.user_ids = np.array([p.get('user_id') for p in predictions], dtype=object)
+        self.picks = np.full((n, len(PICK_FIELDS)), NO_PICK, dtype=np.int32)
+        for row, prediction in enumerate(predictions):
+            for col, field in enumerate(PICK_FIELDS):
+                if prediction.get(field) is not None:
+                    self.picks[row, col] = self.code(prediction[field])
+
+        self.manual = np.array([
+            p.get('manual_points', 0) or p.get('manual_score', 0) or 0 for p in predictions
+        ], dtype=np.int32)
+
+        streaks = streaks or {}
+        self.multiplier = np.array([
+            calculate_streak_multiplier(streaks.get(p.get('user_id'), 0) or 0) for p in predictions
+        ])
+
+    def __len__(self) -> int:
+        return len(self.picks)
+
+    def code(self, name: str) -> int:
+        """Integer code for a driver name (assigned on first sight)."""
+        if name not in self.codes:
+            self.codes[name] = len(self.codes)
+        return self.codes[name]
+
+    def encode_result(self, result: dict) -> np.ndarray:
+        """Result dict (same keys as a prediction) as a row of codes."""
+        return np.array([
+            NO_PICK if result.get(field) is None else self.code(result[field])
+            for field in PICK_FIELDS
+        ], dtype=np.int32)
+
+
+def score_block(block: PredictionBlock, result_codes: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Score every prediction in a block against one result in a single pass.
+
+    Mirrors `calculate_points` rule for rule. Returns arrays of
+    base_points, total_points and the qualifying/race/bonus breakdown.
+    """
+    picks = block.picks
+    hit = picks == result_codes
+
+    qualifying = hit[:, Q1] * QUALI_P1_POINTS + hit[:, Q2] * QUALI_P2_POINTS + hit[:, Q3] * QUALI_P3_POINTS
+    race = hit[:, R1] * RACE_POINTS[1] + hit[:, R2] * RACE_POINTS[2] + hit[:, R3] * RACE_POINTS[3]
+
+    hat_trick = hit[:, Q1] & hit[:, R1] & (picks[:, Q1] == picks[:, R1])
+
+    # Podium as sets: every picked driver is on the podium and vice versa
+    user_podium = picks[:, R1:R3 + 1]
+    actual_podium = result_codes[R1:R3 + 1]
+    picked_on_podium = (user_podium[:, :, None] == actual_podium[None, None, :]).any(axis=2).all(axis=1)
+    podium_picked = (actual_podium[None, :, None] == user_podium[:, None, :]).any(axis=2).all(axis=1)
+    exact_podium = hit[:, R1:R3 + 1].all(axis=1)
+    any_podium = ~exact_podium & picked_on_podium & podium_picked
+
+    fastest_lap = hit[:, FL] & (picks[:, FL] != NO_PICK)
+
+    bonuses = (
+        hat_trick * HAT_TRICK_POINTS
+        + exact_podium * PODIUM_EXACT_POINTS
+        + any_podium * PODIUM_ANY_POINTS
+        + fastest_lap * FASTEST_LAP_POINTS
+    )
+
+    base = qualifying + race + bonuses
+    total = (base * block.multiplier).astype(np.int32) + block.manual
+
+    return {
+        "base_points": base,
+        "total_points": total,
+        "qualifying": qualifying,
+        "race": race,
+        "bonuses": bonuses
+    }
+
+
 # =============================================================================
 # LEGACY COMPATIBILITY
 # =============================================================================
@@ -0,0 +1,300 @@
+"""
+F1 Apex Season Aggregates
+Running per-driver season statistics, updated one race at a time.
+
+Season-level questions (average degradation per compound, qualifying vs
+race pace, whether a driver's consistency is improving) would otherwise
+mean reloading every session of the year. Instead, each race's per-driver
+"form" is folded into running sums when the race is processed (see the
+precompute job), and season endpoints answer from those sums alone.
+
+Everything kept is a sum, so a race is folded in (or, when it is
+reprocessed, its previous contribution taken back out) in constant time
+per driver:
+
+- degradation per compound: sum of fitted stint slopes weighted by the
+  stint's laps, and the laps
+- pace delta: sum and count of the race-pace vs qualifying-lap deltas (%)
+- consistency: least-squares sums of the per-race lap time variation (%)
+  over the round number, giving its mean and trend (slope per round)
+
+Stored in SQLite next to the result store; each race's contribution is
+kept too, for per-race series and refolding.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS race_form (
+    year INTEGER NOT NULL,
+    race TEXT NOT NULL,
+    driver TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    form TEXT NOT NULL,
+    PRIMARY KEY (year, race, driver)
+);
+CREATE TABLE IF NOT EXISTS driver_season (
+    year INTEGER NOT NULL,
+    driver TEXT NOT NULL,
+    totals TEXT NOT NULL,
+    PRIMARY KEY (year, driver)
+);
+"""
+
+# Laps slower than this factor of the driver's fastest (SC, VSC, traffic) aren't race pace
+CLEAN_LAP_FACTOR = 1.07
+
+# Clean laps a driver needs in a race for a consistency figure
+MIN_CONSISTENCY_LAPS = 5
+
+# Need this many races before reporting a consistency trend
+MIN_TREND_RACES = 3
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {
+        "races": 0,
+        "team": None,
+        "compounds": {},
+        "pace_delta": {"sum": 0.0, "n": 0},
+        "consistency": {"n": 0, "sx": 0.0, "sy": 0.0, "sxx": 0.0, "sxy": 0.0}
+    }
+
+
+def fold(totals: Dict[str, Any], form: Dict[str, Any], round_number: int, sign: int = 1) -> Dict[str, Any]:
+    """Add (sign=1) or take back out (sign=-1) one race's form from a driver's season totals."""
+    totals["races"] += sign
+    if sign > 0 and form.get("team"):
+        totals["team"] = form["team"]
+
+    for compound, stats in form.get("compounds", {}).items():
+        running = totals["compounds"].setdefault(compound, {"slope_laps": 0.0, "laps": 0, "stints": 0})
+        for field in ("slope_laps", "laps", "stints"):
+            running[field] += sign * stats[field]
+        if running["stints"] <= 0:
+            del totals["compounds"][compound]
+
+    if form.get("pace_delta_pct") is not None:
+        totals["pace_delta"]["sum"] += sign * form["pace_delta_pct"]
+        totals["pace_delta"]["n"] += sign
+
+    if form.get("consistency_pct") is not None:
+        x, y = float(round_number), form["consistency_pct"]
+        c = totals["consistency"]
+        c["n"] += sign
+        c["sx"] += sign * x
+        c["sy"] += sign * y
+        c["sxx"] += sign * x * x
+        c["sxy"] += sign * x * y
+    return totals
+
+
+def summarize(driver: str, totals: Dict[str, Any]) -> Dict[str, Any]:
+    """Season figures for one driver from their running totals."""
+    degradation = {
+        compound: {
+            "degradation_rate": round(stats["slope_laps"] / stats["laps"], 4),
+            "stints": stats["stints"],
+            "laps": stats["laps"]
+        }
+        for compound, stats in sorted(totals["compounds"].items())
+        if stats["laps"] > 0
+    }
+
+    pace = totals["pace_delta"]
+    c = totals["consistency"]
+    trend = None
+    if c["n"] >= MIN_TREND_RACES:
+        denominator = c["n"] * c["sxx"] - c["sx"] * c["sx"]
+        if denominator > 1e-9:
+            trend = round((c["n"] * c["sxy"] - c["sx"] * c["sy"]) / denominator, 4)
+
+    return {
+        "driver": driver,
+        "team": totals["team"],
+        "races": totals["races"],
+        "degradation": degradation,
+        "quali_race_delta_pct": round(pace["sum"] / pace["n"], 3) if pace["n"] > 0 else None,
+        "consistency_pct": round(c["sy"] / c["n"], 3) if c["n"] > 0 else None,
+        # Change in lap time variation per round; negative means more consistent
+        "consistency_trend": trend
+    }
+
+
+class SeasonStore:
+    """SQLite-backed running season totals per driver plus each race's contribution."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.disabled_reason: Optional[str] = None
+
+        self.folds = 0
+        self.refolds = 0
+        self.errors = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and self.disabled_reason is None:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                self._conn = conn
+            except (OSError, sqlite3.Error) as e:
+                self.disabled_reason = str(e)
+                print(f"WARNING: Season aggregate store disabled ({self.path}): {e}")
+        return self._conn
+
+    def has_race(self, year: int, race: str) -> bool:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return False
+            try:
+                return conn.execute(
+                    "SELECT 1 FROM race_form WHERE year = ? AND race = ? LIMIT 1", (int(year), race.strip().lower())
+                ).fetchone() is not None
+            except sqlite3.Error:
+                self.errors += 1
+                return False
+
+    def fold_race(self, year: int, race: str, round_number: Optional[int], forms: List[Dict[str, Any]]) -> int:
+        """
+        Fold one race's per-driver forms into the season totals, in one transaction.
+
+        A race that was folded before has its old contribution removed
+        first. Without a round number the race is placed after the last
+        one folded. Returns the number of drivers updated.
+        """
+        year, race = int(year), race.strip().lower()
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return 0
+            try:
+                with conn:
+                    if round_number is None:
+                        row = conn.execute(
+                            "SELECT round FROM race_form WHERE year = ? AND race = ? LIMIT 1", (year, race)
+                        ).fetchone() or conn.execute(
+                            "SELECT COALESCE(MAX(round), 0) + 1 FROM race_form WHERE year = ?", (year,)
+                        ).fetchone()
+                        round_number = row[0]
+
+                    refolded = False
+                    for old_driver, old_round, old_form in conn.execute(
+                        "SELECT driver, round, form FROM race_form WHERE year = ? AND race = ?", (year, race)
+                    ).fetchall():
+                        self._update_totals(conn, year, old_driver, json.loads(old_form), old_round, -1)
+                        refolded = True
+                    conn.execute("DELETE FROM race_form WHERE year = ? AND race = ?", (year, race))
+
+                    for form in forms:
+                        driver = form["driver"].upper()
+                        conn.execute(
+                            "INSERT INTO race_form VALUES (?, ?, ?, ?, ?)",
+                            (year, race, driver, int(round_number), json.dumps(form))
+                        )
+                        self._update_totals(conn, year, driver, form, int(round_number), 1)
+            except (sqlite3.Error, ValueError):
+                self.errors += 1
+                return 0
+            self.folds += 1
+            self.refolds += refolded
+            return len(forms)
+
+    def _update_totals(self, conn: sqlite3.Connection, year: int, driver: str, form: Dict[str, Any],
+                       round_number: int, sign: int):
+        row = conn.execute("SELECT totals FROM driver_season WHERE year = ? AND driver = ?", (year, driver)).fetchone()
+        totals = fold(json.loads(row[0]) if row else _empty_totals(), form, round_number, sign)
+        if totals["races"] <= 0:
+            conn.execute("DELETE FROM driver_season WHERE year = ? AND driver = ?", (year, driver))
+        else:
+            conn.execute("INSERT OR REPLACE INTO driver_season VALUES (?, ?, ?)", (year, driver, json.dumps(totals)))
+
+    def season(self, year: int) -> Optional[Dict[str, Any]]:
+        """Every driver's season summary and the races folded so far, or None if none are."""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                races = conn.execute(
+                    "SELECT DISTINCT race, round FROM race_form WHERE year = ? ORDER BY round", (int(year),)
+                ).fetchall()
+                rows = conn.execute(
+                    "SELECT driver, totals FROM driver_season WHERE year = ? ORDER BY driver", (int(year),)
+                ).fetchall()
+            except sqlite3.Error:
+                self.errors += 1
+                return None
+        if not races:
+            return None
+        return {
+            "year": year,
+            "races": [{"race": race, "round": round_number} for race, round_number in races],
+            "drivers": [summarize(driver, json.loads(totals)) for driver, totals in rows]
+        }
+
+    def driver(self, year: int, driver: str) -> Optional[Dict[str, Any]]:
+        """One driver's season summary plus their per-race form, or None."""
+        driver = driver.upper()
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT totals FROM driver_season WHERE year = ? AND driver = ?", (int(year), driver)
+                ).fetchone()
+                races = conn.execute(
+                    "SELECT race, round, form FROM race_form WHERE year = ? AND driver = ? ORDER BY round",
+                    (int(year), driver)
+                ).fetchall()
+            except sqlite3.Error:
+                self.errors += 1
+                return None
+        if row is None:
+            return None
+        summary = summarize(driver, json.loads(row[0]))
+        summary["year"] = year
+        summary["by_race"] = []
+        for race, round_number, form in races:
+            form = json.loads(form)
+            summary["by_race"].append({
+                "race": race,
+                "round": round_number,
+                "race_pace": form.get("race_pace"),
+                "quali_best": form.get("quali_best"),
+                "quali_race_delta_pct": form.get("pace_delta_pct"),
+                "consistency_pct": form.get("consistency_pct")
+            })
+        return summary
+
+    def stats(self) -> Dict[str, Any]:
+        seasons, races = 0, 0
+        with self._lock:
+            conn = self._connect()
+            if conn is not None:
+                try:
+                    seasons, races = conn.execute(
+                        "SELECT COUNT(DISTINCT year), COUNT(DISTINCT year || ':' || race) FROM race_form"
+                    ).fetchone()
+                except sqlite3.Error:
+                    self.errors += 1
+        return {
+            "path": self.path,
+            "enabled": self.disabled_reason is None,
+            "disabled_reason": self.disabled_reason,
+            "seasons": seasons,
+            "races": races,
+            "folds": self.folds,
+            "refolds": self.refolds,
+            "errors": self.errors
+        }
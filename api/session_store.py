@@ -0,0 +1,222 @@
+"""
+F1 Apex Session Store
+Columnar copies of loaded FastF1 sessions for parse-free repeat analytics.
+
+FastF1's own cache still re-parses its raw data into pandas on every
+`load()`. After a session is loaded once it is written here as Parquet:
+the laps table, plus one file per driver for car data and for position
+data. Analytics then memory-map only the files (drivers) and columns they
+need, so later work on the race skips FastF1 entirely.
+
+    <SESSION_STORE_DIR>/<year>/<race>/<session type>/
+        laps.parquet
+        car/<driver code>.parquet
+        pos/<driver code>.parquet
+        manifest.json            # which parts are complete
+
+Needs `pyarrow` (and pandas, which FastF1 brings); without it the store is
+disabled and everything goes through FastF1 as before.
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+STORE_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    STORE_AVAILABLE = True
+except ImportError:
+    pass
+
+SESSION_STORE_DIR = os.environ.get(
+    "SESSION_STORE_DIR", os.path.join(os.environ.get("FASTF1_CACHE_DIR", "/tmp/fastf1_cache"), "sessions")
+)
+
+# Bump when the stored layout or columns change; older copies are rewritten
+STORE_FORMAT = 1
+
+LAP_COLUMNS = [
+    "Driver", "DriverNumber", "Team", "LapNumber", "LapTime", "Stint", "Compound", "TyreLife",
+    "FreshTyre", "LapStartTime", "Time", "Sector1Time", "Sector2Time", "Sector3Time",
+    "SpeedI1", "SpeedI2", "SpeedFL", "SpeedST", "IsPersonalBest", "PitInTime", "PitOutTime",
+    "TrackStatus", "Position", "Deleted", "IsAccurate"
+]
+CAR_COLUMNS = ["SessionTime", "Speed", "RPM", "nGear", "Throttle", "Brake", "DRS"]
+POS_COLUMNS = ["SessionTime", "X", "Y", "Z", "Status"]
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", text.strip().lower()).strip("_")
+
+
+def session_dir(year: int, race: str, session_type: str) -> str:
+    return os.path.join(SESSION_STORE_DIR, str(int(year)), _slug(race), _slug(session_type).upper())
+
+
+def delete_race(year: int, race: str) -> bool:
+    """Remove every stored session of a race (e.g. before recomputing it from corrected data)."""
+    directory = os.path.join(SESSION_STORE_DIR, str(int(year)), _slug(race))
+    if not os.path.isdir(directory):
+        return False
+    shutil.rmtree(directory, ignore_errors=True)
+    return True
+
+
+def _touch(directory: str):
+    # Marks the session as used for disk cache eviction (fastf1_cache.py)
+    try:
+        os.utime(directory)
+    except OSError:
+        pass
+
+
+def read_manifest(year: int, race: str, session_type: str) -> Optional[Dict[str, Any]]:
+    """The stored session's manifest, or None if it isn't (fully) stored."""
+    path = os.path.join(session_dir(year, race, session_type), "manifest.json")
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("format") == STORE_FORMAT else None
+
+
+def has_parts(year: int, race: str, session_type: str, parts: Sequence[str]) -> bool:
+    """True if every one of `parts` ("laps", "car", "pos") is stored."""
+    if not STORE_AVAILABLE:
+        return False
+    manifest = read_manifest(year, race, session_type)
+    return manifest is not None and all(part in manifest.get("parts", []) for part in parts)
+
+
+# =============================================================================
+# INGEST
+# =============================================================================
+
+def _write_frame(frame: Any, columns: List[str], path: str):
+    import pandas as pd
+
+    present = [c for c in columns if c in frame.columns]
+    table = pa.Table.from_pandas(pd.DataFrame(frame)[present], preserve_index=False)
+    pq.write_table(table, path, compression="zstd")
+
+
+def ingest(session: Any, year: int, race: str, session_type: str) -> List[str]:
+    """
+    Write whatever parts of a loaded session are not stored yet.
+
+    Laps are written when loaded; car and position data when telemetry was
+    loaded. Each part is written to a temporary name and renamed, and the
+    manifest is updated last, so readers never see half a part. Returns the
+    parts written.
+    """
+    if not STORE_AVAILABLE:
+        return []
+
+    directory = session_dir(year, race, session_type)
+    manifest = read_manifest(year, race, session_type) or {"format": STORE_FORMAT, "parts": []}
+    written = []
+
+    try:
+        laps = session.laps
+    except Exception:
+        # FastF1 raises when laps weren't loaded
+        return []
+
+    # Telemetry is keyed by driver number; files are named by code
+    codes = {}
+    for number, code in zip(laps["DriverNumber"].astype(str), laps["Driver"].astype(str)):
+        codes[number] = code
+
+    os.makedirs(directory, exist_ok=True)
+    if "laps" not in manifest["parts"]:
+        tmp = os.path.join(directory, "laps.parquet.tmp")
+        _write_frame(laps, LAP_COLUMNS, tmp)
+        os.replace(tmp, os.path.join(directory, "laps.parquet"))
+        written.append("laps")
+
+    for part, attr, columns in (("car", "car_data", CAR_COLUMNS), ("pos", "pos_data", POS_COLUMNS)):
+        if part in manifest["parts"]:
+            continue
+        try:
+            frames = getattr(session, attr)
+        except Exception:
+            continue
+        tmp_dir = os.path.join(directory, f"{part}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for number, frame in frames.items():
+            code = codes.get(str(number))
+            if code:
+                _write_frame(frame, columns, os.path.join(tmp_dir, f"{code}.parquet"))
+        final_dir = os.path.join(directory, part)
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(tmp_dir, final_dir)
+        written.append(part)
+
+    if written:
+        manifest["parts"] = sorted(set(manifest["parts"]) | set(written))
+        manifest["written_at"] = time.time()
+        tmp = os.path.join(directory, "manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, os.path.join(directory, "manifest.json"))
+    return written
+
+
+# =============================================================================
+# READS
+# =============================================================================
+
+def read_laps(year: int, race: str, session_type: str, columns: Optional[Sequence[str]] = None,
+              drivers: Optional[Sequence[str]] = None) -> Optional[Any]:
+    """
+    Stored laps as a pandas DataFrame (only `columns`, only `drivers`), or None.
+
+    The file is memory-mapped and the driver filter is applied while reading.
+    """
+    if not has_parts(year, race, session_type, ["laps"]):
+        return None
+    directory = session_dir(year, race, session_type)
+    _touch(directory)
+    path = os.path.join(directory, "laps.parquet")
+    wanted = None
+    if columns is not None:
+        wanted = list(dict.fromkeys(list(columns) + (["Driver"] if drivers is not None else [])))
+        available = set(pq.read_schema(path).names)
+        wanted = [c for c in wanted if c in available]
+    filters = [("Driver", "in", list(drivers))] if drivers is not None else None
+    return pq.read_table(path, columns=wanted, filters=filters, memory_map=True).to_pandas()
+
+
+def read_driver_data(year: int, race: str, session_type: str, part: str, driver: str,
+                     columns: Optional[Sequence[str]] = None) -> Optional[Any]:
+    """One driver's stored "car" or "pos" samples (only `columns`), or None."""
+    if not has_parts(year, race, session_type, [part]):
+        return None
+    directory = session_dir(year, race, session_type)
+    _touch(directory)
+    path = os.path.join(directory, part, f"{driver}.parquet")
+    if not os.path.exists(path):
+        return None
+    return pq.read_table(path, columns=list(columns) if columns else None, memory_map=True).to_pandas()
+
+
+def store_stats() -> Dict[str, Any]:
+    sessions, size = 0, 0
+    if STORE_AVAILABLE and os.path.isdir(SESSION_STORE_DIR):
+        for root, _, files in os.walk(SESSION_STORE_DIR):
+            sessions += "manifest.json" in files
+            size += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return {
+        "enabled": STORE_AVAILABLE,
+        "dir": SESSION_STORE_DIR,
+        "sessions": sessions,
+        "bytes": size
+    }
@@ -0,0 +1,166 @@
+"""
+F1 Apex Stint Analysis
+Column-wise stint segmentation and tyre degradation for a whole field.
+
+Works on flat per-lap arrays (driver, lap number, compound, stint number,
+lap time) rather than DataFrame rows. Stints are runs of consecutive laps
+by one driver on one compound and stint number. Each stint's degradation
+rate is the slope of its valid lap times over the lap index. Outliers
+such as pit in/out laps are dropped first. The slopes for every stint
+of every driver come out of one grouped least-squares pass (bincount
+sums), which gives the same result as a per-stint `np.polyfit`.
+
+Tyre management compares each driver's fitted slopes with the field's
+median slope on the same compound, so a hard-tyre stint isn't judged
+against softs.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+# Fallback slope (s/lap) for stints too short or noisy to fit
+DEFAULT_DEGRADATION = 0.03
+
+# A stint needs this many timed laps to be fitted...
+MIN_STINT_LAPS = 5
+# ...and this many left after removing outliers
+MIN_FIT_LAPS = 3
+
+# Laps further than this from the stint median are outliers (pit in/out, SC)
+OUTLIER_SECONDS = 3.0
+
+# Degradation vs the field (s/lap) spanning the whole 0-1 tyre management scale
+TYRE_DELTA_RANGE = 0.1
+
+
+def segment_stints(drivers: np.ndarray, lap_numbers: np.ndarray, compounds: np.ndarray,
+                   stint_numbers: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Split laps into stints.
+
+    Inputs are parallel per-lap arrays: integer driver and compound codes,
+    lap numbers, and the feed's stint numbers (NaN where unknown). Laps
+    must be sorted by driver, then lap number. Returns per-lap `lap_stint`
+    ids (0..n-1, in lap order) and per-stint `driver`, `compound`,
+    `stint_number` (1-based per driver), `start_lap` and `end_lap`.
+    """
+    n = len(drivers)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return {"lap_stint": empty, "driver": empty, "compound": empty,
+                "stint_number": empty, "start_lap": empty, "end_lap": empty}
+
+    stint_numbers = np.asarray(stint_numbers, dtype=float)
+    boundary = np.ones(n, dtype=bool)
+    same_stint_no = (stint_numbers[1:] == stint_numbers[:-1]) | (
+        np.isnan(stint_numbers[1:]) & np.isnan(stint_numbers[:-1])
+    )
+    boundary[1:] = (drivers[1:] != drivers[:-1]) | (compounds[1:] != compounds[:-1]) | ~same_stint_no
+
+    lap_stint = np.cumsum(boundary) - 1
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:], n) - 1
+
+    stint_driver = drivers[starts]
+    driver_start = np.ones(len(starts), dtype=bool)
+    driver_start[1:] = stint_driver[1:] != stint_driver[:-1]
+    first_of_driver = np.maximum.accumulate(np.where(driver_start, np.arange(len(starts)), 0))
+
+    return {
+        "lap_stint": lap_stint,
+        "driver": stint_driver,
+        "compound": compounds[starts],
+        "stint_number": np.arange(len(starts)) - first_of_driver + 1,
+        "start_lap": lap_numbers[starts],
+        "end_lap": lap_numbers[ends]
+    }
+
+
+def _grouped_median(groups: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """Median of `values` per group id (NaN for empty groups)."""
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    median = np.full(n_groups, np.nan)
+    has = counts > 0
+    lo = starts[has] + (counts[has] - 1) // 2
+    hi = starts[has] + counts[has] // 2
+    median[has] = (sorted_values[lo] + sorted_values[hi]) / 2
+    return median
+
+
+def fit_stints(lap_stint: np.ndarray, lap_seconds: np.ndarray, n_stints: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Least-squares slope of lap time over lap index for every stint at once.
+
+    Only timed laps count; the x axis is each lap's index among the stint's
+    timed laps. Stints with fewer than MIN_STINT_LAPS timed laps, or fewer
+    than MIN_FIT_LAPS within OUTLIER_SECONDS of their median, get
+    DEFAULT_DEGRADATION. Returns the slopes and a mask of the stints that
+    were actually fitted.
+    """
+    rates = np.full(n_stints, DEFAULT_DEGRADATION)
+    timed = ~np.isnan(lap_seconds)
+    groups = lap_stint[timed]
+    y = lap_seconds[timed]
+    if len(y) == 0:
+        return rates, np.zeros(n_stints, dtype=bool)
+
+    # Index of each timed lap within its stint (groups are contiguous and sorted)
+    counts = np.bincount(groups, minlength=n_stints)
+    group_start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    x = np.arange(len(y)) - group_start[groups]
+
+    median = _grouped_median(groups, y, n_stints)
+    keep = np.abs(y - median[groups]) < OUTLIER_SECONDS
+    g, x, y = groups[keep], x[keep].astype(float), y[keep]
+
+    n = np.bincount(g, minlength=n_stints).astype(float)
+    sx = np.bincount(g, weights=x, minlength=n_stints)
+    sy = np.bincount(g, weights=y, minlength=n_stints)
+    sxx = np.bincount(g, weights=x * x, minlength=n_stints)
+    sxy = np.bincount(g, weights=x * y, minlength=n_stints)
+
+    denominator = n * sxx - sx * sx
+    fit = (counts >= MIN_STINT_LAPS) & (n >= MIN_FIT_LAPS) & (denominator > 0)
+    rates[fit] = (n[fit] * sxy[fit] - sx[fit] * sy[fit]) / denominator[fit]
+    return rates, fit
+
+
+def degradation_rates(lap_stint: np.ndarray, lap_seconds: np.ndarray, n_stints: int) -> np.ndarray:
+    """Per-stint degradation slopes (see `fit_stints`), DEFAULT_DEGRADATION where unfitted."""
+    return fit_stints(lap_stint, lap_seconds, n_stints)[0]
+
+
+def field_relative_degradation(stint_driver: np.ndarray, stint_compound: np.ndarray, rates: np.ndarray,
+                               fitted: np.ndarray, stint_laps: np.ndarray, n_drivers: int) -> Dict[str, np.ndarray]:
+    """
+    Each driver's degradation relative to the field, compound for compound.
+
+    Inputs are per-stint arrays (from `segment_stints` and `fit_stints`)
+    plus each stint's timed lap count. A stint's delta is its slope minus
+    the median fitted slope of the field on its compound; a driver's delta
+    is the lap-weighted mean over their fitted stints (NaN without any).
+    Returns per-compound `compound_median` (NaN where nobody was fitted)
+    and per-driver `delta` and `score` (0-1, higher is gentler on tyres,
+    0.5 is the field).
+    """
+    n_compounds = int(stint_compound.max()) + 1 if len(stint_compound) else 0
+    compound_median = np.full(n_compounds, np.nan)
+    delta = np.full(n_drivers, np.nan)
+    if not fitted.any():
+        return {"compound_median": compound_median, "delta": delta, "score": np.full(n_drivers, np.nan)}
+
+    compound_median = _grouped_median(stint_compound[fitted], rates[fitted], n_compounds)
+    weights = stint_laps[fitted].astype(float)
+    stint_delta = rates[fitted] - compound_median[stint_compound[fitted]]
+    total = np.bincount(stint_driver[fitted], weights=weights, minlength=n_drivers)
+    weighted = np.bincount(stint_driver[fitted], weights=stint_delta * weights, minlength=n_drivers)
+    has = total > 0
+    delta[has] = weighted[has] / total[has]
+
+    score = np.clip(0.5 - delta / TYRE_DELTA_RANGE, 0.0, 1.0)
+    return {"compound_median": compound_median, "delta": delta, "score": score}
@@ -0,0 +1,91 @@
+"""
+F1 Apex Trace Downsampling
+Shape-preserving reduction of lap telemetry traces for charts.
+
+A lap of car data is several hundred to a few thousand samples per
+channel. Charts only need enough points to draw the shape, so each channel
+is reduced with Largest-Triangle-Three-Buckets (LTTB): the samples are
+split into equal buckets along the lap and from each bucket the point
+forming the largest triangle with the point kept from the previous bucket
+and the average of the next bucket is kept. Peaks, braking points and
+throttle lifts survive; flat stretches collapse.
+
+LTTB picks each bucket's point from the previous pick, so buckets are
+walked in order. Everything inside a step is an array operation over all
+channels and every point in the bucket at once, and the bucket averages
+are computed up front in one pass.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the samples LTTB keeps for every channel.
+
+    `x` is the shared axis (n samples, increasing); `y` is (channels, n).
+    Returns a (channels, min(n_out, n)) index array, always including the
+    first and last sample.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    channels, n = y.shape
+    if n_out >= n or n_out < 3:
+        keep = np.arange(n) if n_out >= n else np.array([0, n - 1])[:max(n_out, 1)]
+        return np.tile(keep, (channels, 1))
+
+    # Buckets 1..n_out-2 split the samples between the first and last
+    edges = (np.floor(np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(int) + 1)
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    x_avg = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    y_avg = np.add.reduceat(y[:, :-1], edges[:-1], axis=1) / counts
+    # The bucket after the last one is the final sample
+    x_avg = np.append(x_avg, x[-1])
+    y_avg = np.concatenate([y_avg, y[:, -1:]], axis=1)
+
+    rows = np.arange(channels)
+    picked = np.zeros((channels, n_out), dtype=int)
+    picked[:, -1] = n - 1
+    a = np.zeros(channels, dtype=int)
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        xa, ya = x[a], y[rows, a]
+        xc, yc = x_avg[bucket + 1], y_avg[:, bucket + 1]
+        xb, yb = x[start:end], y[:, start:end]
+        area = np.abs((xa - xc)[:, None] * (yb - ya[:, None]) - (xa[:, None] - xb) * (yc - ya)[:, None])
+        a = start + np.argmax(area, axis=1)
+        picked[:, bucket + 1] = a
+    return picked
+
+
+def downsample_channels(distance: np.ndarray, channels: Dict[str, np.ndarray], n_out: int,
+                        decimals: Dict[str, int] = None) -> Dict[str, Dict[str, list]]:
+    """
+    LTTB-reduce every channel of one lap against distance.
+
+    Returns {channel: {"distance": [...], "value": [...]}} as plain lists,
+    rounded (distance to 0.1 m, values to `decimals[channel]`, default 0)
+    to keep payloads small.
+    """
+    distance = np.asarray(distance, dtype=float)
+    if not channels or len(distance) == 0:
+        return {name: {"distance": [], "value": []} for name in channels}
+
+    names = list(channels)
+    values = np.vstack([np.nan_to_num(np.asarray(channels[name], dtype=float)) for name in names])
+    picked = lttb_indices(distance, values, n_out)
+
+    decimals = decimals or {}
+    result = {}
+    for row, name in enumerate(names):
+        idx = picked[row]
+        places = decimals.get(name, 0)
+        kept = np.round(values[row, idx], places)
+        result[name] = {
+            "distance": np.round(distance[idx], 1).tolist(),
+            "value": kept.astype(int).tolist() if places == 0 else kept.tolist()
+        }
+    return result
@@ -0,0 +1,119 @@
+"""
+F1 Apex Track Dominance
+Mini-sector comparison of the whole field on a common distance grid.
+
+Every driver's fastest lap is reduced to the elapsed time at each of N+1
+equally spaced distances along the lap (linear interpolation of the
+telemetry's time-vs-distance), so mini-sector i is the same stretch of
+track for everyone. Differencing gives a (driver x mini-sector) time
+matrix. The fastest driver in every mini-sector is then one argmin down
+its columns.
+"""
+
+import warnings
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# Mini-sectors per lap
+DOMINANCE_MINISECTORS = 50
+
+# A lap must cover this fraction of the reference lap length to be compared
+MIN_LAP_COVERAGE = 0.9
+
+
+def minisector_times(distances: Sequence[np.ndarray], times: Sequence[np.ndarray],
+                     n_sectors: int = DOMINANCE_MINISECTORS) -> Dict[str, np.ndarray]:
+    """
+    Time spent by each lap in each of `n_sectors` equal-length mini-sectors.
+
+    `distances[i]` (metres from the line) and `times[i]` (seconds into the
+    lap) are one lap's telemetry samples. The grid spans the median lap
+    length. Sectors past the end of a lap's samples are NaN, and laps
+    short of MIN_LAP_COVERAGE are NaN throughout.
+    Returns `edges` (n_sectors + 1 distances) and `times` (laps x n_sectors).
+    """
+    lengths = np.array([np.nanmax(d) if len(d) else 0.0 for d in distances])
+    lap_length = float(np.median(lengths)) if len(lengths) else 0.0
+    edges = np.linspace(0.0, lap_length, n_sectors + 1)
+    at_edges = np.full((len(distances), n_sectors + 1), np.nan)
+
+    for i, (d, t) in enumerate(zip(distances, times)):
+        d = np.asarray(d, dtype=float)
+        t = np.asarray(t, dtype=float)
+        valid = np.isfinite(d) & np.isfinite(t)
+        d, t = d[valid], t[valid]
+        if len(d) < 2 or lengths[i] < MIN_LAP_COVERAGE * lap_length:
+            continue
+        # Distance must be non-decreasing for interpolation
+        d = np.maximum.accumulate(d)
+        covered = edges <= d[-1]
+        at_edges[i, covered] = np.interp(edges[covered], d, t)
+
+    return {"edges": edges, "times": np.diff(at_edges, axis=1)}
+
+
+def integrate_distance(seconds: np.ndarray, speed_kmh: np.ndarray) -> np.ndarray:
+    """
+    Distance (m) from the line at each sample of a lap, integrating speed.
+
+    `seconds` are measured from the lap start, so the stretch before the
+    first sample counts too (samples rarely fall exactly on the line).
+    """
+    dt = np.diff(np.asarray(seconds, dtype=float), prepend=0.0)
+    return np.cumsum(np.nan_to_num(np.asarray(speed_kmh, dtype=float) / 3.6 * dt))
+
+
+def fastest_by_sector(sector_times: np.ndarray) -> np.ndarray:
+    """Row index of the fastest lap in every mini-sector (-1 where nobody has a time)."""
+    if sector_times.size == 0:
+        return np.full(sector_times.shape[1] if sector_times.ndim == 2 else 0, -1)
+    filled = np.where(np.isnan(sector_times), np.inf, sector_times)
+    winners = np.argmin(filled, axis=0)
+    return np.where(np.isfinite(filled.min(axis=0)), winners, -1)
+
+
+def driver_view(field: Dict[str, Any], driver: str) -> Dict[str, Any]:
+    """
+    One driver's mini-sectors from a whole-field result.
+
+    Each sector carries the driver's time, the delta to the fastest time
+    and a status: "fastest", "faster" (quicker than the field median) or
+    "slower".
+    """
+    drivers: List[str] = field["drivers"]
+    if driver not in drivers:
+        raise ValueError(f"No lap data found for driver {driver}")
+    row = drivers.index(driver)
+
+    # Stored as JSON lists: None marks a missing time
+    matrix = np.array(field["sector_times"], dtype=float)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        fastest = np.nanmin(matrix, axis=0)
+        median = np.nanmedian(matrix, axis=0)
+
+    sectors = []
+    for i, time in enumerate(matrix[row]):
+        if np.isnan(time):
+            sectors.append({"sector": i + 1, "time": None, "delta": None, "status": "no_data"})
+            continue
+        if field["winners"][i] == row:
+            status = "fastest"
+        else:
+            status = "faster" if time < median[i] else "slower"
+        sectors.append({
+            "sector": i + 1,
+            "time": round(float(time), 3),
+            "delta": round(float(time - fastest[i]), 3),
+            "status": status
+        })
+
+    return {
+        "driver": driver,
+        "race": field["race"],
+        "year": field["year"],
+        "is_mock": field.get("is_mock", False),
+        "sectors_won": field["sectors_won"].get(driver, 0),
+        "sectors": sectors
+    }
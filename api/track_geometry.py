@@ -0,0 +1,496 @@
+"""
+F1 Apex Track Geometry
+Circuit centrelines and projection of live car positions onto them.
+
+Each circuit is loaded once into an arc-length parameterized polyline in
+local metres, alongside the matching points of the 100x100 SVG map drawn by
+the frontend (app/lib/trackPaths.ts). A uniform grid over the polyline
+lists the segments near each cell, so projecting a batch of car positions
+only compares each car against a handful of segments, all in one NumPy call.
+
+OpenF1 reports x/y in its own per-circuit frame. `register` fits a
+similarity transform (scale, rotation, possible mirroring, translation) from
+that frame onto the centreline using a spread of recent samples, after which
+`project` maps raw coordinates to lap distance, lap fraction and SVG x/y.
+
+Centrelines come from the bacinger/f1-circuits GeoJSON files when
+F1_CIRCUITS_DIR holds them, otherwise from the committed trackPaths.ts
+(scaled to the circuit's official length).
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+TRACK_MAPPING = {
+    "AUS": "au-1953.geojson",
+    "BHR": "bh-2002.geojson",
+    "SAU": "sa-2021.geojson",
+    "JPN": "jp-1962.geojson",
+    "CHN": "cn-2004.geojson",
+    "MIA": "us-2022.geojson",
+    "EMI": "it-1953.geojson",
+    "MCO": "mc-1929.geojson",
+    "ESP": "es-1991.geojson",
+    "CAN": "ca-1978.geojson",
+    "AUT": "at-1969.geojson",
+    "GBR": "gb-1948.geojson",
+    "HUN": "hu-1986.geojson",
+    "BEL": "be-1925.geojson",
+    "NED": "nl-1948.geojson",
+    "ITA": "it-1922.geojson",
+    "MAD": "es-2026.geojson",
+    "AZE": "az-2016.geojson",
+    "SGP": "sg-2008.geojson",
+    "USA": "us-2012.geojson",
+    "MEX": "mx-1962.geojson",
+    "BRA": "br-1940.geojson",
+    "LVS": "us-2023.geojson",
+    "QAT": "qa-2004.geojson",
+    "ABU": "ae-2009.geojson"
+}
+
+# Official lap lengths, used to scale the SVG-only centrelines to metres
+CIRCUIT_LENGTHS_M = {
+    "AUS": 5278, "BHR": 5412, "SAU": 6174, "JPN": 5807, "CHN": 5451,
+    "MIA": 5412, "EMI": 4909, "MCO": 3337, "ESP": 4657, "CAN": 4361,
+    "AUT": 4318, "GBR": 5891, "HUN": 4381, "BEL": 7004, "NED": 4259,
+    "ITA": 5793, "MAD": 5470, "AZE": 6003, "SGP": 4940, "USA": 5513,
+    "MEX": 4304, "BRA": 4309, "LVS": 6201, "QAT": 5419, "ABU": 5281
+}
+
+CIRCUITS_DIR = os.environ.get("F1_CIRCUITS_DIR", "/tmp/f1-circuits/circuits")
+TRACK_PATHS_FILE = os.environ.get(
+    "TRACK_PATHS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "lib", "trackPaths.ts")
+)
+
+EARTH_RADIUS_M = 6371008.8
+
+# Spatial index resolution (cells along the longer side of the circuit)
+GRID_CELLS = 64
+
+# Registration settings
+REGISTRATION_LAP_POINTS = 512
+REGISTRATION_LAP_CLOSURE = 0.05    # a lap closes within 5% of the circuit extent
+REGISTRATION_MAX_LAPS = 4
+REGISTRATION_MAX_SAMPLES = 3000
+REGISTRATION_ITERATIONS = 20
+REGISTRATION_TRIM = 0.9            # ignore the worst 10% of matches (pit lane, run-offs)
+REGISTRATION_MAX_RMS_M = 25.0
+REGISTRATION_MIN_COVERAGE = 0.6    # share of the lap the samples must span
+
+
+# =============================================================================
+# SVG NORMALIZATION (shared with scripts/convert_geojson_to_svg.py)
+# =============================================================================
+
+def normalize_to_viewbox(coords: Sequence[Sequence[float]]) -> List[Tuple[float, float]]:
+    """Fit [lon, lat] points into the 100x100 map viewbox, keeping aspect ratio."""
+    lons = [c[0] for c in coords]
+    lats = [c[1] for c in coords]
+
+    min_lon, max_lon = min(lons), max(lons)
+    min_lat, max_lat = min(lats), max(lats)
+
+    width = max_lon - min_lon
+    height = max_lat - min_lat
+
+    scale = 90 / max(width, height)  # Leave some padding (5 units on each side)
+
+    # Center the track in 100x100
+    x_offset = (100 - (width * scale)) / 2
+    y_offset = (100 - (height * scale)) / 2
+
+    points = []
+    for lon, lat in ((c[0], c[1]) for c in coords):
+        x = (lon - min_lon) * scale
+        y = (max_lat - lat) * scale  # Flip Y
+        points.append((x + x_offset, y + y_offset))
+    return points
+
+
+def svg_path_from_points(points: Sequence[Tuple[float, float]]) -> str:
+    """Closed SVG path ("M..L..Z") with two decimals, as used in trackPaths.ts."""
+    commands = [f"{'M' if i == 0 else 'L'}{x:.2f},{y:.2f}" for i, (x, y) in enumerate(points)]
+    commands.append("Z")
+    return "".join(commands)
+
+
+def load_geojson_coordinates(geojson_path: str) -> List[List[float]]:
+    """[lon, lat] points of the first feature's LineString."""
+    with open(geojson_path, 'r') as f:
+        data = json.load(f)
+    return data['features'][0]['geometry']['coordinates']
+
+
+def parse_svg_path(path: str) -> np.ndarray:
+    """Points of an M/L/Z path as an (n, 2) array."""
+    pairs = re.findall(r"[ML]\s*(-?[\d.]+)[,\s]+(-?[\d.]+)", path)
+    return np.array(pairs, dtype=float).reshape(-1, 2)
+
+
+def load_track_paths(ts_path: str = TRACK_PATHS_FILE) -> Dict[str, str]:
+    """Read the TRACK_PATHS object out of the generated trackPaths.ts."""
+    with open(ts_path, 'r') as f:
+        content = f.read()
+    return json.loads(content[content.index("{"):content.rindex("}") + 1])
+
+
+def lonlat_to_local_metres(coords: Sequence[Sequence[float]]) -> np.ndarray:
+    """Equirectangular projection around the circuit centroid (x east, y north)."""
+    lonlat = np.radians(np.asarray(coords, dtype=float)[:, :2])
+    lon0, lat0 = lonlat.mean(axis=0)
+    x = (lonlat[:, 0] - lon0) * math.cos(lat0) * EARTH_RADIUS_M
+    y = (lonlat[:, 1] - lat0) * EARTH_RADIUS_M
+    return np.column_stack([x, y])
+
+
+# =============================================================================
+# CENTRELINE INDEX
+# =============================================================================
+
+class TrackGeometry:
+    """
+    Closed centreline in local metres with its SVG twin and a segment grid.
+
+    Distances run from the first point of the centreline, in the direction
+    the points are listed.
+    """
+
+    def __init__(self, code: str, local_xy: np.ndarray, svg_xy: np.ndarray, source: str):
+        if not np.allclose(local_xy[0], local_xy[-1]):
+            local_xy = np.vstack([local_xy, local_xy[:1]])
+            svg_xy = np.vstack([svg_xy, svg_xy[:1]])
+
+        self.code = code
+        self.source = source
+        self.points = local_xy
+        self.svg_points = svg_xy
+
+        self.seg_start = local_xy[:-1]
+        self.seg_vec = local_xy[1:] - local_xy[:-1]
+        seg_len = np.hypot(self.seg_vec[:, 0], self.seg_vec[:, 1])
+        self.seg_len2 = np.maximum(seg_len ** 2, 1e-12)
+        self.cum_dist = np.concatenate([[0.0], np.cumsum(seg_len)])
+        self.length = float(self.cum_dist[-1])
+
+        self._build_grid()
+
+    def _build_grid(self):
+        lo = self.points.min(axis=0)
+        hi = self.points.max(axis=0)
+        self.cell = float(max(hi - lo)) / GRID_CELLS
+        # Pad by one cell so points just off the track still land in the grid
+        self.grid_origin = lo - self.cell
+        self.grid_shape = (np.ceil((hi - lo) / self.cell).astype(int) + 3)
+
+        cells: Dict[int, List[int]] = {}
+        nx, ny = self.grid_shape
+        for i, (a, b) in enumerate(zip(self.points[:-1], self.points[1:])):
+            # Every cell within one cell size of the segment's bounding box:
+            # any point whose nearest segment is closer than that finds it here
+            c0 = np.floor((np.minimum(a, b) - self.cell - self.grid_origin) / self.cell).astype(int)
+            c1 = np.floor((np.maximum(a, b) + self.cell - self.grid_origin) / self.cell).astype(int)
+            for cx in range(max(c0[0], 0), min(c1[0], nx - 1) + 1):
+                for cy in range(max(c0[1], 0), min(c1[1], ny - 1) + 1):
+                    cells.setdefault(cx * ny + cy, []).append(i)
+
+        width = max((len(v) for v in cells.values()), default=1)
+        self.grid = np.full((nx * ny, width), -1, dtype=np.int32)
+        for cell_id, segments in cells.items():
+            self.grid[cell_id, :len(segments)] = segments
+
+    def _closest_on(self, xy: np.ndarray, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Best of the (n, k) candidate segments per point -> (segment, t, distance)."""
+        valid = candidates >= 0
+        seg = np.where(valid, candidates, 0)
+        rel = xy[:, None, :] - self.seg_start[seg]
+        vec = self.seg_vec[seg]
+        t = np.clip((rel * vec).sum(axis=2) / self.seg_len2[seg], 0.0, 1.0)
+        d2 = ((rel - t[..., None] * vec) ** 2).sum(axis=2)
+        d2[~valid] = np.inf
+
+        best = np.argmin(d2, axis=1)
+        rows = np.arange(len(xy))
+        return seg[rows, best], t[rows, best], np.sqrt(d2[rows, best])
+
+    def nearest(self, xy: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Closest centreline point for each of an (n, 2) batch of local points.
+
+        Returns (segment index, position along segment 0..1, distance in metres).
+        Points off the grid or further than a cell from the track fall back to
+        a brute-force search over every segment.
+        """
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        nx, ny = self.grid_shape
+        cell_xy = np.floor((xy - self.grid_origin) / self.cell).astype(int)
+        on_grid = (cell_xy[:, 0] >= 0) & (cell_xy[:, 0] < nx) & (cell_xy[:, 1] >= 0) & (cell_xy[:, 1] < ny)
+        cell_ids = np.where(on_grid, cell_xy[:, 0] * ny + cell_xy[:, 1], 0)
+
+        candidates = self.grid[cell_ids]
+        candidates[~on_grid] = -1
+        seg, t, dist = self._closest_on(xy, candidates)
+
+        far = ~(dist <= self.cell)
+        if far.any():
+            all_segments = np.broadcast_to(np.arange(len(self.seg_start)), (int(far.sum()), len(self.seg_start)))
+            seg[far], t[far], dist[far] = self._closest_on(xy[far], all_segments)
+        return seg, t, dist
+
+    def locate(self, xy: np.ndarray) -> Dict[str, np.ndarray]:
+        """Lap distance, SVG position and off-track offset for local points."""
+        seg, t, dist = self.nearest(xy)
+        distance = self.cum_dist[seg] + t * (self.cum_dist[seg + 1] - self.cum_dist[seg])
+        svg = self.svg_points[seg] + t[:, None] * (self.svg_points[seg + 1] - self.svg_points[seg])
+        return {"distance": distance, "svg": svg, "offset": dist}
+
+
+def build_geometry(code: str) -> Optional[TrackGeometry]:
+    """Load a circuit's centreline from GeoJSON if available, else trackPaths.ts."""
+    filename = TRACK_MAPPING.get(code)
+    if filename is None:
+        return None
+
+    geojson_path = os.path.join(CIRCUITS_DIR, filename)
+    if os.path.exists(geojson_path):
+        coords = load_geojson_coordinates(geojson_path)
+        svg = np.array(normalize_to_viewbox(coords))
+        return TrackGeometry(code, lonlat_to_local_metres(coords), svg, "geojson")
+
+    try:
+        path = load_track_paths().get(code)
+    except (OSError, ValueError):
+        path = None
+    if not path:
+        return None
+
+    svg = parse_svg_path(path)
+    # SVG y points down; flip so the local frame is right-handed like GeoJSON
+    local = svg * np.array([1.0, -1.0])
+    svg_length = np.hypot(*np.diff(np.vstack([local, local[:1]]), axis=0).T).sum()
+    local = local * (CIRCUIT_LENGTHS_M[code] / svg_length)
+    return TrackGeometry(code, local, svg, "svg")
+
+
+_geometries: Dict[str, Optional[TrackGeometry]] = {}
+_geometries_lock = threading.Lock()
+
+
+def get_track_geometry(code: str) -> Optional[TrackGeometry]:
+    """Cached centreline index for a track code (None if unknown)."""
+    with _geometries_lock:
+        if code not in _geometries:
+            _geometries[code] = build_geometry(code)
+        return _geometries[code]
+
+
+# =============================================================================
+# REGISTRATION & PROJECTION
+# =============================================================================
+
+class Registration:
+    """Similarity transform from a feed's x/y frame onto a centreline."""
+
+    def __init__(self, scale: float, rotation: np.ndarray, translation: np.ndarray,
+                 reversed_: bool, rms_m: float, coverage: float, samples: int):
+        self.scale = scale
+        self.rotation = rotation
+        self.translation = translation
+        self.reversed = reversed_
+        self.rms_m = rms_m
+        self.coverage = coverage
+        self.samples = samples
+
+    def apply(self, xy: np.ndarray) -> np.ndarray:
+        return self.scale * (np.asarray(xy, dtype=float) @ self.rotation.T) + self.translation
+
+    def stats(self) -> Dict:
+        return {
+            "scale": round(float(self.scale), 6),
+            "mirrored": bool(np.linalg.det(self.rotation) < 0),
+            "reversed": self.reversed,
+            "rms_m": round(self.rms_m, 2),
+            "coverage": round(self.coverage, 3),
+            "samples": self.samples
+        }
+
+
+def _fit_similarity(src: np.ndarray, dst: np.ndarray) -> Tuple[float, np.ndarray, np.ndarray]:
+    """Least-squares dst ~ s * R @ src + t (Umeyama, mirroring allowed)."""
+    src_mean = src.mean(axis=0)
+    dst_mean = dst.mean(axis=0)
+    src_c = src - src_mean
+    dst_c = dst - dst_mean
+
+    u, sv, vt = np.linalg.svd(dst_c.T @ src_c / len(src))
+    rotation = u @ vt
+    var_src = (src_c ** 2).sum() / len(src)
+    scale = sv.sum() / var_src if var_src > 0 else 1.0
+    return scale, rotation, dst_mean - scale * (rotation @ src_mean)
+
+
+def _resample_loop(points: np.ndarray, count: int) -> np.ndarray:
+    """`count` points evenly spaced by arc length around a closed loop."""
+    loop = np.vstack([points, points[:1]])
+    cum = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(loop, axis=0).T))])
+    stations = np.linspace(0.0, cum[-1], count, endpoint=False)
+    return np.column_stack([np.interp(stations, cum, loop[:, 0]), np.interp(stations, cum, loop[:, 1])])
+
+
+def _closed_lap(path: np.ndarray) -> Optional[np.ndarray]:
+    """
+    The first full lap in a time-ordered path, or None if it never closes.
+
+    The lap ends where the car, having gone more than halfway across the
+    circuit, comes back closest to where it started.
+    """
+    if len(path) < 64:
+        return None
+    from_start = np.hypot(*(path - path[0]).T)
+    extent = from_start.max()
+    if extent == 0:
+        return None
+
+    away = np.nonzero(from_start > extent / 2)[0]
+    near = from_start < REGISTRATION_LAP_CLOSURE * extent
+    returns = np.nonzero(near[away[0]:])[0]
+    if len(returns) == 0:
+        return None
+
+    first = away[0] + returns[0]
+    last = first
+    while last + 1 < len(path) and near[last + 1]:
+        last += 1
+    end = first + int(np.argmin(from_start[first:last + 1]))
+    return path[:end]
+
+
+def _match_lap(lap: np.ndarray, centreline: np.ndarray) -> Tuple[float, int]:
+    """
+    Best circular alignment of a resampled lap onto the resampled centreline.
+
+    For every shift k the similarity fit of lap[i] -> centreline[i + k] only
+    depends on their 2x2 cross-covariance, and all of those come out of four
+    circular cross-correlations at once via FFT. Returns (rms residual, k).
+    """
+    src = lap - lap.mean(axis=0)
+    dst = centreline - centreline.mean(axis=0)
+    n = len(src)
+
+    f_src = np.fft.rfft(src, axis=0)
+    f_dst = np.fft.rfft(dst, axis=0)
+    cross = np.empty((n, 2, 2))
+    for a in range(2):
+        for b in range(2):
+            cross[:, a, b] = np.fft.irfft(f_dst[:, a] * np.conj(f_src[:, b]), n) / n
+
+    singular = np.linalg.svd(cross, compute_uv=False).sum(axis=1)
+    var_src = (src ** 2).sum() / n
+    var_dst = (dst ** 2).sum() / n
+    residual = var_dst - singular ** 2 / var_src
+    shift = int(np.argmin(residual))
+    return float(np.sqrt(max(residual[shift], 0.0))), shift
+
+
+def _icp(geometry: TrackGeometry, samples: np.ndarray, scale: float, rotation: np.ndarray,
+         translation: np.ndarray) -> Tuple[float, float, np.ndarray, np.ndarray]:
+    """Trimmed ICP against the centreline from a starting transform -> (rms, scale, rotation, translation)."""
+    rms = np.inf
+    for _ in range(REGISTRATION_ITERATIONS):
+        moved = scale * (samples @ rotation.T) + translation
+        seg, t, dist = geometry.nearest(moved)
+        targets = geometry.seg_start[seg] + t[:, None] * geometry.seg_vec[seg]
+
+        inliers = dist <= np.quantile(dist, REGISTRATION_TRIM)
+        new_rms = float(np.sqrt((dist[inliers] ** 2).mean()))
+        if abs(rms - new_rms) < 1e-3:
+            break
+        rms = new_rms
+        scale, rotation, translation = _fit_similarity(samples[inliers], targets[inliers])
+    return rms, scale, rotation, translation
+
+
+def register(geometry: TrackGeometry, x: Sequence[float], y: Sequence[float],
+             groups: Sequence[int]) -> Optional[Registration]:
+    """
+    Fit the feed's frame onto the centreline from recent position samples.
+
+    `groups` identifies each sample's car (samples in time order per car).
+    A full lap is cut from a car's path, resampled by arc length and
+    matched against the centreline at every starting offset in both
+    directions; the best match gives the transform (mirroring allowed) and
+    the direction of travel. It is then refined against every sample with
+    trimmed ICP. Returns None if no car completes a lap in the samples or
+    the result doesn't fit the track.
+    """
+    samples = np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float)])
+    group_ids = np.asarray(groups)
+    keep = np.isfinite(samples).all(axis=1)
+    samples, group_ids = samples[keep], group_ids[keep]
+
+    laps = []
+    for group in np.unique(group_ids):
+        lap = _closed_lap(samples[group_ids == group])
+        if lap is not None:
+            laps.append(lap)
+        if len(laps) >= REGISTRATION_MAX_LAPS:
+            break
+    if not laps:
+        return None
+
+    centreline = _resample_loop(geometry.points[:-1], REGISTRATION_LAP_POINTS)
+    best = None
+    for lap in laps:
+        for reversed_ in (False, True):
+            resampled = _resample_loop(lap[::-1] if reversed_ else lap, REGISTRATION_LAP_POINTS)
+            residual, shift = _match_lap(resampled, centreline)
+            if best is None or residual < best[0]:
+                best = (residual, reversed_, resampled, np.roll(centreline, -shift, axis=0))
+
+    _, reversed_, src, dst = best
+    scale, rotation, translation = _fit_similarity(src, dst)
+
+    fit_samples = samples
+    if len(samples) > REGISTRATION_MAX_SAMPLES:
+        fit_samples = samples[np.linspace(0, len(samples) - 1, REGISTRATION_MAX_SAMPLES).astype(int)]
+    rms, scale, rotation, translation = _icp(geometry, fit_samples, scale, rotation, translation)
+    if rms > REGISTRATION_MAX_RMS_M:
+        return None
+
+    registration = Registration(scale, rotation, translation, reversed_, rms, 0.0, len(samples))
+    distance = geometry.locate(registration.apply(samples))["distance"]
+    registration.coverage = len(np.unique((distance / geometry.length * 100).astype(int))) / 100
+    if registration.coverage < REGISTRATION_MIN_COVERAGE:
+        return None
+    return registration
+
+
+def project(geometry: TrackGeometry, registration: Registration,
+            x: Sequence[float], y: Sequence[float]) -> Dict[str, np.ndarray]:
+    """
+    Map a batch of feed coordinates onto the lap in one vectorized call.
+
+    Returns arrays of lap distance (metres), lap fraction (0..1), SVG x/y of
+    the matching centreline point and the off-centreline offset (metres).
+    """
+    xy = np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float)])
+    located = geometry.locate(registration.apply(xy))
+
+    distance = located["distance"]
+    if registration.reversed:
+        distance = (geometry.length - distance) % geometry.length
+
+    return {
+        "lap_distance": distance,
+        "lap_fraction": distance / geometry.length,
+        "svg_x": located["svg"][:, 0],
+        "svg_y": located["svg"][:, 1],
+        "offset": located["offset"]
+    }
@@ -0,0 +1,215 @@
+"""
+F1 Apex Result Cache
+Bounded in-memory TTL cache shared by the live and analytics services.
+
+Every namespace keeps its own LRU order and byte budget, so a burst of
+telemetry keys can never push analytics results out (or the reverse).
+Entries older than the namespace's max age are swept out periodically,
+and hit/miss/eviction counters are kept for the health endpoints.
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Run an expiry sweep after this many writes to a namespace
+CLEANUP_EVERY_N_SETS = 256
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the resident size of a cached value in bytes.
+
+    Cached values are JSON-shaped API payloads, so the serialized length is
+    a cheap and stable proxy. Anything that can't be serialized falls back
+    to ``sys.getsizeof``.
+    """
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+class TTLCache:
+    """LRU cache with a byte budget and age-based expiry.
+
+    ``get`` takes the freshness window per call (the live endpoints all use
+    different TTLs), while ``max_age_seconds`` bounds how long any entry may
+    stay resident regardless of who reads it.
+    """
+
+    def __init__(self, namespace: str, max_bytes: int, max_age_seconds: float):
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+        # key -> (value, stored_at, size)
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._sets_since_cleanup = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, ttl_seconds: Optional[float] = None) -> Optional[Any]:
+        """Return the cached value if it is younger than ``ttl_seconds``."""
+        ttl = self.max_age_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at, _ = entry
+            if time.monotonic() - stored_at >= ttl:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_stale(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return ``(value, age_seconds)`` for a resident entry, ignoring TTL.
+
+        Used to keep serving the last good value while a refresh runs or
+        the upstream is down. Entries past ``max_age_seconds`` are not
+        returned.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, stored_at, _ = entry
+            age = time.monotonic() - stored_at
+            if age >= self.max_age_seconds:
+                return None
+
+            self._entries.move_to_end(key)
+            self.stale_hits += 1
+            return value, age
+
+    def set(self, key: str, value: Any, size: Optional[int] = None, age: float = 0.0):
+        """Store a value, evicting least recently used entries over budget.
+
+        ``age`` backdates the entry, for values that were already cached
+        elsewhere (e.g. loaded from disk) and shouldn't get a fresh TTL.
+        """
+        if size is None:
+            size = estimate_size(value)
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+            # A single value larger than the whole budget is never cached
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, time.monotonic() - age, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes and self._entries:
+                oldest_key = next(iter(self._entries))
+                self._drop(oldest_key)
+                self.evictions += 1
+
+            self._sets_since_cleanup += 1
+            if self._sets_since_cleanup >= CLEANUP_EVERY_N_SETS:
+                self._cleanup_locked()
+
+    def delete(self, key: str):
+        """Remove a key if present."""
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def delete_where(self, predicate: Callable[[str], bool]) -> int:
+        """Remove every key the predicate accepts. Returns the count removed."""
+        with self._lock:
+            keys = [k for k in self._entries if predicate(k)]
+            for k in keys:
+                self._drop(k)
+            return len(keys)
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def cleanup(self) -> int:
+        """Remove entries older than ``max_age_seconds``. Returns the count removed."""
+        with self._lock:
+            return self._cleanup_locked()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and usage for health reporting."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_age_seconds": self.max_age_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+    def _drop(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _cleanup_locked(self) -> int:
+        self._sets_since_cleanup = 0
+        cutoff = time.monotonic() - self.max_age_seconds
+        expired = [k for k, (_, stored_at, _) in self._entries.items() if stored_at <= cutoff]
+        for k in expired:
+            self._drop(k)
+        self.expirations += len(expired)
+        return len(expired)
+
+
+# =============================================================================
+# NAMESPACE REGISTRY
+# =============================================================================
+
+_namespaces: Dict[str, TTLCache] = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache(namespace: str, max_bytes: int, max_age_seconds: float) -> TTLCache:
+    """Get (or create) the cache for a namespace.
+
+    The budget arguments only apply on first creation, so modules can call
+    this at import time without coordinating with each other.
+    """
+    with _registry_lock:
+        cache = _namespaces.get(namespace)
+        if cache is None:
+            cache = TTLCache(namespace, max_bytes, max_age_seconds)
+            _namespaces[namespace] = cache
+        return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats for every registered namespace, keyed by namespace name."""
+    with _registry_lock:
+        caches = list(_namespaces.values())
+    return {cache.namespace: cache.stats() for cache in caches}
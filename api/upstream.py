@@ -0,0 +1,224 @@
+"""
+F1 Apex Upstream Guards
+Protection for calls to third-party data feeds (OpenF1).
+
+The circuit breaker stops us hammering an upstream that is already
+failing: after `failure_threshold` consecutive failures it opens and
+rejects calls outright, then lets a single probe through after a
+cool-down. Each failed probe doubles the cool-down up to `max_timeout`.
+Callers must settle every allowed call with `record_success`,
+`record_failure` or `release`, or a half-open breaker stays shut.
+
+The rate budget keeps all our endpoints inside the upstream's quota,
+spending it on the most important feeds first.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with exponential back-off."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5,
+                 reset_timeout: float = 5.0, max_timeout: float = 120.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_timeout = max_timeout
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.current_timeout = reset_timeout
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+        self.total_failures = 0
+        self.total_rejections = 0
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream right now."""
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.current_timeout:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+
+        self.total_rejections += 1
+        return False
+
+    def release(self):
+        """Give back a probe that never got an answer (cancelled, or refused before the call)."""
+        self.probe_in_flight = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.current_timeout = self.reset_timeout
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.total_failures += 1
+        self.consecutive_failures += 1
+
+        if self.state == self.HALF_OPEN:
+            # Probe failed: back off harder before the next one
+            self.current_timeout = min(self.current_timeout * 2, self.max_timeout)
+            self._open()
+        elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe is allowed (0 when closed)."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.current_timeout - (time.monotonic() - self.opened_at))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": round(self.retry_after(), 1),
+            "total_failures": self.total_failures,
+            "total_rejections": self.total_rejections,
+            "times_opened": self.times_opened
+        }
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        self.times_opened += 1
+
+
+# =============================================================================
+# RATE BUDGET
+# =============================================================================
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+PRIORITY_NAMES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+
+# Share of the shared bucket that must remain before a priority may spend from it.
+# High priority can drain it completely; low priority only skims the top half.
+PRIORITY_RESERVE = {PRIORITY_HIGH: 0.0, PRIORITY_NORMAL: 0.25, PRIORITY_LOW: 0.5}
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` tokens/second."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def refill(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return self.tokens
+
+    def seconds_until(self, tokens: float) -> float:
+        """Time until the bucket holds `tokens` (0 if it already does)."""
+        missing = tokens - self.refill()
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+
+class BudgetExceeded(Exception):
+    """Raised when an upstream call is refused by the rate budget."""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"Upstream budget exhausted for {endpoint}, retry in {retry_after:.1f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class RateBudget:
+    """
+    Shared request budget for one upstream with per-endpoint caps.
+
+    Every call spends a token from the shared bucket (the upstream's quota)
+    and from its endpoint's own bucket (so one feed can't starve the rest).
+    Lower priorities may only spend while the shared bucket is above their
+    reserve line, so when the budget runs low weather and race control are
+    refused first and timing keeps flowing. High priority calls may wait
+    briefly for a token instead of being refused.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_wait: float = 1.0):
+        self.name = name
+        self.shared = TokenBucket(rate, burst)
+        self.max_wait = max_wait
+        self.endpoints: Dict[str, Dict[str, Any]] = {}
+
+    def configure(self, endpoint: str, priority: int, share: float = 1.0):
+        """Register an endpoint with a priority and a cap as a share of the shared rate."""
+        self.endpoints[endpoint] = {
+            "priority": priority,
+            "bucket": TokenBucket(self.shared.rate * share, max(1.0, self.shared.burst * share)),
+            "granted": 0,
+            "refused": 0,
+            "waited_seconds": 0.0
+        }
+
+    def _entry(self, endpoint: str) -> Dict[str, Any]:
+        if endpoint not in self.endpoints:
+            self.configure(endpoint, PRIORITY_NORMAL)
+        return self.endpoints[endpoint]
+
+    def _wait_needed(self, entry: Dict[str, Any]) -> float:
+        reserve = self.shared.burst * PRIORITY_RESERVE[entry["priority"]]
+        return max(self.shared.seconds_until(reserve + 1), entry["bucket"].seconds_until(1))
+
+    async def acquire(self, endpoint: str):
+        """Spend one token for `endpoint` or raise BudgetExceeded."""
+        entry = self._entry(endpoint)
+        wait = self._wait_needed(entry)
+
+        if wait > 0 and entry["priority"] == PRIORITY_HIGH and wait <= self.max_wait:
+            await asyncio.sleep(wait)
+            entry["waited_seconds"] += wait
+            wait = self._wait_needed(entry)
+
+        if wait > 0:
+            entry["refused"] += 1
+            raise BudgetExceeded(endpoint, wait)
+
+        self.shared.tokens -= 1
+        entry["bucket"].tokens -= 1
+        entry["granted"] += 1
+
+    def is_low(self, endpoint: str) -> bool:
+        """Whether a call to `endpoint` would be refused right now."""
+        return self._wait_needed(self._entry(endpoint)) > 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": self.shared.rate,
+            "burst": self.shared.burst,
+            "tokens_available": round(self.shared.refill(), 2),
+            "endpoints": {
+                endpoint: {
+                    "priority": PRIORITY_NAMES[entry["priority"]],
+                    "tokens_available": round(entry["bucket"].refill(), 2),
+                    "granted": entry["granted"],
+                    "refused": entry["refused"],
+                    "waited_seconds": round(entry["waited_seconds"], 2)
+                }
+                for endpoint, entry in self.endpoints.items()
+            }
+        }
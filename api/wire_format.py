@@ -0,0 +1,236 @@
+"""
+F1 Apex Wire Formats
+Content negotiation for the high-frequency live endpoints.
+
+Clients pick a format with the Accept header:
+
+- application/json (default): unchanged responses
+- application/msgpack: the same payload as MessagePack (needs `msgpack`)
+- application/vnd.f1apex.columnar: packed columnar layout for row tables
+
+Columnar layout (all integers little-endian):
+
+    b"F1C1"                     magic
+    u32 meta_len, meta          JSON object with every non-row field
+    u32 row_count
+    u16 column_count
+    per column: u8 name_len, name (utf-8), u8 type code
+    per column data, in order:
+        numeric: row_count fixed-width values of the type code
+        "s":     u32 offsets[row_count + 1], then the utf-8 blob
+
+Type codes follow Python's `array` module (b B h H i I f d) plus "s" for
+strings. Missing numbers are NaN for f/d and the type's sentinel
+(minimum for signed, maximum for unsigned) for integers. Timestamps are
+sent as "d" seconds since the epoch.
+"""
+
+import json
+import struct
+import sys
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+MSGPACK_AVAILABLE = False
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    pass
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+COLUMNAR_MEDIA_TYPE = "application/vnd.f1apex.columnar"
+
+COLUMNAR_MAGIC = b"F1C1"
+
+# (min, max, null sentinel) for the integer type codes
+INT_RANGES = {
+    "b": (-128, 127, -128),
+    "B": (0, 255, 255),
+    "h": (-32768, 32767, -32768),
+    "H": (0, 65535, 65535),
+    "i": (-2**31, 2**31 - 1, -2**31),
+    "I": (0, 2**32 - 1, 2**32 - 1),
+}
+FLOAT_CODES = {"f", "d"}
+
+# A column: (name, type code, getter(row) -> value)
+Column = Tuple[str, str, Callable[[Dict], Any]]
+
+
+def column(name: str, type_code: str, path: Optional[str] = None,
+           convert: Optional[Callable[[Any], Any]] = None) -> Column:
+    """Build a column spec reading a (dotted) key from each row."""
+    keys = (path or name).split(".")
+
+    def getter(row: Dict) -> Any:
+        value: Any = row
+        for k in keys:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(k)
+        if value is not None and convert is not None:
+            value = convert(value)
+        return value
+
+    return (name, type_code, getter)
+
+
+# =============================================================================
+# NEGOTIATION
+# =============================================================================
+
+def preferred_media_type(accept: Optional[str], columnar_supported: bool) -> str:
+    """Pick the best supported media type from an Accept header."""
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    supported = [JSON_MEDIA_TYPE]
+    if MSGPACK_AVAILABLE:
+        supported.append(MSGPACK_MEDIA_TYPE)
+    if columnar_supported:
+        supported.append(COLUMNAR_MEDIA_TYPE)
+
+    best, best_q = JSON_MEDIA_TYPE, 0.0
+    for part in accept.split(","):
+        fields = [f.strip() for f in part.split(";")]
+        media = fields[0].lower()
+        if media == "application/x-msgpack":
+            media = MSGPACK_MEDIA_TYPE
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media in supported and q > best_q:
+            best, best_q = media, q
+    return best
+
+
+def negotiate_response(request: Request, payload: Any, rows_key: Optional[str] = None,
+                       columns: Optional[Sequence[Column]] = None):
+    """
+    Encode a route's payload in the format the client asked for.
+
+    JSON clients get the payload serialized as FastAPI would. Every format
+    carries `Vary: Accept`, so caches keep one copy per format.
+    `rows_key`/`columns` describe the payload's row table and enable the
+    columnar format for that route.
+    """
+    columnar_supported = rows_key is not None and columns is not None and isinstance(payload, dict)
+    media_type = preferred_media_type(request.headers.get("accept"), columnar_supported)
+
+    if media_type == MSGPACK_MEDIA_TYPE:
+        body = msgpack.packb(payload, use_bin_type=True, default=str)
+    elif media_type == COLUMNAR_MEDIA_TYPE:
+        meta = {k: v for k, v in payload.items() if k != rows_key}
+        body = encode_columnar(payload.get(rows_key) or [], columns, meta)
+    else:
+        return JSONResponse(content=jsonable_encoder(payload), headers={"Vary": "Accept"})
+
+    return Response(content=body, media_type=media_type, headers={"Vary": "Accept"})
+
+
+# =============================================================================
+# COLUMNAR ENCODING
+# =============================================================================
+
+def _pack_numeric(values: List[Any], type_code: str) -> bytes:
+    if type_code in FLOAT_CODES:
+        packed = array(type_code, [float("nan") if v is None else float(v) for v in values])
+    else:
+        lo, hi, sentinel = INT_RANGES[type_code]
+        ints = []
+        for v in values:
+            try:
+                n = int(v)
+            except (TypeError, ValueError):
+                n = sentinel
+            ints.append(n if lo <= n <= hi else sentinel)
+        packed = array(type_code, ints)
+
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _pack_strings(values: List[Any]) -> bytes:
+    encoded = [b"" if v is None else str(v).encode("utf-8") for v in values]
+    offsets = array("I", [0])
+    total = 0
+    for blob in encoded:
+        total += len(blob)
+        offsets.append(total)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    return offsets.tobytes() + b"".join(encoded)
+
+
+def encode_columnar(rows: List[Dict], columns: Sequence[Column], meta: Optional[Dict] = None) -> bytes:
+    """Pack a list of row dicts into the columnar layout described above."""
+    meta_blob = json.dumps(meta or {}, default=str).encode("utf-8")
+    parts = [
+        COLUMNAR_MAGIC,
+        struct.pack("<I", len(meta_blob)), meta_blob,
+        struct.pack("<IH", len(rows), len(columns)),
+    ]
+
+    for name, type_code, _ in columns:
+        name_blob = name.encode("utf-8")
+        parts.append(struct.pack("<B", len(name_blob)) + name_blob + type_code.encode("ascii"))
+
+    for _, type_code, getter in columns:
+        values = [getter(row) for row in rows]
+        parts.append(_pack_strings(values) if type_code == "s" else _pack_numeric(values, type_code))
+
+    return b"".join(parts)
+
+
+def decode_columnar(data: bytes) -> Dict[str, Any]:
+    """Inverse of `encode_columnar` (for tests and Python clients)."""
+    if data[:4] != COLUMNAR_MAGIC:
+        raise ValueError("Not a columnar payload")
+    offset = 4
+    (meta_len,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    meta = json.loads(data[offset:offset + meta_len])
+    offset += meta_len
+    row_count, column_count = struct.unpack_from("<IH", data, offset)
+    offset += 6
+
+    specs = []
+    for _ in range(column_count):
+        name_len = data[offset]
+        name = data[offset + 1:offset + 1 + name_len].decode("utf-8")
+        type_code = chr(data[offset + 1 + name_len])
+        specs.append((name, type_code))
+        offset += 2 + name_len
+
+    columns: Dict[str, List[Any]] = {}
+    for name, type_code in specs:
+        if type_code == "s":
+            offsets = array("I")
+            offsets.frombytes(data[offset:offset + 4 * (row_count + 1)])
+            if sys.byteorder != "little":
+                offsets.byteswap()
+            offset += 4 * (row_count + 1)
+            blob = data[offset:offset + offsets[-1]]
+            columns[name] = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(row_count)]
+            offset += offsets[-1]
+        else:
+            values = array(type_code)
+            width = values.itemsize
+            values.frombytes(data[offset:offset + width * row_count])
+            if sys.byteorder != "little":
+                values.byteswap()
+            columns[name] = values.tolist()
+            offset += width * row_count
+
+    return {"meta": meta, "row_count": row_count, "columns": columns}
@@ -84,12 +84,24 @@ export const liveApi = {
     }
   },
 
-  // Analytics: Radar Chart
+  // Analytics: Radar Chart (cache misses run as a job we poll)
   getRadar: async (year: number, race: string, driver: string): Promise<RadarMetrics | null> => {
     try {
-      const res = await fetch(`${config.apiUrl}/analysis/radar/${year}/${race}/${driver}`);
+      const res = await fetch(`${config.apiUrl}/analysis/radar/${year}/${race}/${driver}?mode=async`);
       if (!res.ok) return null;
-      return await res.json();
+      let data = await res.json();
+
+      for (let polls = 0; res.status === 202 && polls < 60; polls++) {
+        const wait = Math.min(Math.max(data.eta_seconds ?? 2, 1), 5);
+        await new Promise((resolve) => setTimeout(resolve, wait * 1000));
+        const jobRes = await fetch(`${config.apiUrl}/analysis/jobs/${data.job_id}`);
+        if (!jobRes.ok) return null;
+        const job = await jobRes.json();
+        if (job.status === 'done') return job.result;
+        if (job.status === 'failed') return null;
+        data = job;
+      }
+      return res.status === 202 ? null : data;
     } catch (e) {
       console.error('Radar Analysis Error:', e);
       return null;
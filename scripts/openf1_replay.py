@@ -0,0 +1,363 @@
+"""
+OpenF1 record / replay harness.
+
+Lets us exercise api/live_f1.py without a live race:
+
+    # 1. Capture a finished session into a compressed archive
+    python scripts/openf1_replay.py record 9161 -o recordings/9161.jsonl.gz
+
+    # 2. Serve it as a stand-in for OPENF1_BASE (here at 10x speed)
+    python scripts/openf1_replay.py replay recordings/9161.jsonl.gz --speed 10 --port 8765
+    OPENF1_BASE=http://localhost:8765/v1 uvicorn main:app --app-dir api
+
+    # 3. Point simulated viewers at the live endpoints
+    python scripts/openf1_replay.py load http://localhost:8000/live --viewers 10000 --duration 120
+
+The replay server keeps a virtual session clock that starts at the session's
+date_start (plus --skip seconds) and advances at --speed. Only rows whose
+`date` is at or before the virtual clock are visible, so `latest` queries
+progress exactly as they did live. By default all timestamps are rebased so
+the session appears to be happening now; pass --no-rebase to keep the
+original dates.
+"""
+
+import argparse
+import asyncio
+import bisect
+import gzip
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import httpx
+
+OPENF1_BASE = os.environ.get("OPENF1_BASE", "https://api.openf1.org/v1")
+
+ARCHIVE_FORMAT = "openf1-replay"
+ARCHIVE_VERSION = 1
+
+# Endpoints captured for a session. Per-driver endpoints are fetched one
+# driver at a time because OpenF1 rejects whole-session car_data/location.
+SESSION_ENDPOINTS = ["sessions", "drivers", "intervals", "position", "laps",
+                     "stints", "pit", "weather", "race_control"]
+PER_DRIVER_ENDPOINTS = ["car_data", "location"]
+
+# Timestamp fields shifted when rebasing / compared against the virtual clock
+DATE_FIELDS = ("date", "date_start", "date_end")
+
+# Frontend polling intervals (seconds) per live endpoint, used by `load`
+VIEWER_POLLING = {
+    "session": 10,
+    "timing": 4,
+    "positions": 1,
+    "race-control": 5,
+    "weather": 60,
+    "telemetry/1": 0.25,
+}
+
+FILTER_RE = re.compile(r"^([a-z_]+)(>=|<=|>|<|=)(.*)$")
+
+
+def parse_date(value: str) -> float:
+    """OpenF1 ISO timestamp -> POSIX seconds."""
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def format_date(ts: float) -> str:
+    """POSIX seconds -> OpenF1 style ISO timestamp."""
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+# =============================================================================
+# RECORDER
+# =============================================================================
+
+async def record_session(session_key: int, out_path: str, base: str = OPENF1_BASE):
+    """Capture every OpenF1 feed for a session into a gzip JSON-lines archive."""
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        async def fetch(endpoint: str, params: Dict) -> List[Dict]:
+            response = await client.get(f"{base}/{endpoint}", params=params)
+            response.raise_for_status()
+            data = response.json()
+            return data if isinstance(data, list) else [data]
+
+        with gzip.open(out_path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "format": ARCHIVE_FORMAT,
+                "version": ARCHIVE_VERSION,
+                "session_key": session_key,
+                "recorded_at": datetime.now(timezone.utc).isoformat(),
+                "source": base
+            }) + "\n")
+
+            drivers: List[Dict] = []
+            for endpoint in SESSION_ENDPOINTS:
+                rows = await fetch(endpoint, {"session_key": session_key})
+                if endpoint == "drivers":
+                    drivers = rows
+                f.write(json.dumps({"endpoint": endpoint, "rows": rows}) + "\n")
+                print(f"Recorded {endpoint}: {len(rows)} rows")
+
+            for endpoint in PER_DRIVER_ENDPOINTS:
+                total = 0
+                for driver in drivers:
+                    rows = await fetch(endpoint, {
+                        "session_key": session_key,
+                        "driver_number": driver.get("driver_number")
+                    })
+                    total += len(rows)
+                    f.write(json.dumps({"endpoint": endpoint, "rows": rows}) + "\n")
+                print(f"Recorded {endpoint}: {total} rows across {len(drivers)} drivers")
+
+    print(f"Archive written to {out_path} ({os.path.getsize(out_path) / 1e6:.1f} MB)")
+
+
+# =============================================================================
+# REPLAY
+# =============================================================================
+
+class EndpointData:
+    """Rows of one endpoint sorted by time, with a per-driver index."""
+
+    def __init__(self, rows: List[Dict]):
+        timed = [r for r in rows if r.get("date") or r.get("date_start")]
+        untimed = [r for r in rows if not (r.get("date") or r.get("date_start"))]
+        timed.sort(key=lambda r: parse_date(r.get("date") or r["date_start"]))
+
+        self.untimed = untimed
+        self.rows = timed
+        self.times = [parse_date(r.get("date") or r["date_start"]) for r in timed]
+
+        self.by_driver: Dict[Any, Tuple[List[float], List[Dict]]] = {}
+        for t, row in zip(self.times, self.rows):
+            times, rows_for_driver = self.by_driver.setdefault(row.get("driver_number"), ([], []))
+            times.append(t)
+            rows_for_driver.append(row)
+
+    def visible(self, now: float, driver_number: Optional[int] = None) -> List[Dict]:
+        """Rows whose timestamp is at or before the virtual clock."""
+        if driver_number is not None:
+            times, rows = self.by_driver.get(driver_number, ([], []))
+        else:
+            times, rows = self.times, self.rows
+        return self.untimed + rows[:bisect.bisect_right(times, now)]
+
+
+class ReplayArchive:
+    """An OpenF1 archive loaded into memory with a virtual session clock."""
+
+    def __init__(self, path: str, speed: float = 1.0, skip_seconds: float = 0.0, rebase: bool = True):
+        self.speed = speed
+        self.header: Dict = {}
+        collected: Dict[str, List[Dict]] = {}
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            self.header = json.loads(f.readline())
+            if self.header.get("format") != ARCHIVE_FORMAT:
+                raise ValueError(f"{path} is not an OpenF1 replay archive")
+            for line in f:
+                chunk = json.loads(line)
+                collected.setdefault(chunk["endpoint"], []).extend(chunk["rows"])
+
+        self.endpoints = {name: EndpointData(rows) for name, rows in collected.items()}
+
+        session = (collected.get("sessions") or [{}])[0]
+        all_times = [data.times[0] for data in self.endpoints.values() if data.times]
+        self.session_start = parse_date(session["date_start"]) if session.get("date_start") else min(all_times)
+        self.session_end = parse_date(session["date_end"]) if session.get("date_end") else None
+
+        self.virtual_start = self.session_start + skip_seconds
+        self.wall_start = time.time()
+        # Added to every served timestamp (and removed from incoming filters)
+        self.offset = (self.wall_start - self.virtual_start) if rebase else 0.0
+
+    def now(self) -> float:
+        """Current position of the virtual clock, in original session time."""
+        return self.virtual_start + (time.time() - self.wall_start) * self.speed
+
+    def query(self, endpoint: str, raw_query: str) -> List[Dict]:
+        """Answer an OpenF1 query as it would have been answered at `now()`."""
+        data = self.endpoints.get(endpoint)
+        if data is None:
+            return []
+
+        filters = parse_filters(raw_query)
+        driver_number = None
+        for key, op, value in filters:
+            if key == "driver_number" and op == "=":
+                driver_number = int(value)
+
+        now = self.now()
+        rows = data.visible(now, driver_number)
+        rows = [r for r in rows if all(self._matches(r, f) for f in filters)]
+        return [self._present(r, endpoint, now) for r in rows]
+
+    def _matches(self, row: Dict, flt: Tuple[str, str, str]) -> bool:
+        key, op, value = flt
+        if value == "latest" and key in ("session_key", "meeting_key"):
+            return True
+        actual = row.get(key)
+        if actual is None:
+            return False
+
+        if key in DATE_FIELDS:
+            left, right = parse_date(actual), parse_date(value) - self.offset
+        else:
+            try:
+                left, right = float(actual), float(value)
+            except (TypeError, ValueError):
+                left, right = str(actual), value
+
+        if op == "=":
+            return left == right
+        if op == ">":
+            return left > right
+        if op == "<":
+            return left < right
+        if op == ">=":
+            return left >= right
+        return left <= right
+
+    def _present(self, row: Dict, endpoint: str, now: float) -> Dict:
+        out = dict(row)
+        for field in DATE_FIELDS:
+            if out.get(field):
+                out[field] = format_date(parse_date(out[field]) + self.offset)
+        # A session is still "live" until the virtual clock passes its end
+        if endpoint == "sessions" and self.session_end is not None and now < self.session_end:
+            out["date_end"] = None
+        return out
+
+
+def parse_filters(raw_query: str) -> List[Tuple[str, str, str]]:
+    """Parse OpenF1 query syntax (`date>2023-09-16T13:03:35&driver_number=1`)."""
+    filters = []
+    for part in raw_query.split("&"):
+        match = FILTER_RE.match(unquote(part))
+        if match:
+            filters.append(match.groups())
+    return filters
+
+
+def create_replay_app(archive: ReplayArchive):
+    """FastAPI app serving an archive under /v1, mirroring OpenF1's routes."""
+    from fastapi import FastAPI, Request
+
+    app = FastAPI(title="OpenF1 Replay")
+
+    @app.get("/v1/{endpoint}")
+    async def replay_endpoint(endpoint: str, request: Request):
+        return archive.query(endpoint, request.url.query)
+
+    @app.get("/replay/clock")
+    async def replay_clock():
+        now = archive.now()
+        return {
+            "session_key": archive.header.get("session_key"),
+            "speed": archive.speed,
+            "virtual_now": format_date(now + archive.offset),
+            "session_elapsed_seconds": round(now - archive.session_start, 3)
+        }
+
+    return app
+
+
+# =============================================================================
+# LOAD GENERATOR
+# =============================================================================
+
+async def run_load(target: str, viewers: int, duration: float, max_connections: int):
+    """Simulate `viewers` frontends polling the live endpoints for `duration` seconds."""
+    latencies: Dict[str, List[float]] = {path: [] for path in VIEWER_POLLING}
+    errors: Dict[str, int] = {path: 0 for path in VIEWER_POLLING}
+    deadline = time.monotonic() + duration
+
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    async with httpx.AsyncClient(base_url=target.rstrip("/"), timeout=10.0, limits=limits) as client:
+        async def poll(path: str, interval: float):
+            # Spread viewers over the first polling interval
+            await asyncio.sleep(random.uniform(0, interval))
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                try:
+                    response = await client.get(f"/{path}")
+                    if response.status_code >= 400:
+                        errors[path] += 1
+                except httpx.HTTPError:
+                    errors[path] += 1
+                latencies[path].append(time.monotonic() - started)
+                await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+        await asyncio.gather(*[
+            poll(path, interval)
+            for _ in range(viewers)
+            for path, interval in VIEWER_POLLING.items()
+        ])
+
+    print(f"{'Endpoint':<16} {'Requests':>9} {'Errors':>7} {'RPS':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for path, samples in latencies.items():
+        if not samples:
+            continue
+        samples.sort()
+
+        def pct(p: float) -> float:
+            return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+        print(f"{path:<16} {len(samples):>9} {errors[path]:>7} {len(samples) / duration:>8.1f} "
+              f"{pct(0.50):>8.1f} {pct(0.95):>8.1f} {pct(0.99):>8.1f}")
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay OpenF1 sessions")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Capture a session into an archive")
+    rec.add_argument("session_key", type=int)
+    rec.add_argument("-o", "--output", help="Archive path (default recordings/<session_key>.jsonl.gz)")
+
+    rep = sub.add_parser("replay", help="Serve an archive as a stand-in for OPENF1_BASE")
+    rep.add_argument("archive")
+    rep.add_argument("--speed", type=float, default=1.0, help="Virtual clock speed (1 = real time)")
+    rep.add_argument("--skip", type=float, default=0.0, help="Seconds into the session to start at")
+    rep.add_argument("--no-rebase", action="store_true", help="Serve original timestamps")
+    rep.add_argument("--host", default="127.0.0.1")
+    rep.add_argument("--port", type=int, default=8765)
+
+    load = sub.add_parser("load", help="Simulate viewers polling the live endpoints")
+    load.add_argument("target", help="Base URL of the live router, e.g. http://localhost:8000/live")
+    load.add_argument("--viewers", type=int, default=1000)
+    load.add_argument("--duration", type=float, default=60.0)
+    load.add_argument("--max-connections", type=int, default=500)
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        output = args.output or os.path.join("recordings", f"{args.session_key}.jsonl.gz")
+        asyncio.run(record_session(args.session_key, output))
+    elif args.command == "replay":
+        import uvicorn
+        archive = ReplayArchive(args.archive, speed=args.speed, skip_seconds=args.skip,
+                                rebase=not args.no_rebase)
+        print(f"Replaying session {archive.header.get('session_key')} at {args.speed}x "
+              f"on http://{args.host}:{args.port}/v1")
+        uvicorn.run(create_replay_app(archive), host=args.host, port=args.port)
+    else:
+        asyncio.run(run_load(args.target, args.viewers, args.duration, args.max_connections))
+
+
+if __name__ == "__main__":
+    main()